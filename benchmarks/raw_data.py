@@ -0,0 +1,640 @@
+"""Synthetic raw campaign finance files in each state's real layout
+
+Each write_raw_*_files function writes about row_count transaction rows of
+random but well formed data to a state's raw data directory, laid out like
+'data/raw/<state>' with the raw files' own names, delimiters, headers, and
+encodings. Large files are written in chunks of CHUNK_ROWS rows so that 10M
+rows can be generated without holding them all in memory.
+"""
+
+import csv
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from utils.transform import constants as const
+
+CHUNK_ROWS = 1_000_000
+
+# includes a non-ASCII name, encodable in both mac_roman (MI) and latin-1 (PA)
+FIRST_NAMES = ["JOHN", "MARY", "JOSÉ", "ANN", "LUIS", "MEI"]
+
+
+def chunk_sizes(row_count: int) -> Iterator[int]:
+    """Splits row_count rows into chunks of at most CHUNK_ROWS rows"""
+    for start in range(0, row_count, CHUNK_ROWS):
+        yield min(CHUNK_ROWS, row_count - start)
+
+
+def numbered(prefix: str, numbers: np.ndarray) -> pd.Series:
+    """Strings of prefix followed by each number, e.g. 'DONOR 12'"""
+    return pd.Series(numbers).astype(str).radd(prefix)
+
+
+def write_chunks(
+    path: Path,
+    chunks: Iterator[pd.DataFrame],
+    columns: list[str],
+    header: bool,
+    **to_csv_kwargs,
+) -> Path:
+    """Writes dataframes to one file, as the given columns in that order
+
+    Columns missing from a dataframe are written empty.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = "w"
+    for chunk in chunks:
+        chunk.reindex(columns=columns).to_csv(
+            path,
+            mode=mode,
+            header=header and mode == "w",
+            index=False,
+            **to_csv_kwargs,
+        )
+        mode = "a"
+    return path
+
+
+def sample_rows(table: pd.DataFrame, row_count: int, rng) -> pd.DataFrame:  # noqa: ANN001
+    """row_count rows drawn from table with replacement"""
+    return table.iloc[rng.integers(0, len(table), row_count)].reset_index(drop=True)
+
+
+def make_mi_committees(committee_count: int, rng) -> pd.DataFrame:  # noqa: ANN001
+    """MI committee columns shared by contributions and expenditures"""
+    committee_ids = np.arange(1, committee_count + 1)
+    committee_types = rng.choice(["CAN", "POL", "IND", "BAL"], committee_count)
+    is_candidate = committee_types == "CAN"
+    return pd.DataFrame(
+        {
+            "com_legal_name": numbered("COMMITTEE ", committee_ids),
+            "common_name": numbered("COMMON ", committee_ids),
+            "cfr_com_id": committee_ids,
+            "com_type": committee_types,
+            "can_first_name": np.where(
+                is_candidate, rng.choice(FIRST_NAMES, committee_count), None
+            ),
+            "can_last_name": np.where(
+                is_candidate, numbered("CANDIDATE ", committee_ids), None
+            ),
+        }
+    )
+
+
+def make_mi_contributions(
+    row_count: int,
+    year: int,
+    committees: pd.DataFrame,
+    rng,  # noqa: ANN001
+) -> pd.DataFrame:
+    """MI contribution rows, named as const.MI_CONTRIBUTION_COLUMNS"""
+    contributions = sample_rows(committees, row_count, rng)
+    donor_numbers = rng.integers(0, max(row_count // 5, 1), row_count)
+    is_individual = rng.random(row_count) < 0.8  # noqa: PLR2004
+    amounts = rng.uniform(1, 5000, row_count).round(2)
+    return contributions.assign(
+        doc_seq_no=rng.integers(1, 10**6, row_count),
+        contribution_id=rng.integers(1, 10**9, row_count),
+        doc_stmnt_year=year,
+        doc_type_desc="ANNUAL CS",
+        contribtype=rng.choice(["DIRECT", "IN-KIND", "OTHER RECEIPT"], row_count),
+        f_name=np.where(is_individual, rng.choice(FIRST_NAMES, row_count), None),
+        l_name_or_org=np.where(
+            is_individual,
+            numbered("DONOR ", donor_numbers),
+            numbered("COMPANY ", donor_numbers),
+        ),
+        city="LANSING",
+        state=rng.choice(["MI", "OH", "IN", None], row_count),
+        employer=np.where(
+            is_individual, rng.choice(["ACME", "SELF", None], row_count), None
+        ),
+        received_date=f"01/15/{year}",
+        amount=amounts,
+        aggregate=amounts,
+    )
+
+
+def shift_menominee_rows(contributions: pd.DataFrame) -> pd.DataFrame:
+    """Shifts rows one column along, like the raw Menominee County rows
+
+    utils.transform.michigan.fix_menominee_county_rows shifts them back.
+    """
+    contributions = contributions.reindex(columns=const.MI_CONTRIBUTION_COLUMNS).assign(
+        common_name=const.MI_MENOMINEE_COUNTY
+    )
+    return pd.DataFrame(
+        {
+            raw_column: contributions[column]
+            for column, raw_column in zip(
+                const.MICHIGAN_CONTRIBUTION_COLS_RENAME,
+                const.MICHIGAN_CONTRIBUTION_COLS_REORDER,
+            )
+        }
+    )
+
+
+def make_mi_expenditures(
+    row_count: int,
+    year: int,
+    committees: pd.DataFrame,
+    rng,  # noqa: ANN001
+) -> pd.DataFrame:
+    """MI expenditure rows, named as const.MI_EXPENDITURE_COLUMNS"""
+    expenditures = sample_rows(committees, row_count, rng)
+    vendor_numbers = rng.integers(0, max(row_count // 20, 1), row_count)
+    is_individual = rng.random(row_count) < 0.2  # noqa: PLR2004
+    payees = np.where(
+        is_individual,
+        numbered("PAYEE ", vendor_numbers),
+        numbered("VENDOR ", vendor_numbers),
+    )
+    return expenditures.assign(
+        doc_seq_no=rng.integers(1, 10**6, row_count),
+        expense_id=rng.integers(1, 10**9, row_count),
+        doc_stmnt_year=year,
+        schedule_desc="DIRECT EXPENDITURES",
+        purpose=rng.choice(["ADVERTISING", "CANVASSING", "RENT", None], row_count),
+        f_name=np.where(is_individual, rng.choice(FIRST_NAMES, row_count), None),
+        lname_or_org=payees,
+        state=rng.choice(["MI", "OH", None], row_count),
+        exp_date=f"03/01/{year}",
+        amount=rng.uniform(1, 20_000, row_count).round(2),
+        vend_name=np.where(is_individual, None, payees),
+    )
+
+
+def write_raw_mi_files(directory: str | Path, row_count: int, seed: int = 0) -> Path:
+    """Writes tab-delimited MI contribution and expenditure files
+
+    Four fifths of the rows are contributions, half of them in a headerless
+    file with a few Menominee County rows and half in a '_00.txt' file with a
+    header. The rest are expenditures, in a file with a header. Files are
+    mac_roman encoded.
+
+    Args:
+        directory: MI raw data directory, to write 'Contribution' and
+            'Expenditure' directories in
+        row_count: total number of contribution and expenditure rows
+        seed: seed of the random data
+
+    Returns: directory
+    """
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    committees = make_mi_committees(max(row_count // 200, 10), rng)
+    contribution_count = row_count * 4 // 5
+    headerless_count = contribution_count // 2
+
+    def headerless_contributions() -> Iterator[pd.DataFrame]:
+        for chunk_size in chunk_sizes(headerless_count):
+            contributions = make_mi_contributions(chunk_size, 2020, committees, rng)
+            is_menominee = np.arange(chunk_size) % 10_000 == 0
+            yield pd.concat(
+                [
+                    contributions[~is_menominee],
+                    shift_menominee_rows(contributions[is_menominee]),
+                ]
+            )
+
+    contribution_directory = directory / const.MI_CON_FILEPATH.name
+    write_chunks(
+        contribution_directory / "2020_mi_cfr_contributions.txt",
+        headerless_contributions(),
+        const.MI_CONTRIBUTION_COLUMNS,
+        header=False,
+        sep="\t",
+        encoding="mac_roman",
+    )
+    write_chunks(
+        contribution_directory / "2021_mi_cfr_contributions_00.txt",
+        (
+            make_mi_contributions(chunk_size, 2021, committees, rng)
+            for chunk_size in chunk_sizes(contribution_count - headerless_count)
+        ),
+        const.MI_CONTRIBUTION_COLUMNS,
+        header=True,
+        sep="\t",
+        encoding="mac_roman",
+    )
+    write_chunks(
+        directory / const.MI_EXP_FILEPATH.name / "2020_mi_cfr_expenditures.txt",
+        (
+            make_mi_expenditures(chunk_size, 2020, committees, rng)
+            for chunk_size in chunk_sizes(row_count - contribution_count)
+        ),
+        const.MI_EXPENDITURE_COLUMNS,
+        header=True,
+        sep="\t",
+        encoding="mac_roman",
+    )
+    return directory
+
+
+def make_pa_filers(filer_count: int, year: int, rng) -> pd.DataFrame:  # noqa: ANN001
+    """PA filer rows, with some filers amending their registration"""
+    filer_numbers = np.arange(filer_count)
+    filer_types = rng.choice([1.0, 2.0, 3.0, np.nan], filer_count)
+    filers = pd.DataFrame(
+        {
+            "RECIPIENT_ID": 20_000_000 + filer_numbers,
+            "YEAR": year,
+            "CYCLE": rng.integers(1, 8, filer_count),
+            "RECIPIENT_TYPE": filer_types,
+            "RECIPIENT": np.where(
+                filer_types == 2.0,  # noqa: PLR2004
+                numbered("FRIENDS OF ", filer_numbers),
+                numbered("FILER ", filer_numbers),
+            ),
+            "RECIPIENT_OFFICE": rng.choice(
+                [*const.PA_OFFICE_ABBREV_DICT, None], filer_count
+            ),
+            "RECIPIENT_PARTY": rng.choice(["DEM", "REP", None], filer_count),
+            "CITY": "HARRISBURG",
+            "STATE": "PA",
+        }
+    )
+    amendments = filers.iloc[: max(filer_count // 20, 1)].assign(AMEND="Y")
+    return pd.concat([filers, amendments], ignore_index=True)
+
+
+def make_pa_contributions(
+    row_count: int,
+    year: int,
+    filer_ids: pd.Series,
+    rng,  # noqa: ANN001
+) -> pd.DataFrame:
+    """PA contribution rows, each with up to three contribution amounts"""
+    donor_numbers = rng.integers(0, max(row_count // 5, 1), row_count)
+    donor_kinds = rng.choice(["individual", "pac", "friends", "missing"], row_count)
+    donors = np.select(
+        [donor_kinds == "individual", donor_kinds == "pac", donor_kinds == "friends"],
+        [
+            numbered("DONOR ", donor_numbers).radd(
+                pd.Series(rng.choice(FIRST_NAMES, row_count)) + " "
+            ),
+            numbered("PAC ", donor_numbers),
+            numbered("FRIENDS OF ", donor_numbers),
+        ],
+        None,
+    )
+    return pd.DataFrame(
+        {
+            "RECIPIENT_ID": rng.choice(filer_ids, row_count),
+            "REPORTER_ID": rng.integers(1, 10**6, row_count),
+            "TIMESTAMP": f"{year}-02-01 12:00:00",
+            "YEAR": year,
+            "CYCLE": rng.integers(1, 8, row_count),
+            "DONOR": donors,
+            "CITY": "PITTSBURGH",
+            "STATE": rng.choice(["PA", "NJ", None], row_count),
+            "E_NAME": rng.choice(["ACME", "SELF", None], row_count),
+            "CONT_DATE_1": f"{year}0115",
+            "CONT_AMT_1": rng.uniform(1, 5000, row_count).round(2),
+            "CONT_AMT_2": np.where(
+                rng.random(row_count) < 0.1,  # noqa: PLR2004
+                rng.uniform(1, 500, row_count).round(2),
+                0,
+            ),
+            "CONT_AMT_3": 0,
+        }
+    )
+
+
+def make_pa_expenses(
+    row_count: int,
+    year: int,
+    filer_ids: pd.Series,
+    rng,  # noqa: ANN001
+) -> pd.DataFrame:
+    """PA expense rows paid by filers"""
+    vendor_numbers = rng.integers(0, max(row_count // 20, 1), row_count)
+    return pd.DataFrame(
+        {
+            "DONOR_ID": rng.choice(filer_ids, row_count),
+            "EXPENSE_REPORTER_ID": rng.integers(1, 10**6, row_count),
+            "EXPENSE_TIMESTAMP": f"{year}-02-01 12:00:00",
+            "YEAR": year,
+            "EXPENSE_CYCLE": rng.integers(1, 8, row_count),
+            "RECIPIENT": numbered("VENDOR ", vendor_numbers),
+            "EXPENSE_CITY": "PHILADELPHIA",
+            "EXPENSE_STATE": "PA",
+            "EXPENSE_DATE": f"{year}0301",
+            "AMOUNT": rng.uniform(1, 20_000, row_count).round(2),
+            "PURPOSE": rng.choice(["ADVERTISING", "RENT", None], row_count),
+        }
+    )
+
+
+def write_raw_pa_files(
+    directory: str | Path,
+    row_count: int,
+    years: tuple[int, ...] = (
+        const.PA_SCHEMA_CHANGE_YEAR - 1,
+        const.PA_SCHEMA_CHANGE_YEAR,
+    ),
+    seed: int = 0,
+) -> Path:
+    """Writes PA contrib, filer, and expense files for each year
+
+    Files are headerless, quoted, latin-1 encoded CSVs in a directory per
+    year, with the columns of their year: by default one year before and one
+    after const.PA_SCHEMA_CHANGE_YEAR. Two thirds of each year's rows are
+    contributions and the rest expenses.
+
+    Args:
+        directory: PA raw data directory, to write year directories in
+        row_count: total number of contribution and expense rows
+        years: years to write files for, sharing the rows equally
+        seed: seed of the random data
+
+    Returns: directory
+    """
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    for position, year in enumerate(years):
+        year_row_count = row_count // len(years)
+        if position < row_count % len(years):
+            year_row_count += 1
+        contribution_count = year_row_count * 2 // 3
+        if year < const.PA_SCHEMA_CHANGE_YEAR:
+            contribution_columns = const.PA_CONT_COLS_NAMES_PRE2022
+            filer_columns = const.PA_FILER_COLS_NAMES_PRE2022
+            expense_columns = const.PA_EXPENSE_COLS_NAMES_PRE2022
+        else:
+            contribution_columns = const.PA_CONT_COLS_NAMES_POST2022
+            filer_columns = const.PA_FILER_COLS_NAMES_POST2022
+            expense_columns = const.PA_EXPENSE_COLS_NAMES_POST2022
+        csv_options = {
+            "header": False,
+            "quoting": csv.QUOTE_ALL,
+            "encoding": "latin-1",
+        }
+
+        filers = make_pa_filers(max(year_row_count // 100, 10), year, rng)
+        filer_ids = filers["RECIPIENT_ID"].drop_duplicates()
+        year_directory = directory / str(year)
+        write_chunks(
+            year_directory / f"filer_{year}.txt", [filers], filer_columns, **csv_options
+        )
+        write_chunks(
+            year_directory / f"contrib_{year}.txt",
+            (
+                make_pa_contributions(chunk_size, year, filer_ids, rng)
+                for chunk_size in chunk_sizes(contribution_count)
+            ),
+            contribution_columns,
+            **csv_options,
+        )
+        write_chunks(
+            year_directory / f"expense_{year}.txt",
+            (
+                make_pa_expenses(chunk_size, year, filer_ids, rng)
+                for chunk_size in chunk_sizes(year_row_count - contribution_count)
+            ),
+            expense_columns,
+            **csv_options,
+        )
+    return directory
+
+
+def make_mn_donations(
+    row_count: int,
+    registration_numbers: np.ndarray,
+    rng,  # noqa: ANN001
+) -> pd.DataFrame:
+    """Columns shared by MN candidate and noncandidate contributions"""
+    donor_types = rng.choice(["I", "L", "C", "P", "B", "U"], row_count)
+    donor_numbers = rng.integers(0, max(row_count // 5, 1), row_count)
+    is_in_kind = rng.random(row_count) < 0.05  # noqa: PLR2004
+    amounts = rng.uniform(1, 5000, row_count).round(2)
+    return pd.DataFrame(
+        {
+            "DonationDate": pd.Series(rng.integers(1, 13, row_count)).astype(str)
+            + "/15/"
+            + pd.Series(rng.integers(2015, 2024, row_count)).astype(str),
+            "DonorType": donor_types,
+            "DonorRegNumb": np.where(
+                np.isin(donor_types, ["I", "L"]),
+                None,
+                rng.choice(registration_numbers, row_count).astype(str),
+            ),
+            "DonorName": numbered("DONOR ", donor_numbers),
+            "DonationAmount": np.where(is_in_kind, 0, amounts),
+            "InKindDonAmount": np.where(is_in_kind, amounts, 0),
+            "InKindDescriptionText": np.where(is_in_kind, "FOOD", None),
+        }
+    )
+
+
+def write_raw_mn_files(
+    directory: str | Path, row_count: int, seed: int = 0
+) -> list[Path]:
+    """Writes MN candidate, noncandidate, and expenditure CSVs
+
+    Three fifths of the rows are contributions to candidates, shared by the
+    ten files of const.MN_RACE_MAP's offices, three tenths are contributions to
+    noncandidates, and the rest are independent expenditures.
+
+    Args:
+        directory: MN raw data directory
+        row_count: total number of contribution and expenditure rows
+        seed: seed of the random data
+
+    Returns: paths to the files in the order of const.MN_FILEPATHS_LST
+    """
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    registration_numbers = np.arange(10_000, 10_000 + max(row_count // 200, 10))
+    filepaths = [directory / filepath.name for filepath in const.MN_FILEPATHS_LST]
+    *candidate_filepaths, noncandidate_filepath, expenditure_filepath = filepaths
+    candidate_count = row_count * 3 // 5
+    noncandidate_count = row_count * 3 // 10
+
+    for position, filepath in enumerate(candidate_filepaths):
+        file_row_count = candidate_count // len(candidate_filepaths)
+        if position < candidate_count % len(candidate_filepaths):
+            file_row_count += 1
+
+        def candidate_contributions(
+            file_row_count: int = file_row_count, office: str = filepath.stem
+        ) -> Iterator[pd.DataFrame]:
+            for chunk_size in chunk_sizes(file_row_count):
+                candidates = rng.choice(registration_numbers, chunk_size)
+                yield make_mn_donations(chunk_size, registration_numbers, rng).assign(
+                    OfficeSought=office,
+                    CandRegNumb=candidates,
+                    CandFirstName=rng.choice(FIRST_NAMES, chunk_size),
+                    CandLastName=numbered("CANDIDATE ", candidates),
+                )
+
+        write_chunks(
+            filepath,
+            candidate_contributions(),
+            const.MN_CANDIDATE_CONTRIBUTION_COL,
+            header=True,
+        )
+
+    def noncandidate_contributions() -> Iterator[pd.DataFrame]:
+        for chunk_size in chunk_sizes(noncandidate_count):
+            committees = rng.choice(registration_numbers, chunk_size)
+            yield make_mn_donations(chunk_size, registration_numbers, rng).assign(
+                PCFRegNumb=committees,
+                Committee=numbered("COMMITTEE ", committees),
+                ETType=rng.choice(["PCF", "PTU"], chunk_size),
+            )
+
+    write_chunks(
+        noncandidate_filepath,
+        noncandidate_contributions(),
+        const.MN_NONCANDIDATE_CONTRIBUTION_COL,
+        header=True,
+    )
+
+    def expenditures() -> Iterator[pd.DataFrame]:
+        for chunk_size in chunk_sizes(row_count - candidate_count - noncandidate_count):
+            spenders = rng.choice(registration_numbers, chunk_size)
+            affected = rng.choice(registration_numbers, chunk_size)
+            yield pd.DataFrame(
+                {
+                    "Spender": numbered("COMMITTEE ", spenders),
+                    "Spender Reg Num": spenders,
+                    "Spender type": rng.choice(["PCF", "PTU"], chunk_size),
+                    "Affected Comte Name": numbered("COMMITTEE ", affected),
+                    "Affected Cmte Reg Num": affected,
+                    "For /Against": rng.choice(["For", "Against"], chunk_size),
+                    "Date": "10/01/2022",
+                    "Type": "Independent Expenditure",
+                    "Amount": rng.uniform(1, 20_000, chunk_size).round(2),
+                    "Purpose": rng.choice(["MAILER", "TV AD"], chunk_size),
+                    "Vendor State": rng.choice(["MN", "WI"], chunk_size),
+                }
+            )
+
+    write_chunks(
+        expenditure_filepath,
+        expenditures(),
+        const.MN_INDEPENDENT_EXPENDITURE_COL,
+        header=True,
+    )
+    return filepaths
+
+
+def make_az_details(entity_count: int, rng) -> pd.DataFrame:  # noqa: ANN001
+    """Synthetic AZ entity details shaped like the scraped details files"""
+    entity_ids = np.arange(1, entity_count + 1)
+    entity_types = rng.choice(
+        ["Individual Contributors", "Candidates", "PACs", "Vendors"], entity_count
+    )
+    return pd.DataFrame(
+        {
+            "retrieved_id": entity_ids,
+            "entity_type": entity_types,
+            "candidate": np.where(
+                entity_types == "Candidates",
+                pd.Series(entity_ids).astype(str).radd("Cand "),
+                "",
+            ),
+            "committee_name": pd.Series(entity_ids).astype(str).radd("Committee "),
+            "retrieved_name": pd.Series(entity_ids).astype(str).radd("Name "),
+            "office_name": rng.choice(["Governor", "State Senate", None], entity_count),
+            "committee_address": rng.choice(
+                ["1 Main St Phoenix AZ 85001", "2 Elm St Tucson AZ 85701"],
+                entity_count,
+            ),
+            "party_name": rng.choice(["Democratic", "Republican"], entity_count),
+        }
+    )
+
+
+def make_az_transactions(
+    row_count: int,
+    entity_ids: np.ndarray,
+    rng,  # noqa: ANN001
+    first_transaction_id: int = 0,
+) -> pd.DataFrame:
+    """Synthetic AZ transactions shaped like the scraped transactions files"""
+    timestamps = rng.integers(1_262_304_000_000, 1_700_000_000_000, row_count)
+    return pd.DataFrame(
+        {
+            "retrieved_id": rng.choice(entity_ids, row_count),
+            "PublicTransactionId": np.arange(
+                first_transaction_id, first_transaction_id + row_count
+            ),
+            "TransactionDate": pd.Series(timestamps).astype(str).radd("/Date(") + ")/",
+            "TransactionDateYear": pd.to_datetime(timestamps, unit="ms").year,
+            "entity_type": rng.choice(["Individual", "Vendor", "Committee"], row_count),
+            "TransactionNameGroupId": rng.choice(entity_ids, row_count),
+            "CommitteeId": rng.choice(entity_ids, row_count),
+            "TransactionTypeDispositionId": rng.choice([1, 2], row_count),
+            "TransactionEmployer": rng.choice(["Acme", "Self", None], row_count),
+            "Amount": rng.uniform(-5000, 5000, row_count).round(2),
+            "Memo": rng.choice(["dinner", "ads", None], row_count),
+            "TransactionType": rng.choice(["Contribution", "Expense"], row_count),
+        }
+    )
+
+
+def make_raw_az_data(
+    row_count: int, seed: int = 0
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Synthetic AZ transactions and details shaped like the scraped files"""
+    rng = np.random.default_rng(seed)
+    details = make_az_details(max(row_count // 50, 10), rng)
+    transactions = make_az_transactions(row_count, details["retrieved_id"], rng)
+    return transactions, details
+
+
+def write_raw_az_files(
+    directory: str | Path, row_count: int, seed: int = 0
+) -> list[Path]:
+    """Writes AZ individuals, organizations, and transactions CSVs
+
+    The scraped details are split between the individuals file (individual
+    contributors and candidates) and the organizations file (everyone else).
+
+    Args:
+        directory: AZ raw data directory
+        row_count: number of transaction rows
+        seed: seed of the random data
+
+    Returns: paths to the individuals, organizations, and transactions files,
+        the order ArizonaTransformer.preprocess reads them in
+    """
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    details = make_az_details(max(row_count // 50, 10), rng)
+    is_individual = details["entity_type"].isin(
+        ["Individual Contributors", "Candidates"]
+    )
+
+    def transactions() -> Iterator[pd.DataFrame]:
+        first_transaction_id = 0
+        for chunk_size in chunk_sizes(row_count):
+            yield make_az_transactions(
+                chunk_size, details["retrieved_id"], rng, first_transaction_id
+            )
+            first_transaction_id += chunk_size
+
+    return [
+        write_chunks(
+            directory / const.AZ_INDIVIDUALS_FILEPATH.name,
+            [details[is_individual]],
+            list(details.columns),
+            header=True,
+        ),
+        write_chunks(
+            directory / const.AZ_ORGANIZATIONS_FILEPATH.name,
+            [details[~is_individual]],
+            list(details.columns),
+            header=True,
+        ),
+        write_chunks(
+            directory / const.AZ_TRANSACTIONS_FILEPATH.name,
+            transactions(),
+            list(make_az_transactions(0, details["retrieved_id"], rng).columns),
+            header=True,
+        ),
+    ]
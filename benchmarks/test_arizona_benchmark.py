@@ -0,0 +1,28 @@
+"""Benchmarks for ArizonaTransformer
+
+Run explicitly with `pytest benchmarks/test_arizona_benchmark.py`.
+"""
+
+import pytest
+from utils.transform import arizona
+from utils.transform.arizona import ArizonaTransformer
+
+from benchmarks.raw_data import make_raw_az_data
+
+ROW_COUNTS = {"1M": 1_000_000}
+
+
+@pytest.mark.parametrize("row_count", ROW_COUNTS.values(), ids=ROW_COUNTS.keys())
+def test_clean_standardize_create_tables(benchmark, monkeypatch, tmp_path, row_count):
+    # create_tables writes ArizonaIDMap.csv to the output directory
+    monkeypatch.setattr(arizona, "BASE_FILEPATH", tmp_path)
+    transactions, details = make_raw_az_data(row_count)
+    transformer = ArizonaTransformer()
+
+    def transform() -> tuple:
+        cleaned = transformer.clean([transactions.copy(), details])
+        return transformer.create_tables(transformer.standardize(cleaned))
+
+    _, _, az_transactions = benchmark.pedantic(transform, rounds=1, iterations=1)
+
+    assert len(az_transactions) == row_count
@@ -0,0 +1,74 @@
+"""Benchmarks of each StateTransformer.clean_state on synthetic raw files
+
+Run explicitly with `pytest benchmarks/test_clean_state_benchmark.py`; select
+a state or scale with e.g. `-k "Michigan and 1M"`. Raw files are generated by
+benchmarks/raw_data.py before timing starts, which takes a while at 10M rows.
+"""
+
+import pytest
+from utils.transform import arizona, michigan, minnesota, pennsylvania
+from utils.transform import constants as const
+from utils.transform.arizona import ArizonaTransformer
+from utils.transform.michigan import MichiganTransformer
+from utils.transform.minnesota import MinnesotaTransformer
+from utils.transform.pennsylvania import PennsylvaniaTransformer
+
+from benchmarks.raw_data import (
+    write_raw_az_files,
+    write_raw_mi_files,
+    write_raw_mn_files,
+    write_raw_pa_files,
+)
+
+ROW_COUNTS = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+
+STATES = {
+    "Arizona": (ArizonaTransformer, "AZ", write_raw_az_files),
+    "Michigan": (MichiganTransformer, "MI", write_raw_mi_files),
+    "Minnesota": (MinnesotaTransformer, "MN", write_raw_mn_files),
+    "Pennsylvania": (PennsylvaniaTransformer, "PA", write_raw_pa_files),
+}
+
+
+@pytest.fixture
+def raw_directory(monkeypatch, tmp_path):
+    """Points the transformers' raw data and output paths into tmp_path"""
+    raw_directory = tmp_path / "data" / "raw"
+    for module in [arizona, michigan, pennsylvania]:
+        monkeypatch.setattr(module, "BASE_FILEPATH", tmp_path)
+    # MinnesotaTransformer writes MNIDMap.csv to the working directory
+    monkeypatch.chdir(tmp_path)
+    for name in [
+        "AZ_INDIVIDUALS_FILEPATH",
+        "AZ_ORGANIZATIONS_FILEPATH",
+        "AZ_TRANSACTIONS_FILEPATH",
+    ]:
+        monkeypatch.setattr(
+            arizona, name, raw_directory / "AZ" / getattr(const, name).name
+        )
+    monkeypatch.setattr(
+        michigan, "MI_CON_FILEPATH", raw_directory / "MI" / const.MI_CON_FILEPATH.name
+    )
+    monkeypatch.setattr(
+        michigan, "MI_EXP_FILEPATH", raw_directory / "MI" / const.MI_EXP_FILEPATH.name
+    )
+    monkeypatch.setattr(
+        minnesota,
+        "MN_FILEPATHS_LST",
+        [raw_directory / "MN" / filepath.name for filepath in const.MN_FILEPATHS_LST],
+    )
+    return raw_directory
+
+
+@pytest.mark.parametrize("row_count", ROW_COUNTS.values(), ids=ROW_COUNTS.keys())
+@pytest.mark.parametrize("state", STATES)
+def test_clean_state(benchmark, raw_directory, state, row_count):
+    transformer_class, abbreviation, write_raw_files = STATES[state]
+    write_raw_files(raw_directory / abbreviation, row_count)
+    transformer = transformer_class()
+
+    _, _, transactions = benchmark.pedantic(
+        transformer.clean_state, rounds=1, iterations=1
+    )
+
+    assert len(transactions) > 0
@@ -0,0 +1,60 @@
+"""Benchmarks for MinnesotaTransformer
+
+Run explicitly with `pytest benchmarks/test_minnesota_benchmark.py`; select a
+single scale with e.g. `-k 1M`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.transform.minnesota import MinnesotaTransformer
+
+ROW_COUNTS = {"1M": 1_000_000, "10M": 10_000_000}
+
+
+def make_cleaned_mn_data(row_count: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic MN frame shaped like the output of MinnesotaTransformer.clean"""
+    rng = np.random.default_rng(seed)
+    registration_numbers = np.arange(10_000, 10_000 + max(row_count // 200, 10))
+    recipient_ids = rng.choice(registration_numbers, row_count).astype(str)
+    # most candidate donors are individuals without a registration number
+    donor_ids = np.where(
+        rng.random(row_count) < 0.6,  # noqa: PLR2004
+        "None",
+        rng.choice(registration_numbers, row_count).astype(str),
+    )
+    return pd.DataFrame(
+        {
+            "office_sought": rng.choice(["GC", "House", "Senate", "None"], row_count),
+            "recipient_id": recipient_ids,
+            "recipient_first_name": "None",
+            "recipient_last_name": "None",
+            "donor_type": rng.choice(["I", "L", "C", "P", "B"], row_count),
+            "donor_full_name": pd.Series(donor_ids).radd("Donor "),
+            "amount": rng.uniform(1, 5000, row_count).round(2),
+            "purpose": "None",
+            "recipient_type": rng.choice(["I", "PCF", "PTU"], row_count),
+            "recipient_full_name": pd.Series(recipient_ids).radd("Recipient "),
+            "donor_first_name": "None",
+            "donor_last_name": "None",
+            "donor_id": donor_ids,
+            "state": "MN",
+            "transaction_type": "None",
+            "year": rng.integers(2015, 2024, row_count),
+        }
+    )
+
+
+@pytest.mark.parametrize("row_count", ROW_COUNTS.values(), ids=ROW_COUNTS.keys())
+def test_standardize(benchmark, monkeypatch, tmp_path, row_count):
+    # standardize writes MNIDMap.csv to the working directory
+    monkeypatch.chdir(tmp_path)
+    cleaned = make_cleaned_mn_data(row_count)
+    transformer = MinnesotaTransformer()
+
+    (standardized,) = benchmark.pedantic(
+        transformer.standardize, args=([cleaned],), rounds=1, iterations=1
+    )
+
+    assert len(standardized) == row_count
+    assert standardized["transaction_id"].is_unique
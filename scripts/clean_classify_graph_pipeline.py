@@ -1,13 +1,70 @@
 """Script to run cleaning, classification, and graph building pipeline"""
 
+import argparse
+from pathlib import Path
+
 import pandas as pd
 from utils.constants import BASE_FILEPATH
 from utils.linkage_and_network_pipeline import clean_data_and_build_network
+from utils.transform.storage import read_table
+
+# transaction columns used by linkage and network building
+TRANSACTION_COLUMNS = [
+    "transaction_id",
+    "donor_id",
+    "recipient_id",
+    "year",
+    "amount",
+    "office_sought",
+    "purpose",
+    "transaction_type",
+]
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument(
+    "-i",
+    "--input-directory",
+    type=Path,
+    default=None,
+    help=(
+        "Path to Parquet datasets written by transform_pipeline.py. Default is "
+        "to read the sample CSVs in 'data/transformed'"
+    ),
+)
+parser.add_argument(
+    "--states",
+    nargs="+",
+    default=None,
+    help="Names of states to read from the Parquet datasets. Default is all",
+)
+parser.add_argument(
+    "--years",
+    nargs="+",
+    type=int,
+    default=None,
+    help="Transaction years to read from the Parquet datasets. Default is all",
+)
+args = parser.parse_args()
 
-transformed_data = BASE_FILEPATH / "data" / "transformed"
+if args.input_directory is None:
+    transformed_data = BASE_FILEPATH / "data" / "transformed"
 
-organizations_table = pd.read_csv(transformed_data / "orgs_mini.csv")
-individuals_table = pd.read_csv(transformed_data / "inds_mini.csv")
-transactions_table = pd.read_csv(transformed_data / "trans_mini.csv")
+    organizations_table = pd.read_csv(transformed_data / "orgs_mini.csv")
+    individuals_table = pd.read_csv(transformed_data / "inds_mini.csv")
+    transactions_table = pd.read_csv(transformed_data / "trans_mini.csv")
+else:
+    organizations_table = read_table(
+        args.input_directory / "organizations", states=args.states
+    )
+    individuals_table = read_table(
+        args.input_directory / "individuals", states=args.states
+    )
+    transactions_table = read_table(
+        args.input_directory / "transactions",
+        columns=TRANSACTION_COLUMNS,
+        states=args.states,
+        years=args.years,
+    )
 
 clean_data_and_build_network(individuals_table, organizations_table, transactions_table)
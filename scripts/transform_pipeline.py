@@ -3,7 +3,15 @@
 import argparse
 
 from utils.constants import BASE_FILEPATH
-from utils.transform.pipeline import transform_and_merge
+from utils.transform.duckdb_backend import (
+    DUCKDB_STATE_TABLES,
+    transform_state_to_parquet,
+)
+from utils.transform.pipeline import (
+    ALL_STATE_CLEANERS,
+    stream_state_to_parquet,
+    transform_and_merge,
+)
 
 parser = argparse.ArgumentParser()
 
@@ -19,12 +27,105 @@ parser.add_argument(
     default=None,
     help="Path to directory to save output. Default is 'output/transformed'",
 )
+parser.add_argument(
+    "-w",
+    "--workers",
+    type=int,
+    default=1,
+    help="Number of states to transform in parallel processes. Default is 1",
+)
+parser.add_argument(
+    "-f",
+    "--output-format",
+    choices=["parquet", "csv"],
+    default="parquet",
+    help=(
+        "Format of the transformed tables. 'parquet' writes a dataset per table "
+        "partitioned by state and year, 'csv' a single file per table. "
+        "Default is parquet"
+    ),
+)
+parser.add_argument(
+    "-c",
+    "--cache-directory",
+    default=None,
+    help=(
+        "Path to directory to cache transformed raw data partitions in. Only "
+        "partitions whose raw files changed since the last run are transformed "
+        "again. Default is 'output/cache'"
+    ),
+)
+parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="Transform all raw data, without reading or writing the cache",
+)
+parser.add_argument(
+    "-b",
+    "--backend",
+    choices=["pandas", "duckdb"],
+    default="pandas",
+    help=(
+        "Engine to transform states with. 'duckdb' transforms Michigan and "
+        "Pennsylvania out of core, straight from the raw files to parquet, and "
+        "the other states with pandas. It writes the same id lookup for "
+        "Pennsylvania, but leaves transaction rows out of MichiganIDMap.csv. "
+        "Default is pandas"
+    ),
+)
+parser.add_argument(
+    "--memory-limit",
+    default=None,
+    help=(
+        "Memory the duckdb backend may use before spilling to disk, e.g. '4GB'. "
+        "Default is 80%% of the system memory"
+    ),
+)
+parser.add_argument(
+    "--stream-chunksize",
+    type=int,
+    default=None,
+    help=(
+        "Transform Michigan this many raw rows at a time with pandas, so its "
+        "memory use does not grow with the years of data. Only for parquet "
+        "output, and Michigan is then not cached. Default is to transform it "
+        "all at once"
+    ),
+)
+parser.add_argument(
+    "-r",
+    "--report-path",
+    default=None,
+    help=(
+        "Path to write a JSON run report to, with the time, memory, and row "
+        "counts of every stage of every state transformed with pandas. "
+        "Default is no report"
+    ),
+)
+parser.add_argument(
+    "--trace-memory",
+    action="store_true",
+    help=(
+        "Also measure the memory allocated by each stage in the run report, "
+        "which slows the stages down"
+    ),
+)
 args = parser.parse_args()
+if args.backend == "duckdb" and args.output_format != "parquet":
+    parser.error("the duckdb backend only writes parquet output")
+if args.stream_chunksize is not None and args.output_format != "parquet":
+    parser.error("streaming Michigan only writes parquet output")
 
 if args.output_directory is None:
     output_directory = BASE_FILEPATH / "output" / "transformed"
 else:
     output_directory = args.output_directory
+if args.no_cache:
+    cache_directory = None
+elif args.cache_directory is None:
+    cache_directory = BASE_FILEPATH / "output" / "cache"
+else:
+    cache_directory = args.cache_directory
 if args.input_directory is None:
     input_directory = BASE_FILEPATH / "data" / "raw"
 else:
@@ -32,14 +133,55 @@ else:
 input_directory.mkdir(parents=True, exist_ok=True)
 output_directory.mkdir(parents=True, exist_ok=True)
 
-individuals_output_path = output_directory / "individuals_table.csv"
-organizations_output_path = output_directory / "organizations_table.csv"
-transactions_output_path = output_directory / "transactions_table.csv"
-(
-    complete_individuals_table,
-    complete_organizations_table,
-    complete_transactions_table,
-) = transform_and_merge()
-complete_individuals_table.to_csv(individuals_output_path)
-complete_organizations_table.to_csv(organizations_output_path)
-complete_transactions_table.to_csv(transactions_output_path)
+if args.output_format == "parquet":
+    state_cleaners = ALL_STATE_CLEANERS
+    if args.backend == "duckdb":
+        for state_cleaner in state_cleaners:
+            if state_cleaner.name in DUCKDB_STATE_TABLES:
+                print(f"Transforming {state_cleaner.name} with DuckDB...")
+                transform_state_to_parquet(
+                    state_cleaner, output_directory, memory_limit=args.memory_limit
+                )
+        state_cleaners = [
+            state_cleaner
+            for state_cleaner in state_cleaners
+            if state_cleaner.name not in DUCKDB_STATE_TABLES
+        ]
+    if args.stream_chunksize is not None:
+        for state_cleaner in state_cleaners:
+            if state_cleaner.name == "Michigan":
+                print("Streaming Michigan...")
+                stream_state_to_parquet(
+                    state_cleaner, output_directory, args.stream_chunksize
+                )
+        state_cleaners = [
+            state_cleaner
+            for state_cleaner in state_cleaners
+            if state_cleaner.name != "Michigan"
+        ]
+    transform_and_merge(
+        state_cleaners=state_cleaners,
+        workers=args.workers,
+        output_directory=output_directory,
+        cache_directory=cache_directory,
+        report_path=args.report_path,
+        trace_memory=args.trace_memory,
+        return_tables=False,
+    )
+else:
+    individuals_output_path = output_directory / "individuals_table.csv"
+    organizations_output_path = output_directory / "organizations_table.csv"
+    transactions_output_path = output_directory / "transactions_table.csv"
+    (
+        complete_individuals_table,
+        complete_organizations_table,
+        complete_transactions_table,
+    ) = transform_and_merge(
+        workers=args.workers,
+        cache_directory=cache_directory,
+        report_path=args.report_path,
+        trace_memory=args.trace_memory,
+    )
+    complete_individuals_table.to_csv(individuals_output_path)
+    complete_organizations_table.to_csv(organizations_output_path)
+    complete_transactions_table.to_csv(transactions_output_path)
@@ -30,8 +30,19 @@ represents one of the following, always in the same order, but not always all pr
 So, to get candidate income, look at page 20, Political party all transactions is
 42 because political parties don't have IE or Ballot Measure endpoints.
 
+Requests are sent through a utils.scrape.client.ScrapeClient, which scrapes the
+entities of a detailed page concurrently, rate limited and with retries. By
+default the client caches responses in a utils.scrape.cache.HTTPCache, so
+scraping again only downloads the responses that changed.
+
+A table too large to request at once can be scraped in pages of rows with
+paged_scrape, which streams each page to a Parquet part file as it arrives and
+resumes from the last page written if it is interrupted. scrape_and_download_az_data
+scrapes the list of entities of each page this way.
 """
 
+import json
+import shutil
 from pathlib import Path
 from typing import Any
 
@@ -39,7 +50,10 @@ import pandas as pd
 import requests
 
 from utils.constants import BASE_FILEPATH
-from utils.scrape.constants import HEADERS, MAX_TIMEOUT, AZ_pages_dict
+from utils.scrape.cache import HTTPCache
+from utils.scrape.client import ScrapeClient
+from utils.scrape.constants import HEADERS, AZ_pages_dict
+from utils.transform.storage import append_parquet_part, read_parquet_parts
 
 BASE_URL = "https://seethemoney.az.gov/Reporting"
 BASE_ENDPOINT = "GetNEWTableData"
@@ -54,8 +68,9 @@ AZ_SEARCH_DATA = {
     "search[value]": "",
     "search[regex]": "false",
 }
-AZ_HEADER = HEADERS.update(
-    {
+AZ_HEADER = {
+    **HEADERS,
+    **{
         "Accept": "application/json, text/javascript, */*; q=0.01",
         "Accept-Language": "en-US,en;q=0.5",
         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
@@ -66,35 +81,74 @@ AZ_HEADER = HEADERS.update(
         "Sec-Fetch-Dest": "empty",
         "Sec-Fetch-Mode": "cors",
         "Sec-Fetch-Site": "same-origin",
-    }
-)
+    },
+}
 BASIC_TYPE_PAGE = 10
 NAME_INFO_PAGE = 11
 MAX_DETAILED_PAGE = 20
 AZ_valid_detailed_pages = [v for v in AZ_pages_dict.values() if v >= MAX_DETAILED_PAGE]
 all_transactions_pages = [24, 36, 42, 54, 62, 72, 80, 90]
+AZ_PAGE_SIZE = 10_000
+SCRAPE_STATE_FILENAME = "scrape_state.json"
 
 
 def scrape_and_download_az_data(
-    start_year: int, end_year: int, output_directory: Path = None
+    start_year: int,
+    end_year: int,
+    output_directory: Path = None,
+    client: ScrapeClient = None,
+    page_size: int = AZ_PAGE_SIZE,
 ) -> None:
-    """Collect and download all arizona data within range"""
+    """Collect and download all arizona data within range
+
+    Every entity on every page in all_transactions_pages is scraped. Each
+    page's list of entities is scraped in pages of rows to
+    '<output_directory>/<page>-entities' (see paged_scrape), so a run that is
+    interrupted resumes from the rows already scraped. The directory is
+    removed once the page's tables are saved, so the next run scrapes the
+    entities again.
+
+    Args:
+        start_year: earliest year to include scraped data, inclusive
+        end_year: last year to include scraped data, inclusive
+        output_directory: directory to save the scraped tables to. Defaults
+            to 'data/raw/AZ2'
+        client: client to send requests with, which sets how many are sent
+            concurrently and how fast. Defaults to a ScrapeClient caching
+            responses in an HTTPCache
+        page_size: number of entities requested at a time
+    """
     if output_directory is None:
         output_directory = BASE_FILEPATH / "data" / "raw" / "AZ2"
-        output_directory.mkdir(parents=True, exist_ok=True)
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
     for page in AZ_pages_dict:
         formatted_page = page.replace("/", "-").replace(" ", "-")
         if AZ_pages_dict[page] not in all_transactions_pages:
             continue
-        transaction_data, filer_data = scrape_az_page_data(page, start_year, end_year)
+        entities_directory = output_directory / f"{formatted_page}-entities"
+        transaction_data, filer_data = scrape_az_page_data(
+            page,
+            start_year,
+            end_year,
+            client=client,
+            entities_directory=entities_directory,
+            page_size=page_size,
+        )
         transaction_data.to_csv(output_directory / f"{formatted_page}-transactions.csv")
         filer_data.to_csv(output_directory / f"{formatted_page}-details.csv")
+        shutil.rmtree(entities_directory)
 
 
 def scrape_az_page_data(
     page: str,
     start_year: int = 2023,
     end_year: int = 2023,
+    client: ScrapeClient = None,
+    entities_directory: Path = None,
+    page_size: int = AZ_PAGE_SIZE,
 ) -> pd.DataFrame:
     """Scrape data from arizona database at https://seethemoney.az.gov/
 
@@ -109,6 +163,13 @@ def scrape_az_page_data(
             Arizona dataset, excluding the Name page.
         start_year: earliest year to include scraped data, inclusive
         end_year: last year to include scraped data, inclusive
+        client: client to send requests with. Defaults to a ScrapeClient
+            caching responses in an HTTPCache
+        entities_directory: if given, the entities of a detailed page are
+            scraped page_size rows at a time into this directory with
+            paged_scrape, resuming a previous scrape left there. Otherwise
+            they are scraped in one request
+        page_size: number of entities requested at a time
 
     Returns: two pandas dataframes and two lists. The first dataframe
     contains the requested transactions data. The following two lists
@@ -119,17 +180,30 @@ def scrape_az_page_data(
 
     # page is a basic type, showing entity information
     if page < BASIC_TYPE_PAGE:
-        return scrape_wrapper(page, start_year, end_year)
+        return scrape_wrapper(page, start_year, end_year, client=client)
     elif page == NAME_INFO_PAGE:
         raise ValueError("'Name' endpoint unimplemented")
     # page is detailed, showing transaction information. Get relevant entity
     # information first and then get transaction details for each entity
     else:
         base_page = get_base_page_code(page)
-        agg_df = scrape_wrapper(base_page, start_year, end_year)
+        if entities_directory is None:
+            agg_df = scrape_wrapper(base_page, start_year, end_year, client=client)
+        else:
+            paged_scrape_wrapper(
+                base_page,
+                start_year,
+                end_year,
+                entities_directory,
+                page_size=page_size,
+                client=client,
+            )
+            agg_df = read_parquet_parts(entities_directory)
         entities = agg_df["EntityID"]
 
-        return detailed_scrape_wrapper(entities, page, start_year, end_year)
+        return detailed_scrape_wrapper(
+            entities, page, start_year, end_year, client=client
+        )
 
 
 def get_base_page_code(page: int) -> int:
@@ -145,7 +219,9 @@ def get_base_page_code(page: int) -> int:
     return int(str(page)[0]) - 1
 
 
-def scrape_wrapper(page: int, start_year: int, end_year: int) -> pd.DataFrame:
+def scrape_wrapper(
+    page: int, start_year: int, end_year: int, client: ScrapeClient = None
+) -> pd.DataFrame:
     """Create parameters and scrape an aggregate table
 
     This function is called by az_wrapper() to create the parameters and
@@ -158,14 +234,16 @@ def scrape_wrapper(page: int, start_year: int, end_year: int) -> pd.DataFrame:
             Individual Contributions, etc. Refer to AZ_pages_dict
         start_year: earliest year to include scraped data, inclusive
         end_year: last year to include scraped data, inclusive
+        client: client to send requests with. Defaults to a ScrapeClient
+            caching responses in an HTTPCache
 
     Returns: a pandas dataframe containing the table data for
     the selected timeframe
     """
-    if page < BASIC_TYPE_PAGE:
+    if page >= BASIC_TYPE_PAGE:
         raise ValueError(f"Page should be less than 10, was {page}")
     params = parametrize(page, start_year, end_year)
-    res = scrape(BASE_ENDPOINT, params)
+    res = scrape(BASE_ENDPOINT, params, client=client)
     results = res.json()
     raw_table = pd.DataFrame(data=results["data"])
     raw_table = raw_table.reset_index().drop(columns={"index"})
@@ -173,13 +251,130 @@ def scrape_wrapper(page: int, start_year: int, end_year: int) -> pd.DataFrame:
     return raw_table
 
 
+def paged_scrape_wrapper(
+    page: int,
+    start_year: int,
+    end_year: int,
+    output_directory: Path,
+    page_size: int = AZ_PAGE_SIZE,
+    client: ScrapeClient = None,
+) -> Path:
+    """Create parameters and scrape an aggregate table in pages of rows
+
+    Paged version of scrape_wrapper() for tables too large to hold in one
+    response, see paged_scrape().
+
+    Args:
+        page: the one-digit number representing one of the eight
+            basic pages in the arizona dataset. Refer to AZ_pages_dict
+        start_year: earliest year to include scraped data, inclusive
+        end_year: last year to include scraped data, inclusive
+        output_directory: directory to write the table's part files to
+        page_size: number of rows requested at a time
+        client: client to send requests with. Defaults to a ScrapeClient
+            caching responses in an HTTPCache
+
+    Returns: output_directory, holding the table as Parquet part files
+    """
+    if page >= BASIC_TYPE_PAGE:
+        raise ValueError(f"Page should be less than 10, was {page}")
+    params = parametrize(page, start_year, end_year)
+    return paged_scrape(BASE_ENDPOINT, params, output_directory, page_size, client)
+
+
+def paged_scrape(
+    endpoint: str,
+    params: dict,
+    output_directory: Path,
+    page_size: int = AZ_PAGE_SIZE,
+    client: ScrapeClient = None,
+) -> Path:
+    """Scrape a table a page of rows at a time into Parquet part files
+
+    Walks the table in windows of page_size rows, using the 'start' and
+    'length' search fields and the matching 'TablePage' and 'TableLength'
+    parameters. Each page is parsed and written to output_directory as soon as
+    it arrives (see utils.transform.storage.append_parquet_part), so only one
+    page is held in memory. The table is complete once a page has fewer than
+    page_size rows.
+
+    Scraping again after a failure resumes from the first page not written
+    yet, and scraping a complete table again sends no requests. The scrape's
+    parameters are saved in output_directory, which can't be resumed with
+    different ones.
+
+    Args:
+        endpoint: which of the seethemoney endpoints to call
+        params: created from parametrize() or detailed_parametrize()
+        output_directory: directory to write the table's part files to
+        page_size: number of rows requested at a time
+        client: client to send requests with. Defaults to a ScrapeClient
+            caching responses in an HTTPCache
+
+    Returns: output_directory, holding the table as Parquet part files. Read
+        them with utils.transform.storage.read_parquet_parts
+    """
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    state_path = output_directory / SCRAPE_STATE_FILENAME
+    state = {
+        "endpoint": endpoint,
+        "params": params,
+        "page_size": page_size,
+        "complete": False,
+    }
+    if state_path.exists():
+        with state_path.open() as f:
+            saved_state = json.load(f)
+        if {**saved_state, "complete": False} != state:
+            raise ValueError(
+                f"{output_directory} holds a scrape with different parameters"
+            )
+        state = saved_state
+    else:
+        with state_path.open("w") as f:
+            json.dump(state, f)
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
+
+    # parts are only written once complete, so they count the pages done
+    page_number = len(list(output_directory.glob("part-*.parquet")))
+    while not state["complete"]:
+        page_params = {
+            **params,
+            "TablePage": str(page_number + 1),
+            "TableLength": str(page_size),
+        }
+        page_data = {
+            **AZ_SEARCH_DATA,
+            "start": str(page_number * page_size),
+            "length": str(page_size),
+        }
+        res = scrape(endpoint, page_params, data=page_data, client=client)
+        rows = res.json()["data"]
+        if rows:
+            append_parquet_part(pd.DataFrame(data=rows), output_directory)
+            page_number += 1
+        if len(rows) < page_size:
+            state["complete"] = True
+            with state_path.open("w") as f:
+                json.dump(state, f)
+
+    return output_directory
+
+
 def get_keys_from_value(d: dict, val: Any) -> str:  # noqa ANN401
     """Returns first key from dict with value 'val'"""
     return [k for k, v in d.items() if v == val][0]
 
 
 def detailed_scrape_wrapper(
-    entities: pd.core.series.Series, page: int, start_year: int, end_year: int
+    entities: pd.core.series.Series,
+    page: int,
+    start_year: int,
+    end_year: int,
+    max_entities: int | None = None,
+    client: ScrapeClient = None,
 ) -> pd.DataFrame:
     """Create parameters and scrape an aggregate table
 
@@ -187,66 +382,76 @@ def detailed_scrape_wrapper(
     call the detailed scraper for a certain detailed page. To scrape the
     basic pages, use scrape_wrapper() instead.
 
+    Entities are scraped concurrently by the client, and their tables are
+    assembled in the order of entities.
+
     Args: page: the two-digit number representing a sub-page of
     one of the eight basic pages, such as Candidates/Income,
     PAC/All Transactions, etc. Refer to AZ_pages_dict
+    entities: ids of the entities to scrape the transactions of
     start_year: earliest year to include scraped data, inclusive
     end_year: last year to include scraped data, inclusive
+    max_entities: only scrape the first max_entities entities, e.g. to
+    sample a page. Default is to scrape all of them
+    client: client to send requests with. Defaults to a ScrapeClient
+        caching responses in an HTTPCache
 
     Returns: 2 pandas dataframes with transaction information and filer information
     """
-    max_per_entity_type = 10
-    entities = entities[:max_per_entity_type]
-    entity_detail_params = []
-    info_params = []
-
-    for entity in entities:
-        entity_detailed_parameters = detailed_parametrize(
-            entity, page, start_year, end_year
-        )
-        name_details = detailed_parametrize(
-            entity, NAME_INFO_PAGE, start_year, end_year
-        )
-
-        entity_detail_params.append(entity_detailed_parameters)
-        info_params.append(name_details)
-
-    detail_dfs = []
-    info_dfs = []
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
+    entities = list(entities[:max_entities])
 
     entity_type_code = int(str(page)[0]) - 1
 
     entity_type = get_keys_from_value(AZ_pages_dict, entity_type_code)
 
-    for d_param, entity in zip(entity_detail_params, entities):
-        res = scrape(DETAILED_ENDPOINT, d_param)
+    def scrape_entity(entity: str) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+        d_param = detailed_parametrize(entity, page, start_year, end_year)
+        res = scrape(DETAILED_ENDPOINT, d_param, client=client)
         results = res.json()
 
         detail_df = pd.DataFrame(data=results["data"])
         detail_df["retrieved_id"] = entity
         detail_df["entity_type"] = entity_type
 
-        detail_dfs.append(detail_df)
-    for info_param in info_params:
-        info = scrape(INFO_ENDPOINT, info_param)
+        info_param = detailed_parametrize(entity, NAME_INFO_PAGE, start_year, end_year)
+        info = scrape(INFO_ENDPOINT, info_param, client=client)
         info_table = info.json()
         if info_table == "":
-            continue
-        info_dfs.append(pd.DataFrame(data=info_table)[["ReportFilerInfo"]])
+            return detail_df, None
+        return detail_df, pd.DataFrame(data=info_table)[["ReportFilerInfo"]]
+
+    entity_tables = client.map(scrape_entity, entities)
+    detail_dfs = [detail_df for detail_df, _ in entity_tables]
+    info_dfs = [info_df for _, info_df in entity_tables if info_df is not None]
+    # entities without filer information have no row in the info table
+    info_entities = [
+        entity
+        for entity, (_, info_df) in zip(entities, entity_tables)
+        if info_df is not None
+    ]
 
-    info_complete = info_process(
-        pd.concat(info_dfs).reset_index().drop(columns={"index"})
-    )
-    info_complete["retrieved_id"] = entities
+    if not detail_dfs:
+        return pd.DataFrame(), pd.DataFrame(columns=["retrieved_id", "entity_type"])
+    if info_dfs:
+        info_complete = info_process(pd.concat(info_dfs, ignore_index=True))
+    else:
+        info_complete = pd.DataFrame()
+    info_complete["retrieved_id"] = info_entities
     info_complete["entity_type"] = entity_type
     return (
-        pd.concat(detail_dfs).reset_index().drop(columns={"index"}),
+        pd.concat(detail_dfs, ignore_index=True),
         info_complete,
     )
 
 
 def scrape(
-    endpoint: str, params: dict, headers: dict = None, data: dict = None
+    endpoint: str,
+    params: dict,
+    headers: dict = None,
+    data: dict = None,
+    client: ScrapeClient = None,
 ) -> requests.models.Response:
     """Scrape a table from the main arizona site
 
@@ -265,6 +470,8 @@ def scrape(
             attached Pages dictionary for details.
         headers: headers for https post, standard defaults provided
         data: data for https post, defaults defined as constant
+        client: client to send the request with, retrying failures.
+            Defaults to a ScrapeClient caching responses in an HTTPCache
 
     returns: request response containing aggregate information
     """
@@ -272,13 +479,14 @@ def scrape(
         headers = AZ_HEADER
     if data is None:
         data = AZ_SEARCH_DATA
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
 
-    return requests.post(
+    return client.post(
         f"{BASE_URL}/{endpoint}",
         params=params,
         headers=headers,
         data=data,
-        timeout=MAX_TIMEOUT,
     )
 
 
@@ -0,0 +1,176 @@
+"""On-disk cache of HTTP responses, revalidated with conditional requests
+
+A ScrapeClient with an HTTPCache stores every successful response that has an
+ETag or Last-Modified header. When the same request (same method, URL and
+body) is sent again, the client asks the server whether the stored response is
+still current with If-None-Match / If-Modified-Since, and a 304 Not Modified
+reply is answered from the cache without downloading the body again.
+
+The cache directory is bounded in size: once it holds more than max_bytes of
+response bodies, the least recently used responses are evicted.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.constants import BASE_FILEPATH
+from utils.scrape.constants import HTTP_CACHE_MAX_BYTES
+
+
+class HTTPCache:
+    """Size-bounded, least recently used cache of HTTP responses on disk"""
+
+    def __init__(
+        self, directory: str | Path = None, max_bytes: int = HTTP_CACHE_MAX_BYTES
+    ) -> None:
+        """Creates a cache in a directory, reusing any responses already there
+
+        Args:
+            directory: directory to store responses in. Defaults to
+                'output/http_cache' in the repo root
+            max_bytes: most bytes of response bodies to keep
+        """
+        if directory is None:
+            directory = BASE_FILEPATH / "output" / "http_cache"
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str, body: bytes | str | None = None) -> str:
+        """Key of a request in the cache
+
+        Args:
+            method: HTTP method of the request
+            url: full URL of the request, including query parameters
+            body: body of the request, if any
+
+        Returns: hex digest identifying the request
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        digest = hashlib.sha256(f"{method.upper()} {url}\n".encode())
+        digest.update(body or b"")
+        return digest.hexdigest()
+
+    def body_path(self, key: str) -> Path:
+        """File holding the body of a cached response"""
+        return self.directory / f"{key}.body"
+
+    def metadata_path(self, key: str) -> Path:
+        """File holding the status, headers and validators of a cached response"""
+        return self.directory / f"{key}.json"
+
+    def validators(self, key: str) -> dict | None:
+        """Conditional request headers to revalidate a cached response with
+
+        Args:
+            key: key of the request, see key()
+
+        Returns: If-None-Match and/or If-Modified-Since headers, or None if
+            the request has no cached response
+        """
+        metadata = self.read_metadata(key)
+        if metadata is None:
+            return None
+        headers = {}
+        if metadata["etag"] is not None:
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata["last_modified"] is not None:
+            headers["If-Modified-Since"] = metadata["last_modified"]
+        return headers
+
+    def read_metadata(self, key: str) -> dict | None:
+        """Reads the metadata of a cached response, None if there is none"""
+        metadata_path = self.metadata_path(key)
+        if not (metadata_path.exists() and self.body_path(key).exists()):
+            return None
+        with metadata_path.open() as f:
+            return json.load(f)
+
+    def store(self, key: str, response: requests.Response) -> None:
+        """Caches a response if it can be revalidated later
+
+        Responses without an ETag or Last-Modified header are not stored,
+        since the server could not tell whether they are still current.
+
+        Args:
+            key: key of the request, see key()
+            response: successful response to the request
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return
+        metadata = {
+            "url": response.url,
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "encoding": response.encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        self.write_file(self.body_path(key), response.content)
+        self.write_file(self.metadata_path(key), json.dumps(metadata).encode())
+        self.evict()
+
+    def revalidated(
+        self, key: str, not_modified_response: requests.Response
+    ) -> requests.Response:
+        """Returns the cached response the server confirmed is still current
+
+        Validators sent with the 304 reply replace the stored ones.
+
+        Args:
+            key: key of the request, see key()
+            not_modified_response: the server's 304 Not Modified reply
+
+        Returns: the cached response, as a requests Response
+        """
+        metadata = self.read_metadata(key)
+        for header, field in [("ETag", "etag"), ("Last-Modified", "last_modified")]:
+            if header in not_modified_response.headers:
+                metadata["headers"][header] = not_modified_response.headers[header]
+                metadata[field] = not_modified_response.headers[header]
+        self.write_file(self.metadata_path(key), json.dumps(metadata).encode())
+
+        body_path = self.body_path(key)
+        # marks the response as recently used
+        body_path.touch()
+        response = requests.Response()
+        response.status_code = metadata["status_code"]
+        response.headers = CaseInsensitiveDict(metadata["headers"])
+        response.encoding = metadata["encoding"]
+        response.url = metadata["url"]
+        response.request = not_modified_response.request
+        response._content = body_path.read_bytes()
+        response.from_cache = True
+        return response
+
+    def write_file(self, path: Path, content: bytes) -> None:
+        """Writes a cache file through a temporary file, so it is never partial"""
+        temporary_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        temporary_path.write_bytes(content)
+        temporary_path.replace(path)
+
+    def evict(self) -> None:
+        """Deletes the least recently used responses until under max_bytes"""
+        with self._lock:
+            body_stats = [
+                (body_path, body_path.stat())
+                for body_path in self.directory.glob("*.body")
+            ]
+            total_bytes = sum(stat.st_size for _, stat in body_stats)
+            body_stats.sort(key=lambda body_stat: body_stat[1].st_mtime)
+            for body_path, stat in body_stats:
+                if total_bytes <= self.max_bytes:
+                    break
+                self.metadata_path(body_path.stem).unlink(missing_ok=True)
+                body_path.unlink(missing_ok=True)
+                total_bytes -= stat.st_size
@@ -0,0 +1,391 @@
+"""Concurrent, rate limited HTTP requests shared by the state scrapers
+
+A ScrapeClient sends requests from a bounded thread pool. Every request first
+takes a token from a TokenBucket shared by all threads, so the client never
+sends more than `rate` requests per second on average (with bursts of up to
+`burst` requests). Connection errors, timeouts and retryable statuses (e.g.
+429 Too Many Requests) are retried with exponential backoff, honoring any
+Retry-After header. ScrapeClient.map returns results in the order of its
+inputs, whatever order the requests complete in.
+
+A client given a utils.scrape.cache.HTTPCache revalidates responses it has
+already downloaded with conditional requests instead of downloading them again.
+
+Large files are downloaded with ScrapeClient.download, which streams them to
+disk, resumes interrupted downloads and keeps files that have not changed.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+
+import requests
+
+from utils.scrape.cache import HTTPCache
+from utils.scrape.constants import (
+    DOWNLOAD_CHUNK_BYTES,
+    HEADERS,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_RETRIES,
+    MAX_TIMEOUT,
+    REQUESTS_PER_SECOND,
+    RETRY_BACKOFF_SECONDS,
+    RETRY_STATUS_CODES,
+)
+
+
+class IncompleteDownloadError(requests.RequestException):
+    """A download ended before the server's reported size was received"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often an action happens"""
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        """Creates a full bucket
+
+        Args:
+            rate: tokens added to the bucket per second
+            capacity: most tokens the bucket holds, i.e. the largest burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Takes a token from the bucket, waiting until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class ScrapeClient:
+    """Sends HTTP requests concurrently, with rate limiting and retries"""
+
+    def __init__(
+        self,
+        max_workers: int = MAX_CONCURRENT_REQUESTS,
+        rate: float = REQUESTS_PER_SECOND,
+        burst: int | None = None,
+        retries: int = MAX_RETRIES,
+        backoff: float = RETRY_BACKOFF_SECONDS,
+        timeout: float = MAX_TIMEOUT,
+        cache: HTTPCache | None = None,
+    ) -> None:
+        """Creates a client
+
+        Args:
+            max_workers: most requests in flight at the same time
+            rate: most requests sent per second, on average
+            burst: most requests sent at once after the client was idle.
+                Defaults to max_workers
+            retries: times a failed request is retried before giving up
+            backoff: seconds to wait before the first retry. The wait doubles
+                with every further retry
+            timeout: seconds to wait for a server's response
+            cache: cache to store responses in and revalidate them from.
+                Responses are not cached by default
+        """
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(rate, max_workers if burst is None else burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        # requests sessions are not guaranteed to be thread-safe, so each
+        # thread keeps its own connection pool
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """The requests session of the calling thread"""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def retry_delay(self, attempt: int, response: requests.Response = None) -> float:
+        """Seconds to wait before retrying a request
+
+        Args:
+            attempt: number of the failed attempt, starting from 0
+            response: the failed response, if the server responded
+
+        Returns: the server's Retry-After seconds if given, otherwise
+            exponential backoff
+        """
+        retry_after = None if response is None else response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Sends a request, waiting for the rate limit and retrying failures
+
+        With a cache, a request whose response is cached is sent as a
+        conditional request, and if the server answers 304 Not Modified the
+        cached response is returned (with a from_cache attribute set to True).
+        Streamed responses are never cached.
+
+        Args:
+            method: HTTP method, e.g. 'POST'
+            url: URL to send the request to
+            **kwargs: passed on to requests.Session.request, e.g. params
+
+        Returns: the response
+
+        Raises:
+            requests.HTTPError: if the response still has a retryable status
+                after all retries
+            requests.ConnectionError, requests.Timeout: if the last retry
+                failed to connect or timed out
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cache is None or kwargs.get("stream"):
+            return self.send(method, url, **kwargs)
+
+        prepared = requests.Request(
+            method,
+            url,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            json=kwargs.get("json"),
+        ).prepare()
+        cache_key = self.cache.key(prepared.method, prepared.url, prepared.body)
+        validators = self.cache.validators(cache_key)
+        if validators is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **validators}
+        response = self.send(method, url, **kwargs)
+        if response.status_code == HTTPStatus.NOT_MODIFIED and validators is not None:
+            return self.cache.revalidated(cache_key, response)
+        if response.status_code == HTTPStatus.OK:
+            self.cache.store(cache_key, response)
+        return response
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Sends a request without the cache, see request"""
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if attempt == self.retries:
+                response.raise_for_status()
+            delay = self.retry_delay(attempt, response)
+            # returns the connection to the pool before the next attempt
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Sends a POST request, see request"""
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Sends a GET request, see request"""
+        return self.request("GET", url, **kwargs)
+
+    def download(
+        self, url: str, path: str | Path, chunk_size: int = DOWNLOAD_CHUNK_BYTES
+    ) -> bool:
+        """Streams a file to disk, resuming partial downloads
+
+        The file is written to '<path>.part' a chunk at a time and moved to
+        path once it has the size the server reported, so path never holds a
+        partial file. A download interrupted by a connection error is resumed
+        from the end of the partial file with a Range request, up to retries
+        times, and again by the next call. If-Range makes the server send the
+        whole file instead if it changed in the meantime.
+
+        The size, SHA-256 checksum and validators (ETag and Last-Modified) of
+        a complete download are saved in '<path>.json'. Downloading it again
+        sends a conditional request, and the file is kept if the server
+        answers 304 Not Modified and the file still has its size and checksum.
+        A file the server gave no validators for is kept if a HEAD request
+        reports the same size.
+
+        Args:
+            url: URL of the file
+            path: where to save the file
+            chunk_size: bytes read and written at a time
+
+        Returns: whether the file was downloaded, False if it was unchanged
+
+        Raises:
+            requests.HTTPError: if the server responds with an error
+            requests.RequestException: if the download still fails after all
+                retries, e.g. IncompleteDownloadError
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for attempt in range(self.retries + 1):
+            try:
+                return self.download_once(url, path, chunk_size)
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                IncompleteDownloadError,
+            ):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay(attempt))
+        return True
+
+    def download_once(self, url: str, path: Path, chunk_size: int) -> bool:
+        """Sends one request of a download, see download"""
+        metadata_path = path.with_name(f"{path.name}.json")
+        partial_path = path.with_name(f"{path.name}.part")
+        partial_metadata_path = path.with_name(f"{path.name}.part.json")
+        # sizes only match the server's if the file is not compressed in transit
+        headers = {**HEADERS, "Accept-Encoding": "identity"}
+
+        metadata = read_json(metadata_path)
+        if metadata is not None and not file_matches(path, metadata, chunk_size):
+            metadata = None
+        partial_metadata = read_json(partial_metadata_path)
+        partial_size = 0
+        if metadata is not None and not (metadata["etag"] or metadata["last_modified"]):
+            # without validators, an unchanged size is all there is to go on
+            with self.send("HEAD", url, headers=headers, timeout=self.timeout) as head:
+                if head.ok and head.headers.get("Content-Length") == str(
+                    metadata["size"]
+                ):
+                    return False
+        elif metadata is not None:
+            for header, field in [
+                ("If-None-Match", "etag"),
+                ("If-Modified-Since", "last_modified"),
+            ]:
+                if metadata[field] is not None:
+                    headers[header] = metadata[field]
+        elif partial_metadata is not None and partial_path.exists():
+            partial_size = partial_path.stat().st_size
+            if partial_size == partial_metadata["size"]:
+                return self.complete_download(path, partial_metadata, chunk_size)
+            etag = partial_metadata["etag"]
+            # weak ETags can't validate byte ranges
+            validator = (
+                etag
+                if etag is not None and not etag.startswith("W/")
+                else partial_metadata["last_modified"]
+            )
+            if validator is not None:
+                headers["Range"] = f"bytes={partial_size}-"
+                headers["If-Range"] = validator
+
+        with self.send(
+            "GET", url, headers=headers, stream=True, timeout=self.timeout
+        ) as response:
+            if response.status_code == HTTPStatus.NOT_MODIFIED and metadata:
+                return False
+            resumed_at = response.headers.get("Content-Range", "").partition("-")[0]
+            if response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE or (
+                response.status_code == HTTPStatus.PARTIAL_CONTENT
+                and resumed_at != f"bytes {partial_size}"
+            ):
+                # the partial file can't be resumed, so start it again
+                partial_path.unlink(missing_ok=True)
+                partial_metadata_path.unlink(missing_ok=True)
+                raise IncompleteDownloadError(f"{url} could not be resumed")
+            response.raise_for_status()
+            if response.status_code == HTTPStatus.PARTIAL_CONTENT:
+                mode = "ab"
+            else:
+                mode = "wb"
+                content_length = response.headers.get("Content-Length")
+                partial_metadata = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "size": None if content_length is None else int(content_length),
+                }
+                partial_metadata_path.write_text(json.dumps(partial_metadata))
+            with partial_path.open(mode) as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+
+        partial_size = partial_path.stat().st_size
+        if partial_metadata["size"] not in (None, partial_size):
+            raise IncompleteDownloadError(
+                f"{url} ended after {partial_size} of"
+                f" {partial_metadata['size']} bytes"
+            )
+        return self.complete_download(path, partial_metadata, chunk_size)
+
+    def complete_download(
+        self, path: Path, partial_metadata: dict, chunk_size: int
+    ) -> bool:
+        """Moves a complete partial download to path, saving its metadata"""
+        partial_path = path.with_name(f"{path.name}.part")
+        metadata = {
+            **partial_metadata,
+            "size": partial_path.stat().st_size,
+            "sha256": file_sha256(partial_path, chunk_size),
+        }
+        partial_path.replace(path)
+        path.with_name(f"{path.name}.json").write_text(json.dumps(metadata))
+        path.with_name(f"{path.name}.part.json").unlink()
+        return True
+
+    def map(self, function: Callable, items: Iterable) -> list:
+        """Calls function on each item concurrently, up to max_workers at once
+
+        Args:
+            function: function of one item, usually sending requests with
+                this client
+            items: items to call function on
+
+        Returns: function's result for each item, in the order of items
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
+
+
+def read_json(path: Path) -> dict | None:
+    """Reads a JSON file, None if it does not exist"""
+    if not path.exists():
+        return None
+    with path.open() as f:
+        return json.load(f)
+
+
+def file_sha256(path: Path, chunk_size: int = DOWNLOAD_CHUNK_BYTES) -> str:
+    """SHA-256 hex digest of a file, read a chunk at a time"""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_matches(
+    path: Path, metadata: dict, chunk_size: int = DOWNLOAD_CHUNK_BYTES
+) -> bool:
+    """Whether a file exists with the size and checksum saved by download"""
+    return (
+        path.exists()
+        and path.stat().st_size == metadata["size"]
+        and file_sha256(path, chunk_size) == metadata["sha256"]
+    )
@@ -7,6 +7,18 @@ USER_AGENT = (
 HEADERS = {"User-Agent": USER_AGENT}
 MAX_TIMEOUT = 10
 
+# limits of utils.scrape.client.ScrapeClient, so scrapers are polite to servers
+MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_PER_SECOND = 5
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+# too many requests, and server errors that tend to be temporary
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# most bytes of responses kept by utils.scrape.cache.HTTPCache
+HTTP_CACHE_MAX_BYTES = 4 * 2**30
+# bytes of a streamed download read and written at a time
+DOWNLOAD_CHUNK_BYTES = 2**20
+
 AZ_pages_dict = {
     "Candidate": 1,
     "PAC": 2,
@@ -2,36 +2,74 @@
 
 import datetime
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
-from io import BytesIO
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlparse
 from zipfile import ZipFile
 
 import requests
 from bs4 import BeautifulSoup
 
-from utils.scrape.constants import HEADERS, MAX_TIMEOUT
+from utils.constants import BASE_FILEPATH
+from utils.scrape.cache import HTTPCache
+from utils.scrape.client import ScrapeClient
+from utils.scrape.constants import HEADERS
 from utils.transform.constants import MI_CON_FILEPATH, MI_EXP_FILEPATH
 
 MI_SOS_URL = "https://miboecfr.nictusa.com/cfr/dumpall/cfrdetail/"
 
 
-def scrape_and_download_mi_data() -> None:
+def scrape_and_download_mi_data(
+    client: ScrapeClient = None, archive_directory: Path = None
+) -> None:
     """Scrapes and Downloads MI data
 
     Web scraper that navigates to the MI Secretary of State page and downloads
     the contribution and expenditure data and README
+
+    The zip archives are downloaded concurrently and streamed to
+    archive_directory. An archive whose ETag, or size if it has none, has not
+    changed since it was last downloaded is skipped, and is only extracted
+    again if its file is missing. Archives are extracted concurrently.
+
+    Inputs: client (ScrapeClient): client to send requests with, which sets
+            how many archives are downloaded and extracted at once. Defaults
+            to a ScrapeClient caching responses in an HTTPCache
+            archive_directory (Path): directory to keep the downloaded
+            archives in. Defaults to 'output/downloads/MI'
     """
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
+    if archive_directory is None:
+        archive_directory = BASE_FILEPATH / "output" / "downloads" / "MI"
     create_directory()
     year_lst = get_year_range()
-    contribution_urls, expenditure_urls = capture_data(year_lst)
-
-    for url in contribution_urls:
-        make_request(url)
+    contribution_urls, expenditure_urls = capture_data(year_lst, client)
+
+    urls = contribution_urls + expenditure_urls
+    directories = [MI_CON_FILEPATH for _ in contribution_urls] + [
+        MI_EXP_FILEPATH for _ in expenditure_urls
+    ]
+
+    def download_archive(url: str) -> tuple[Path, bool] | None:
+        """Downloads an archive, None if it failed"""
+        try:
+            return make_request(url, client, archive_directory)
+        except requests.RequestException as e:
+            print(f"Failed to retrieve {url}: {e}")
+            return None
+
+    def extract_archive(archive: tuple[Path, bool] | None, directory: Path) -> None:
+        """Extracts a downloaded archive, if it was downloaded"""
+        if archive is not None:
+            archive_path, changed = archive
+            unzip_file(archive_path, directory, overwrite=changed)
+
+    archives = client.map(download_archive, urls)
+    with ThreadPoolExecutor(max_workers=client.max_workers) as executor:
+        list(executor.map(extract_archive, archives, directories))
     print("Michigan Campaign Contribution Data Downloaded")
-
-    for url in expenditure_urls:
-        make_request(url)
     print("Michigan Campaign Expenditure Data Downloaded")
 
 
@@ -42,24 +80,28 @@ def get_year_range() -> list:
 
     Returns: year_range (lst): Range of years to pull
     """
-    current_year = datetime.now().year
+    current_year = datetime.datetime.now().year
     year_range = list(range(2018, current_year + 1))
 
     return year_range
 
 
-def capture_data(year_lst: list) -> tuple[list, list]:
+def capture_data(year_lst: list, client: ScrapeClient = None) -> tuple[list, list]:
     """Makes a request and saves the urls directly to the MI  data
 
     Inputs: year_lst: list of years to capture data from
+            client (ScrapeClient): client to send the request with. Defaults
+            to a ScrapeClient caching responses in an HTTPCache
 
     Returns: (contribution_urls, expenditure_urls) (tuple): tuple with two
             lists of urls to MI data
     """
+    if client is None:
+        client = ScrapeClient(cache=HTTPCache())
     contribution_urls = []
     expenditure_urls = []
 
-    response = requests.get(MI_SOS_URL, headers=HEADERS, timeout=MAX_TIMEOUT)
+    response = client.get(MI_SOS_URL, headers=HEADERS)
     if response.status_code == HTTPStatus.OK:
         # create beautiful soup object to parse the table for contributions
         soup = BeautifulSoup(response.content, "html.parser")
@@ -87,61 +129,68 @@ def capture_data(year_lst: list) -> tuple[list, list]:
     return (contribution_urls, expenditure_urls)
 
 
-def make_request(url: str) -> None:
-    """Make a request and download the campaign contributions zip files
+def make_request(
+    url: str, client: ScrapeClient = None, archive_directory: Path = None
+) -> tuple[Path, bool]:
+    """Make a request and download a campaign finance zip file to disk
 
     Inputs: url (str): URL to the MI campaign zip file
+            client (ScrapeClient): client to send the request with. Defaults
+            to a ScrapeClient()
+            archive_directory (Path): directory to save the zip file in.
+            Defaults to 'output/downloads/MI'
 
-    Returns: zip_file (io.BytesIO): An in-memory ZIP file as a BytesIO stream
+    Returns: (archive_path, changed) (tuple): path to the zip file, and
+            whether it was downloaded (False if it was unchanged)
     """
-    response = requests.get(url, headers=HEADERS, timeout=MAX_TIMEOUT)
-
-    if response.status_code == HTTPStatus.OK and "contribution" in url:
-        zip_file = BytesIO(response.content)
-        unzip_file(zip_file, MI_CON_FILEPATH)
-    elif response.status_code == HTTPStatus.OK and "expenditure" in url:
-        zip_file = BytesIO(response.content)
-        unzip_file(zip_file, MI_EXP_FILEPATH)
-
-    else:
-        print(f"Failed to retrieve page. Status code: {response.status_code}")
+    if client is None:
+        client = ScrapeClient()
+    if archive_directory is None:
+        archive_directory = BASE_FILEPATH / "output" / "downloads" / "MI"
+    archive_path = Path(archive_directory) / PurePosixPath(urlparse(url).path).name
+    changed = client.download(url, archive_path)
+    return archive_path, changed
 
 
-def unzip_file(zip_file: BytesIO, directory: str) -> None:
+def unzip_file(zip_file: Path, directory: str, overwrite: bool = True) -> None:
     """Unzips the zip file and reads the file into the directory
 
-    Inputs: zipfile (io.BytesIO): An in-memory ZIP file as a BytesIO stream
+    The file is streamed out of the archive, and only replaces the file in
+    directory once it is completely extracted.
+
+    Inputs: zip_file (Path): path to a downloaded ZIP file
             directory (str): directory for the files to be saved
+            overwrite (bool): whether to replace the file if it was already
+            extracted
 
     Returns: None
     """
     with ZipFile(zip_file, "r") as zip_reference:
         file_name = zip_reference.namelist()[0]
-        with zip_reference.open(file_name) as target_zip_file:
-            content = target_zip_file.read()
-            target_zip_file_path = Path(directory) / file_name
-            with target_zip_file_path.open("wb") as f:
-                f.write(content)
+        target_zip_file_path = Path(directory) / file_name
+        if target_zip_file_path.exists() and not overwrite:
+            return
+        # outside of directory, so a partial file is never read as MI data
+        temporary_path = Path(zip_file).with_name(f"{Path(zip_file).name}.extracting")
+        with (
+            zip_reference.open(file_name) as target_zip_file,
+            temporary_path.open("wb") as f,
+        ):
+            shutil.copyfileobj(target_zip_file, f)
+        shutil.move(temporary_path, target_zip_file_path)
 
     print(f"Extracted and saved: {file_name}")
 
 
 def create_directory() -> None:
-    """Creates the directory for the MI contributions data
+    """Creates the directories for the MI contributions and expenditures data
 
-    Inputs: FILEPATH (str): filepath to the directory
+    Existing directories are kept, so unchanged files are not extracted again.
     """
     FILEPATHS = [MI_CON_FILEPATH, MI_EXP_FILEPATH]
 
     for path in FILEPATHS:
-        if path.exists():
-            # remove existing MI campaign data
-            shutil.rmtree(path)
-            print(f"Deleted existing directory: {path}")
-
-            path.mkdir(parents=True)
-            print(f"Created directory: {path}")
-        else:
+        if not path.exists():
             path.mkdir(parents=True)
             print(f"Created directory: {path}")
 
@@ -1,52 +1,114 @@
-"""This modules provides functions to scrape Pennsylvannia campaign finance data"""
+"""This modules provides functions to scrape Pennsylvannia campaign finance data
 
+Each year's data is a zip archive, downloaded with ScrapeClient.download: the
+archive is streamed to disk in chunks, an interrupted download is resumed with
+a Range request, and an archive that has not changed since the last download
+is not downloaded again. Years are downloaded concurrently, and only the
+contributor, filer, and expenditure files are extracted from each archive.
+"""
+
+import shutil
 import zipfile
-from http import HTTPStatus
-from io import BytesIO
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import requests
 
 from utils.constants import BASE_FILEPATH
+from utils.scrape.client import ScrapeClient
+
+PA_URL = "https://www.dos.pa.gov/VotingElections/CandidatesCommittees/CampaignFinance/Resources/Documents/"  # noqa
+# files of each year read by utils.transform.pennsylvania.PennsylvaniaTransformer
+PA_RAW_FILE_KINDS = ("contrib", "filer", "expense")
 
 
 def download_PA_data(
-    start_year: int, end_year: int, output_directory: Path = None
-) -> None:
+    start_year: int,
+    end_year: int,
+    output_directory: Path = None,
+    client: ScrapeClient = None,
+    archive_directory: Path = None,
+) -> list[int]:
     """Downloads PA datasets from specified years to a local directory
 
+    A year that fails to download is reported and skipped, and downloading
+    again resumes it.
+
     Args:
         start_year: The first year in the range of desired years to extract data
         end_year: The last year in the range of desired years to extract data.
         output_directory: desired output location. Defaults to 'data/raw/PA'
+        client: client to send requests with, which sets how many years are
+            downloaded concurrently. Defaults to a ScrapeClient()
+        archive_directory: directory to keep the downloaded archives in.
+            Defaults to 'output/downloads/PA'
     Modifies:
         Saves raw files from dos.pa.gov to output_directory with a separate directory
         for each year's files.
+
+    Returns: the years that were downloaded
     """
     if output_directory is None:
         output_directory = BASE_FILEPATH / "data" / "raw" / "PA"
-
     else:
         output_directory = Path(output_directory).resolve()
-    pa_url = "https://www.dos.pa.gov/VotingElections/CandidatesCommittees/CampaignFinance/Resources/Documents/"  # noqa
-
-    for year in range(start_year, end_year + 1):
-        link = f"{pa_url}{year}.zip"
-
-        response = requests.get(link, timeout=10)
-        if response.status_code != HTTPStatus.OK:
-            print(f"Pennsylvania data from {year} returned {response.reason}")
-
-        year_directory = output_directory / str(year)
-        year_directory.mkdir(exist_ok=True, parents=True)
-        zippedfiles = zipfile.ZipFile(BytesIO(response.content))
-        for zippedfile in zippedfiles.infolist():
-            # some years have all contents in a single directory named after the
-            # year by default
-            if zippedfile.filename.startswith(f"{year}/"):
-                zippedfiles.extract(zippedfile, output_directory)
-            else:
-                zippedfiles.extract(zippedfile, year_directory)
+    if archive_directory is None:
+        archive_directory = BASE_FILEPATH / "output" / "downloads" / "PA"
+    else:
+        archive_directory = Path(archive_directory)
+    if client is None:
+        client = ScrapeClient()
+
+    def download_year(year: int) -> bool:
+        """Downloads and extracts a year's archive, False if it failed"""
+        archive_path = archive_directory / f"{year}.zip"
+        try:
+            changed = client.download(f"{PA_URL}{year}.zip", archive_path)
+            extract_PA_archive(archive_path, output_directory / str(year), changed)
+        except (requests.RequestException, zipfile.BadZipFile) as e:
+            print(f"Pennsylvania data from {year} could not be downloaded: {e}")
+            return False
+        return True
+
+    years = list(range(start_year, end_year + 1))
+    downloaded = client.map(download_year, years)
+    return [year for year, succeeded in zip(years, downloaded) if succeeded]
+
+
+def extract_PA_archive(
+    archive_path: Path, year_directory: Path, overwrite: bool = True
+) -> None:
+    """Extracts a year's contributor, filer, and expenditure files
+
+    Files are extracted directly into year_directory, including those the
+    archive keeps in a directory named after the year. Reading each file
+    checks its CRC-32 checksum, and a file is only moved into place once it
+    is completely extracted.
+
+    Args:
+        archive_path: path to the year's zip archive
+        year_directory: directory to extract the files to
+        overwrite: whether to replace files already extracted. Otherwise only
+            files missing from year_directory are extracted
+
+    Raises:
+        zipfile.BadZipFile: if the archive or one of its files is corrupt
+    """
+    year_directory.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(archive_path) as archive:
+        for index, member in enumerate(archive.infolist()):
+            file_name = PurePosixPath(member.filename).name
+            if member.is_dir() or not any(
+                kind in PurePosixPath(file_name).stem for kind in PA_RAW_FILE_KINDS
+            ):
+                continue
+            file_path = year_directory / file_name
+            if file_path.exists() and not overwrite:
+                continue
+            # named so the transformer never mistakes it for a raw file
+            temporary_path = year_directory / f".extracting-{index}.tmp"
+            with archive.open(member) as source, temporary_path.open("wb") as target:
+                shutil.copyfileobj(source, target)
+            temporary_path.replace(file_path)
 
 
 if __name__ == "__main__":
@@ -1,20 +1,22 @@
 """Code for cleaning and standardizing raw data retrieved from Arizona.
 
-Inherits from StateTransformer.
+Inherits from PartitionedTransformer.
 """
 
-import uuid
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-from utils.transform.clean import StateTransformer
+from utils.constants import BASE_FILEPATH
+from utils.transform.clean import PartitionedTransformer, StateTransformer
 from utils.transform.constants import (
     AZ_INDIVIDUALS_FILEPATH,
     AZ_ORGANIZATIONS_FILEPATH,
     AZ_TRANSACTIONS_FILEPATH,
     state_abbreviations,
 )
-from utils.transform.utils import convert_date
+from utils.transform.utils import convert_dates
 
 
 def az_name_clean(df: pd.DataFrame) -> pd.DataFrame:
@@ -33,13 +35,8 @@ def az_name_clean(df: pd.DataFrame) -> pd.DataFrame:
     """
     df_working = df.copy()
 
-    df_working["candidate"] = df.apply(
-        lambda row: (
-            row["committee_name"]
-            if (row["candidate"] == ("" or None or "" or """"""))
-            else row["candidate"]
-        ),
-        axis=1,
+    df_working["candidate"] = df["candidate"].where(
+        df["candidate"] != "", df["committee_name"]
     )
 
     return df_working
@@ -70,7 +67,7 @@ def az_transactions_convert(df: pd.DataFrame) -> pd.DataFrame:
 
     trans_df = pd.DataFrame(data=d)
 
-    trans_df = trans_df.apply(az_donor_recipient_director, axis=1)
+    trans_df = az_donor_recipient_director(trans_df)
 
     trans_df = trans_df.drop(columns=["TransactionTypeDispositionId"])
 
@@ -99,7 +96,7 @@ def az_individuals_convert(details_df: pd.DataFrame) -> pd.DataFrame:
     returns: schema-compliant individual details dataframe
 
     """
-    details_df = details_df.apply(az_individual_name_checker, axis=1)
+    details_df = az_individual_name_checker(details_df)
     details_df["full_name"] = details_df["full_name"].str.replace("\t", "")
 
     employer = details_df["company"]
@@ -176,7 +173,7 @@ def az_organizations_convert(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(data=d)
 
 
-def az_transactor_sorter(row: pd.Series) -> pd.Series:
+def az_transactor_sorter(df: pd.DataFrame) -> pd.DataFrame:
     """Sorts ids into base and other transactor
 
     Because the arizona transactions dataset records the ids
@@ -186,114 +183,133 @@ def az_transactor_sorter(row: pd.Series) -> pd.Series:
     whom the transaction was collected, and the other transactor
     is the other entity involved in the transaction
 
-    args: row of the transactions dataframe
+    args: transactions dataframe
 
-    returns: adjusted row of the transactions dataframe,
-    with new columns 'base_transactor_id' and
-    'other_transactor_id'
+    returns: adjusted transactions dataframe, with new columns
+    'base_transactor_id' and 'other_transactor_id'
 
     """
-    if row["entity_type"] in ["Vendor", "Individual"]:
-        row["base_transactor_id"] = row["TransactionNameGroupId"]
-        row["other_transactor_id"] = row["CommitteeId"]
-    else:
-        row["base_transactor_id"] = row["CommitteeId"]
-        row["other_transactor_id"] = row["TransactionNameGroupId"]
+    df_working = df.copy()
+    transactor_is_base = df["entity_type"].isin(["Vendor", "Individual"])
 
-    return row
+    df_working["base_transactor_id"] = df["TransactionNameGroupId"].where(
+        transactor_is_base, df["CommitteeId"]
+    )
+    df_working["other_transactor_id"] = df["CommitteeId"].where(
+        transactor_is_base, df["TransactionNameGroupId"]
+    )
+
+    return df_working
 
 
-def az_donor_recipient_director(row: pd.Series) -> pd.Series:
+def az_donor_recipient_director(df: pd.DataFrame) -> pd.DataFrame:
     """Sorts ids into donor and recipient columns
 
-    We switch the elements of a row in the transactions table if the
-    'TransactionTypeDispositionId' column indicates that the transaction
-    involves the other transactor receiving money and the base transactor
-    giving money. This is coded as a '2' in the dataset.
+    We switch the donor and recipient of the rows in the transactions table
+    where the 'TransactionTypeDispositionId' column indicates that the
+    transaction involves the other transactor receiving money and the base
+    transactor giving money. This is coded as a '2' in the dataset.
 
-    args: row of the transactions dataframe
+    args: transactions dataframe
 
-    returns: adjusted row of the transactions dataframe
+    returns: adjusted transactions dataframe
 
     """
     base_transactor_giving_money_flag = 2
-    if row["TransactionTypeDispositionId"] == base_transactor_giving_money_flag:
-        row["donor_id"], row["recipient_id"] = (
-            row["recipient_id"],
-            row["donor_id"],
-        )
-    return row
+    keep_direction = (
+        df["TransactionTypeDispositionId"] != base_transactor_giving_money_flag
+    )
+
+    df_working = df.copy()
+    df_working["donor_id"], df_working["recipient_id"] = (
+        df["donor_id"].where(keep_direction, df["recipient_id"]),
+        df["recipient_id"].where(keep_direction, df["donor_id"]),
+    )
+
+    return df_working
 
 
-def az_employment_checker(row: pd.Series, transactions: pd.DataFrame) -> pd.Series:
+def az_employment_checker(
+    entities: pd.DataFrame, transactions: pd.DataFrame
+) -> pd.DataFrame:
     """Retrieves employment data
 
     We attempt to collect employment data for the
     individuals dataframe. Because of how candidates vs
     individual contributors are coded, it is necessary to
     code the candidate employment separately, otherwise
-    the column shapes become different
+    the column shapes become different. Every other entity
+    gets the employer of its first transaction, looked up
+    for all entities at once
 
-    args: row of the individuals dataframe,
-    transactions dataframe
+    args: individuals dataframe, transactions dataframe
 
-    returns: adjusted row of the individuals dataframe
+    returns: individuals dataframe with a 'company' column
 
     """
-    if row["entity_type"] == "Candidate":
-        row["company"] = "None (Is a Candidate)"
-    else:
-        transactions[transactions["retrieved_id"] == row["retrieved_id"]].iloc[0][
-            "TransactionEmployer"
-        ]
-        row["company"] = transactions[
-            transactions["retrieved_id"] == row["retrieved_id"]
-        ].iloc[0]["TransactionEmployer"]
+    first_employers = transactions.drop_duplicates("retrieved_id").set_index(
+        "retrieved_id"
+    )["TransactionEmployer"]
+
+    entities = entities.copy()
+    entities["company"] = entities["retrieved_id"].map(first_employers)
+    entities.loc[entities["entity_type"] == "Candidate", "company"] = (
+        "None (Is a Candidate)"
+    )
 
-    return row
+    return entities
 
 
-def az_individual_name_checker(row: pd.Series) -> pd.Series:
+def az_individual_name_checker(df: pd.DataFrame) -> pd.DataFrame:
     """Collect names for individuals
 
     Since names are coded differently for candidates vs
-    individual contributors, we go row by row and collect the
-    right element in each case
+    individual contributors, we collect the right column
+    in each case
 
-    args: row of the individuals dataframe
+    args: individuals dataframe
 
-    returns: adjusted row of the individual dataframe
-    with the correct names of individual contributors and
-    candidates in the 'full name' column
+    returns: adjusted individuals dataframe with the correct
+    names of individual contributors and candidates in the
+    'full name' column
 
     """
-    if row["entity_type"] == "Candidate":
-        row["full_name"] = row["candidate"]
-    else:
-        row["full_name"] = row["retrieved_name"]
-    return row
+    df_working = df.copy()
+    df_working["full_name"] = df["retrieved_name"].where(
+        df["entity_type"] != "Candidate", df["candidate"]
+    )
+    return df_working
 
 
 def az_id_table(
     individuals_df: pd.DataFrame,
     organizations_df: pd.DataFrame,
     transactions_df: pd.DataFrame,
-    *args: int,
+    transformer: StateTransformer,
 ) -> pd.DataFrame:
-    """Create a table of old ids and new uuids"""
+    """Create a table of old ids and new uuids
+
+    args: schema-compliant individuals, organizations and transactions
+    tables that still hold the ids provided by Arizona, and the transformer
+    deriving the new uuids
+
+    returns: id mapping table with one row per provided id
+    """
     ind_ids = individuals_df["id"]
 
     org_ids = organizations_df["id"]
 
     trans_ids = transactions_df["transaction_id"]
 
-    years = pd.concat[
-        individuals_df["year"],
-        organizations_df["year"],
-        transactions_df["year"],
-    ]
-
-    all_ids = pd.concat([ind_ids, org_ids, trans_ids])
+    # entity details are not tied to a year
+    years = pd.concat(
+        [
+            pd.Series(None, index=ind_ids.index, dtype=object),
+            pd.Series(None, index=org_ids.index, dtype=object),
+            transactions_df["year"].astype(object),
+        ],
+        ignore_index=True,
+    )
 
     id_types = (
         ["Individual"] * len(ind_ids)
@@ -305,18 +321,25 @@ def az_id_table(
         "state": "AZ",
         "year": years,
         "entity_type": id_types,
-        "provided_id": all_ids,
+        "provided_id": pd.concat([ind_ids, org_ids, trans_ids], ignore_index=True),
+        "database_id": np.concatenate(
+            [
+                transformer.stable_ids("entity", ind_ids),
+                transformer.stable_ids("entity", org_ids),
+                transformer.stable_ids("transaction", trans_ids),
+            ]
+        ),
     }
 
-    id_map_df = pd.DataFrame(data=d)
-    id_map_df["database_id"] = [uuid.uuid4() for _ in range(len(id_map_df.index))]
-
-    return id_map_df
+    return pd.DataFrame(data=d)
 
 
-class ArizonaTransformer(StateTransformer):
+class ArizonaTransformer(PartitionedTransformer):
     """Based on the StateTransformer abstract class and cleans Arizona data"""
 
+    name = "Arizona"
+    stable_id_across_years = True
+
     def clean_state(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """Calls the other methods in order
 
@@ -331,10 +354,24 @@ class ArizonaTransformer(StateTransformer):
         transactions, individuals, and organizations
 
         """
-        filepaths = self.get_filepaths()
+        return self.clean_partition(self.get_filepaths())
+
+    def raw_partitions(self) -> dict[str, list[Path]]:
+        """AZ files are read together, as a single partition"""
+        return {"all": [Path(filepath) for filepath in self.get_filepaths()]}
+
+    def clean_partition(
+        self, filepaths: list[Path]
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Runs the cleaning pipeline on the given filepaths
+
+        args: individuals, organizations, and transactions filepaths,
+        in that order
 
+        returns: three schema-compliant tables for
+        transactions, individuals, and organizations
+        """
         individuals, organizations, transactions = self.preprocess(filepaths)
-        transactions = transactions.head(1000)
 
         details = pd.concat([individuals, organizations])
 
@@ -422,6 +459,52 @@ class ArizonaTransformer(StateTransformer):
         else:
             az_organizations = None
 
+        return self.replace_provided_ids(
+            az_individuals, az_organizations, az_transactions
+        )
+
+    def replace_provided_ids(
+        self,
+        az_individuals: pd.DataFrame,
+        az_organizations: pd.DataFrame,
+        az_transactions: pd.DataFrame,
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Replaces the ids provided by Arizona with uuids derived from them
+
+        Arizona ids are stable across years, so each provided id always gets
+        the same uuid. The mapping is saved to output/ArizonaIDMap.csv
+
+        args: schema-compliant individuals, organizations and transactions
+        tables, the entity tables may be None
+
+        returns: the tables with their ids replaced
+        """
+        entity_tables = [
+            table for table in [az_individuals, az_organizations] if table is not None
+        ]
+        empty_entities = pd.DataFrame({"id": pd.Series(dtype=object)})
+        id_map = az_id_table(
+            az_individuals if az_individuals is not None else empty_entities,
+            az_organizations if az_organizations is not None else empty_entities,
+            az_transactions,
+            self,
+        )
+        output_path = BASE_FILEPATH / "output" / "ArizonaIDMap.csv"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        id_map.to_csv(output_path, index=False)
+
+        for table in entity_tables:
+            table["id"] = self.stable_ids("entity", table["id"])
+        az_transactions["donor_id"] = self.stable_ids(
+            "entity", az_transactions["donor_id"]
+        )
+        az_transactions["recipient_id"] = self.stable_ids(
+            "entity", az_transactions["recipient_id"]
+        )
+        az_transactions["transaction_id"] = self.stable_ids(
+            "transaction", az_transactions["transaction_id"]
+        )
+
         return (az_individuals, az_organizations, az_transactions)
 
     def standardize(self, details_df_list: list[pd.DataFrame]) -> list[pd.DataFrame]:
@@ -464,24 +547,16 @@ class ArizonaTransformer(StateTransformer):
         """
         transactions, entities = data
 
-        merged_df = entities.merge(transactions, on="retrieved_id", how="inner")
-
         # Filter rows in the first dataframe based on the common 'ids'
-        entities = entities[entities["retrieved_id"].isin(merged_df["retrieved_id"])]
+        entities = entities[entities["retrieved_id"].isin(transactions["retrieved_id"])]
 
-        try:
-            transactions["TransactionDate"] = transactions["TransactionDate"].apply(
-                convert_date
-            )
-        except TypeError as e:
-            print(f"Error converting Arizona dates: {e}")
-            transactions["TransactionDate"] = transactions["TransactionDate"]
+        transactions["TransactionDate"] = convert_dates(transactions["TransactionDate"])
 
         entities = az_name_clean(entities)
 
-        entities = entities.apply(az_employment_checker, args=(transactions,), axis=1)
+        entities = az_employment_checker(entities, transactions)
 
-        transactions = transactions.apply(az_transactor_sorter, axis=1)
+        transactions = az_transactor_sorter(transactions)
 
         # TODO: what is going on here?
         merged_df = pd.merge(  # noqa: PD015
@@ -1,9 +1,22 @@
 """Abstract base class for transforming state data into standard schema"""
 
 from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from utils.transform.instrumentation import STAGE_NAMES, instrumented_stage
+from utils.transform.utils import (
+    content_keys,
+    normalize_names,
+    stable_uuids,
+    uuid5_strings,
+)
+
 
 class StateTransformer(ABC):
     """This abstract class is the one that all the state cleaners will be built on
@@ -19,8 +32,19 @@ class StateTransformer(ABC):
     The methods in this class are meant to be very conservative. Raw data should
     not be modified, only transformed. Rows cannot be changed, only deleted in
     obviously erroneous cases.
+
+    Each subclass's preprocess, clean, standardize, and create_tables methods
+    are measured while a StageRecorder is recording (see
+    utils.transform.instrumentation).
     """
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Wraps the stage methods a subclass defines so they can be recorded"""
+        super().__init_subclass__(**kwargs)
+        for stage in STAGE_NAMES:
+            if stage in cls.__dict__:
+                setattr(cls, stage, instrumented_stage(stage)(cls.__dict__[stage]))
+
     @property
     def name(self) -> str:
         """Name of the state"""
@@ -31,6 +55,15 @@ class StateTransformer(ABC):
         """True if state maintains provided entity ids across years"""
         return self._stable_id_across_years
 
+    @property
+    def drops_duplicate_entities(self) -> bool:
+        """True if the state's entity tables list each distinct entity once
+
+        Entity tables concatenated from several partitions (see
+        utils.transform.incremental) are then deduplicated the same way.
+        """
+        return False
+
     @property
     def entity_name_dictionary(self) -> dict:
         """A dict mapping a state's raw entity names to standard versions"""
@@ -88,6 +121,94 @@ class StateTransformer(ABC):
         """
         pass
 
+    def stable_ids(self, kind: str, *key_columns: pd.Series) -> np.ndarray:
+        """Derives deterministic UUIDs for this state from key columns
+
+        Transforming the same data again gives the same ids, so artifacts built
+        on them (id maps, linkage clusters, networks) stay valid across runs.
+
+        Inputs:
+            kind: what the ids identify, e.g. 'entity' or 'transaction'
+            key_columns: columns whose values together make up each row's key
+
+        Returns: object array of UUID strings, one per row
+        """
+        return stable_uuids(self.name, kind, *key_columns)
+
+    def entity_ids(
+        self,
+        provided_ids: pd.Series,
+        names: pd.Series,
+        years: pd.Series = None,
+        fallback_keys: pd.Series = None,
+    ) -> np.ndarray:
+        """Derives deterministic entity ids from provided ids or names
+
+        An entity with an id provided by the state is keyed by that id, and
+        also by year if the state's ids are not stable across years. Otherwise
+        it is keyed by its normalized name, and without a name either, by its
+        fallback key (e.g. the transaction it appears in).
+
+        Inputs:
+            provided_ids: ids provided by the state, missing where not provided
+            names: names of the entities
+            years: year each entity appears in
+            fallback_keys: keys of entities with neither a provided id nor a
+                name. If not given, all such entities share one id.
+
+        Returns: object array of entity id UUID strings, one per row
+        """
+        provided_ids = pd.Series(provided_ids.to_numpy(), dtype=object)
+        has_provided_id = provided_ids.notna().to_numpy()
+        ids = np.empty(len(provided_ids), dtype=object)
+
+        id_columns = [provided_ids[has_provided_id]]
+        if years is not None and not self.stable_id_across_years:
+            id_columns.append(pd.Series(years.to_numpy())[has_provided_id])
+        ids[has_provided_id] = self.stable_ids("entity", *id_columns)
+
+        # only entities without a provided id are keyed by name. Names repeat
+        # a lot, so each unique name is normalized once
+        no_id_positions = np.flatnonzero(~has_provided_id)
+        name_codes, unique_names = pd.factorize(names.to_numpy()[no_id_positions])
+        normalized_names = normalize_names(pd.Series(unique_names, dtype=object))
+        # the extra last entry is picked by the -1 code of missing names
+        names = pd.Series(
+            np.append(normalized_names.to_numpy(), np.nan)[name_codes], dtype=object
+        )
+        if fallback_keys is None:
+            ids[no_id_positions] = self.stable_ids("named entity", names)
+            return ids
+        has_name = (names.notna() & (names != "")).to_numpy()
+        ids[no_id_positions[has_name]] = self.stable_ids(
+            "named entity", names[has_name]
+        )
+        unnamed_positions = no_id_positions[~has_name]
+        ids[unnamed_positions] = self.stable_ids(
+            "unnamed entity", np.asarray(fallback_keys)[unnamed_positions]
+        )
+        return ids
+
+    def transaction_ids(
+        self, transactions: pd.DataFrame, occurrence_counts: Counter = None
+    ) -> np.ndarray:
+        """Derives deterministic transaction ids from transaction contents
+
+        Identical transactions are told apart by how many came before them, so
+        ids are unique as long as the rows are given in the same order.
+
+        Inputs:
+            transactions: transactions with the columns that identify them,
+                including any transaction id provided by the state
+            occurrence_counts: see utils.transform.utils.content_keys, for
+                tables keyed one chunk at a time
+
+        Returns: object array of transaction id UUID strings, one per row
+        """
+        return uuid5_strings(
+            self.name, "transaction", content_keys(transactions, occurrence_counts)
+        )
+
     def standardize_entity_names(self, entity: pd.DataFrame) -> pd.DataFrame:
         """Creates a new 'standard_entity_type' column from 'raw_entity_type'
 
@@ -136,3 +257,74 @@ class StateTransformer(ABC):
         [ind->ind, ind->org, org->ind, org->org] tables in a tuple
         """
         pass
+
+
+class PartitionedTransformer(StateTransformer):
+    """A state transformer whose raw files can be transformed in parts
+
+    Each partition is transformed on its own by clean_partition, so a
+    partition whose files have not changed can reuse its previous output
+    (see utils.transform.incremental).
+    """
+
+    @abstractmethod
+    def raw_partitions(self) -> dict[str, list[Path]]:
+        """Groups the state's raw files into independently transformable parts
+
+        Returns: dict mapping a partition key (e.g. a year) to the raw files in
+            that partition. Keys are used as directory names.
+        """
+        pass
+
+    @abstractmethod
+    def clean_partition(
+        self, filepaths: list[Path]
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Runs the StateCleaner pipeline on one partition of the raw files
+
+        Inputs:
+            filepaths: raw files of one partition, as given by raw_partitions
+
+        Returns: (individuals_table, organizations_table, transactions_table)
+            built from only those files
+        """
+        pass
+
+    @contextmanager
+    def cleaning_session(self) -> Iterator[None]:
+        """Context of a run cleaning one or more partitions
+
+        A state keeping data across partitions (e.g. Pennsylvania's id lookup
+        table) loads it once when the run starts and saves it once when the
+        run ends, rather than once per partition. Does nothing by default.
+        """
+        yield
+
+    def clean_partition_with_id_mapping(
+        self, filepaths: list[Path]
+    ) -> tuple[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], pd.DataFrame | None]:
+        """Runs clean_partition, also returning the partition's id mapping
+
+        A state that outputs a mapping of its provided ids to database ids
+        (see output_id_mapping) returns the partition's rows of the mapping
+        instead of writing them, so that a run over several partitions writes
+        the mapping of all of them at once. Other states return None.
+
+        Inputs:
+            filepaths: raw files of one partition, as given by raw_partitions
+
+        Returns: ((individuals_table, organizations_table, transactions_table),
+            id_mapping)
+        """
+        return self.clean_partition(filepaths), None
+
+    def output_id_mapping(self, id_mappings: Iterable[pd.DataFrame]) -> None:
+        """Writes the state's id mapping, made up of the given mappings' rows
+
+        States without an id mapping write nothing.
+
+        Inputs:
+            id_mappings: id mappings of each partition, as returned by
+                clean_partition_with_id_mapping
+        """
+        pass
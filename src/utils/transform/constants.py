@@ -6,6 +6,22 @@ MI_EXP_FILEPATH = BASE_FILEPATH / "data" / "raw" / "MI" / "Expenditure"
 
 MI_CON_FILEPATH = BASE_FILEPATH / "data" / "raw" / "MI" / "Contribution"
 
+# committee whose raw MI rows are read in one column off
+MI_MENOMINEE_COUNTY = "MENOMINEE COUNTY DEMOCRATIC PARTY"
+
+# rows of raw MI data processed at once by MichiganTransformer.stream_state
+MI_CHUNKSIZE = 500_000
+
+# numeric columns of cleaned MI data, keyed as floats when deriving transaction
+# ids whatever type they were read as (see MichiganTransformer.generate_uuid)
+MI_NUMERIC_COLUMNS = [
+    "amount",
+    "cfr_com_id",
+    "contribution_id",
+    "doc_stmnt_year",
+    "expense_id",
+]
+
 AZ_TRANSACTIONS_FILEPATH = (
     BASE_FILEPATH / "data" / "raw" / "AZ" / "az_transactions_demo.csv"
 )
@@ -151,6 +167,12 @@ MN_RACE_MAP = {
     "DC": "State District Court Judge",
 }
 
+# MN registration numbers that stand in for a missing id after cleaning
+MN_MISSING_ID_VALUES = ["None", "nan", "0", ""]
+
+# MN names that stand in for a missing name after cleaning
+MN_MISSING_NAME_VALUES = ["None", "nan", ""]
+
 
 MI_CONT_DROP_COLS = [
     "doc_seq_no",
@@ -197,6 +219,58 @@ MI_EXP_DROP_COLS = [
 
 PA_SCHEMA_CHANGE_YEAR = 2022
 
+# values read as missing in raw files, the default missing values of
+# pandas.read_csv
+CSV_NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# columns of a standardized PA transaction its id is derived from. The pandas
+# and DuckDB backends key a transaction by the text of these values, so they
+# give it the same id
+PA_TRANSACTION_KEY_COLUMNS = [
+    "AMOUNT",
+    "DONOR",
+    "DONOR_ID",
+    "DONOR_OFFICE",
+    "DONOR_PARTY",
+    "DONOR_TYPE",
+    "PURPOSE",
+    "RECIPIENT",
+    "RECIPIENT_ID",
+    "RECIPIENT_OFFICE",
+    "RECIPIENT_PARTY",
+    "RECIPIENT_TYPE",
+    "YEAR",
+]
+
+# columns of the report of lines that could not be parsed from raw PA files
+PA_BAD_LINES_COLUMNS = [
+    "file",
+    "line_number",
+    "expected_columns",
+    "actual_columns",
+    "text",
+]
+
 
 PA_CONT_COLS_NAMES_PRE2022: list = [
     "RECIPIENT_ID",
@@ -362,6 +436,16 @@ PA_FILER_ABBREV_DICT: dict = {
     3.0: "Lobbyist",
 }
 
+# PA entity types, grouped by whether they belong in the individuals (0) or
+# organizations (1) table
+PA_ENTITY_CLASSES: dict = {
+    "Individual": 0,
+    "Candidate": 0,
+    "Lobbyist": 0,
+    "Committee": 1,
+    "Organization": 1,
+}
+
 PA_ORGANIZATION_IDENTIFIERS: list = [
     "FRIENDS",
     "CITIZENS",
@@ -0,0 +1,937 @@
+"""Out-of-core DuckDB execution backend for state transformers
+
+The pandas state transformers hold a whole state in memory. For the largest
+states, Michigan and Pennsylvania, this module expresses their preprocess,
+clean, standardize and create_tables steps as SQL over the raw files instead.
+DuckDB scans the delimited files in parallel, spills to disk when a state does
+not fit in memory, and writes the individuals, organizations and transactions
+tables straight to the Parquet datasets of
+utils.transform.storage.write_state_tables, so they are read with read_table.
+
+The tables match those of the pandas transformers, with these exceptions:
+- amounts are parsed exactly, where the default float parser of pandas may
+  be off in the last digit
+- ids provided by the state are keyed by their text in the raw file, so an
+  id pandas would have read as a float (e.g. '123.0' in a column with
+  missing values) is keyed as written ('123')
+- only ASCII whitespace separates the words of names when they are
+  classified and normalized
+- MichiganIDMap.csv has no transaction rows: Michigan transaction ids are a
+  pandas hash of each row, and its transactions tables have no id column
+"""
+
+import shutil
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils.transform import constants as const
+from utils.transform.clean import PartitionedTransformer
+from utils.transform.pennsylvania import assign_PA_column_names
+from utils.transform.schema import STANDARD_COLUMN_TYPES
+from utils.transform.storage import (
+    SOURCE_STATE_PARTITION,
+    TABLE_NAMES,
+    YEAR_PARTITION,
+)
+from utils.transform.utils import ID_NAMESPACE, KEY_SEPARATOR
+
+# characters read at once when transcoding raw files
+TRANSCODE_BLOCK_SIZE = 1 << 20
+
+DUCKDB_TYPES = {
+    pa.string(): "VARCHAR",
+    pa.int32(): "INTEGER",
+    pa.float64(): "DOUBLE",
+}
+
+PA_INDIVIDUAL_TYPES = ["Individual", "Candidate", "Lobbyist"]
+PA_ORGANIZATION_TYPES = ["Committee", "Organization"]
+
+
+def sql_string(value: str) -> str:
+    """Quotes a value as a SQL string literal"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_identifier(name: str) -> str:
+    """Quotes a name as a SQL identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_list(values: list[str]) -> str:
+    """Formats values as a SQL list of string literals"""
+    return "[" + ", ".join(sql_string(value) for value in values) + "]"
+
+
+def transcode_to_utf8(source: Path, destination: Path, encoding: str) -> Path:
+    """Copies a text file to destination, re-encoding it as UTF-8
+
+    DuckDB only reads UTF-8 and a strict latin-1, so raw files are transcoded
+    with Python's codecs before they are scanned. Line endings are kept.
+
+    Args:
+        source: path to the raw file
+        destination: path to write the UTF-8 copy to
+        encoding: encoding of the raw file
+
+    Returns: destination
+    """
+    with (
+        Path(source).open(encoding=encoding, newline="") as source_file,
+        Path(destination).open("w", encoding="utf-8", newline="") as utf8_file,
+    ):
+        shutil.copyfileobj(source_file, utf8_file, TRANSCODE_BLOCK_SIZE)
+    return Path(destination)
+
+
+def transcode_files(
+    filepaths: list[Path], encoding: str, directory: Path
+) -> list[Path]:
+    """Transcodes raw files to UTF-8 copies in directory, concurrently
+
+    Returns: paths to the copies, in the order of filepaths
+    """
+    destinations = [
+        Path(directory) / f"{position:05d}_{Path(filepath).name}"
+        for position, filepath in enumerate(filepaths)
+    ]
+    with ThreadPoolExecutor() as executor:
+        return list(
+            executor.map(
+                transcode_to_utf8,
+                filepaths,
+                destinations,
+                [encoding] * len(filepaths),
+            )
+        )
+
+
+def title_case(names: pa.Array) -> pa.Array:
+    """Title cases strings like str.title, as a vectorized DuckDB function"""
+    return pc.utf8_title(names)
+
+
+def connect(
+    temp_directory: str | Path,
+    memory_limit: str = None,
+    threads: int = None,
+) -> duckdb.DuckDBPyConnection:
+    """Opens an in-memory DuckDB database with the backend's SQL functions
+
+    Defines:
+    - uuid5(state, kind, key): the id StateTransformer.stable_ids gives to a
+      key of a single column, or NULL for a NULL key
+    - normalize_name(name): utils.transform.utils.normalize_names
+    - title_case(text): str.title
+
+    Args:
+        temp_directory: directory DuckDB spills to when a query does not fit
+            in memory
+        memory_limit: memory DuckDB may use, e.g. '4GB'. Defaults to DuckDB's
+            default of 80% of the system memory
+        threads: number of threads to run queries on. Defaults to all cores
+
+    Returns: the connection
+    """
+    config = {"temp_directory": str(temp_directory), "preserve_insertion_order": False}
+    if memory_limit is not None:
+        config["memory_limit"] = memory_limit
+    if threads is not None:
+        config["threads"] = threads
+    connection = duckdb.connect(config=config)
+
+    # hex digits of the RFC 4122 variant for each hex digit of the digest
+    connection.execute(
+        """
+        CREATE MACRO uuid5_format(digest) AS
+            substr(digest, 1, 8) || '-' || substr(digest, 9, 4) || '-5'
+            || substr(digest, 14, 3) || '-'
+            || substr(
+                '89ab89ab89ab89ab', strpos('0123456789abcdef', substr(digest, 17, 1)), 1
+            )
+            || substr(digest, 18, 3) || '-' || substr(digest, 21, 12)
+        """
+    )
+    connection.execute(
+        f"""
+        CREATE MACRO uuid5(state, kind, key) AS uuid5_format(sha1(
+            unhex({sql_string(ID_NAMESPACE.hex)})
+            || encode(state || chr({ord(KEY_SEPARATOR)}) || kind
+            || chr({ord(KEY_SEPARATOR)}) || key)
+        ))
+        """
+    )
+    connection.execute(
+        """
+        CREATE MACRO normalize_name(name) AS
+            trim(regexp_replace(upper(name), '[[:space:]]+', ' ', 'g'))
+        """
+    )
+    connection.create_function(
+        "title_case", title_case, ["VARCHAR"], "VARCHAR", type="arrow"
+    )
+    return connection
+
+
+def read_csv_sql(
+    filepath: Path,
+    columns: list[str],
+    delimiter: str,
+    header: bool = False,
+    null_padding: bool = False,
+) -> str:
+    """Formats a DuckDB scan of a delimited file with only text columns
+
+    Values are parsed the way pandas.read_csv parses them: fields may be
+    quoted, the default missing values of pandas are NULL, and lines with
+    more fields than columns are skipped.
+
+    Args:
+        filepath: path to a UTF-8 file
+        columns: names of the file's columns
+        delimiter: field delimiter
+        header: whether the first line of the file is a header
+        null_padding: whether lines with too few fields are padded with
+            NULLs, rather than skipped
+
+    Returns: SQL table function reading the file
+    """
+    column_types = ", ".join(f"{sql_string(column)}: 'VARCHAR'" for column in columns)
+    return f"""read_csv(
+        {sql_string(filepath)},
+        auto_detect=false,
+        header={str(header).lower()},
+        delim={sql_string(delimiter)},
+        quote='"',
+        escape='"',
+        columns={{{column_types}}},
+        nullstr={sql_list(const.CSV_NULL_VALUES)},
+        null_padding={str(null_padding).lower()},
+        parallel={str(not null_padding).lower()},
+        ignore_errors=true
+    )"""
+
+
+def union_all(selects: list[str], columns: list[str]) -> str:
+    """Joins SELECT statements with UNION ALL
+
+    Args:
+        selects: SELECT statements with the same columns
+        columns: names of those columns, to select no rows if selects is empty
+
+    Returns: SQL query
+    """
+    if not selects:
+        return (
+            "SELECT "
+            + ", ".join(
+                f"NULL::VARCHAR AS {sql_identifier(column)}" for column in columns
+            )
+            + " WHERE false"
+        )
+    return "\nUNION ALL\n".join(selects)
+
+
+def select_by_header_sql(filepath: Path, columns: list[str]) -> str:
+    """Formats a selection of columns by name from a tab-delimited MI file
+
+    The file's header may hold columns that are not selected, in any order.
+    Selected columns missing from the header are NULL.
+
+    Args:
+        filepath: path to a UTF-8 file whose first line is a header
+        columns: names of the columns to select
+
+    Returns: SQL query
+    """
+    with Path(filepath).open(encoding="utf-8") as utf8_file:
+        header = [
+            name.strip('"') for name in utf8_file.readline().rstrip("\r\n").split("\t")
+        ]
+    scan = read_csv_sql(filepath, header, "\t", header=True, null_padding=True)
+    selected_columns = ", ".join(
+        sql_identifier(column)
+        if column in header
+        else f"NULL AS {sql_identifier(column)}"
+        for column in columns
+    )
+    return f"SELECT {selected_columns} FROM {scan}"
+
+
+def create_michigan_tables(
+    connection: duckdb.DuckDBPyConnection,
+    state_cleaner: PartitionedTransformer,
+    filepaths: list[Path],
+    staging_directory: Path,
+) -> None:
+    """Creates views of the Michigan individuals, organizations and transactions
+
+    Follows utils.transform.michigan.MichiganTransformer: the Menominee County
+    rows of contributions are shifted back into place and those of
+    expenditures dropped, and entities are given the uuid of their name. An
+    id_mapping view holds the entity rows of MichiganIDMap.csv (see
+    write_michigan_id_mapping).
+
+    Args:
+        connection: connection made by connect
+        state_cleaner: Michigan state cleaner
+        filepaths: Contribution and Expenditure file paths
+        staging_directory: directory for UTF-8 copies of the raw files
+    """
+    state = state_cleaner.name
+    filepaths = [Path(filepath) for filepath in filepaths]
+    utf8_filepaths = transcode_files(filepaths, "mac_roman", staging_directory)
+
+    contribution_selects = []
+    expenditure_selects = []
+    for filepath, utf8_filepath in zip(filepaths, utf8_filepaths):
+        if filepath.parent.name == const.MI_EXP_FILEPATH.name:
+            expenditure_selects.append(
+                select_by_header_sql(utf8_filepath, const.MI_EXPENDITURE_COLUMNS)
+            )
+        elif filepath.name.endswith("00.txt"):
+            # MI files that contain 00 contain headers
+            contribution_selects.append(
+                select_by_header_sql(utf8_filepath, const.MI_CONTRIBUTION_COLUMNS)
+            )
+        else:
+            scan = read_csv_sql(
+                utf8_filepath, const.MI_CONTRIBUTION_COLUMNS, "\t", null_padding=True
+            )
+            contribution_selects.append(f"SELECT * FROM {scan}")
+
+    connection.execute(
+        "CREATE VIEW mi_raw_contributions AS "
+        + union_all(contribution_selects, const.MI_CONTRIBUTION_COLUMNS)
+    )
+    connection.execute(
+        "CREATE VIEW mi_raw_expenditures AS "
+        + union_all(expenditure_selects, const.MI_EXPENDITURE_COLUMNS)
+    )
+
+    # the Menominee County rows have their values in the wrong columns
+    shifted_sources = dict(
+        zip(
+            const.MICHIGAN_CONTRIBUTION_COLS_RENAME,
+            const.MICHIGAN_CONTRIBUTION_COLS_REORDER,
+        )
+    )
+    shifted_columns = ", ".join(
+        f"{sql_identifier(shifted_sources[column])} AS {sql_identifier(column)}"
+        if column in shifted_sources
+        else f"NULL AS {sql_identifier(column)}"
+        for column in const.MI_CONTRIBUTION_COLUMNS
+    )
+    connection.execute(
+        f"""
+        CREATE VIEW mi_cleaned AS
+        WITH contributions AS (
+            SELECT * FROM mi_raw_contributions
+            WHERE com_type IS DISTINCT FROM {sql_string(const.MI_MENOMINEE_COUNTY)}
+            UNION ALL
+            SELECT {shifted_columns}
+            FROM mi_raw_contributions
+            WHERE com_type = {sql_string(const.MI_MENOMINEE_COUNTY)}
+        ),
+        merged AS (
+            SELECT
+                doc_stmnt_year, com_legal_name, cfr_com_id, can_first_name,
+                can_last_name, contribtype, f_name, l_name_or_org, state,
+                employer, amount, NULL AS purpose, NULL AS vend_name
+            FROM contributions
+            UNION ALL
+            SELECT
+                doc_stmnt_year, com_legal_name, cfr_com_id, NULL, NULL, NULL,
+                f_name, lname_or_org, state, NULL, amount, purpose, vend_name
+            FROM mi_raw_expenditures
+            WHERE com_type IS DISTINCT FROM {sql_string(const.MI_MENOMINEE_COUNTY)}
+        ),
+        named AS (
+            SELECT
+                *,
+                coalesce(f_name, '') || ' ' || l_name_or_org AS full_name,
+                can_first_name || ' ' || can_last_name AS candidate_full_name
+            FROM merged
+        )
+        SELECT
+            TRY_CAST(doc_stmnt_year AS INTEGER) AS year,
+            TRY_CAST(amount AS DOUBLE) AS amount,
+            f_name AS first_name,
+            l_name_or_org AS last_name,
+            full_name,
+            uuid5({sql_string(state)}, 'full_name', full_name) AS full_name_uuid,
+            can_first_name,
+            can_last_name,
+            candidate_full_name,
+            uuid5({sql_string(state)}, 'candidate_full_name', candidate_full_name)
+                AS candidate_full_name_uuid,
+            com_legal_name,
+            uuid5({sql_string(state)}, 'com_legal_name', com_legal_name)
+                AS com_legal_name_uuid,
+            TRY_CAST(cfr_com_id AS BIGINT) AS original_com_id,
+            vend_name,
+            uuid5({sql_string(state)}, 'vend_name', vend_name) AS vend_name_uuid,
+            state,
+            employer AS company,
+            purpose,
+            contribtype AS transaction_type
+        FROM named
+        """
+    )
+    connection.execute(
+        """
+        CREATE VIEW individuals AS
+        SELECT
+            full_name_uuid AS id, first_name, last_name, full_name,
+            'Individual' AS entity_type, coalesce(state, 'MI') AS state,
+            NULL AS party, company
+        FROM mi_cleaned WHERE first_name IS NOT NULL
+        UNION ALL
+        SELECT
+            candidate_full_name_uuid, can_first_name, can_last_name,
+            candidate_full_name, 'Candidate', 'MI', NULL, NULL
+        FROM mi_cleaned WHERE candidate_full_name_uuid IS NOT NULL
+        """
+    )
+    connection.execute(
+        """
+        CREATE VIEW organizations AS
+        -- contributing corporations have a first name that is null
+        SELECT
+            full_name_uuid AS id, full_name AS name, 'MI' AS state,
+            'corporation' AS entity_type
+        FROM mi_cleaned WHERE first_name IS NULL
+        UNION ALL
+        SELECT com_legal_name_uuid, com_legal_name, 'MI', 'committee'
+        FROM mi_cleaned WHERE com_legal_name_uuid IS NOT NULL
+        UNION ALL
+        SELECT vend_name_uuid, vend_name, 'MI', 'vendor'
+        FROM mi_cleaned WHERE vend_name_uuid IS NOT NULL
+        """
+    )
+    connection.execute(
+        """
+        CREATE VIEW transactions AS
+        SELECT
+            full_name_uuid AS donor_id, year, amount,
+            com_legal_name_uuid AS recipient_id, NULL AS office_sought, purpose,
+            transaction_type
+        FROM mi_cleaned
+        UNION ALL
+        SELECT
+            com_legal_name_uuid, year, amount, vend_name_uuid, NULL, purpose,
+            transaction_type
+        FROM mi_cleaned WHERE vend_name_uuid IS NOT NULL
+        """
+    )
+    # the transaction ids of MichiganIDMap.csv are a pandas hash of each row
+    # (see utils.transform.utils.content_keys), which is not reproduced
+    connection.execute(
+        """
+        CREATE VIEW id_mapping AS
+        WITH entities AS (
+            SELECT
+                year, 'Individual' AS entity_type, NULL::BIGINT AS provided_id,
+                full_name_uuid AS database_id
+            FROM mi_cleaned WHERE first_name IS NOT NULL
+            UNION ALL
+            SELECT year, 'Individual', NULL, candidate_full_name_uuid
+            FROM mi_cleaned WHERE candidate_full_name_uuid IS NOT NULL
+            UNION ALL
+            SELECT year, 'Organization', NULL, full_name_uuid
+            FROM mi_cleaned WHERE first_name IS NULL
+            UNION ALL
+            SELECT year, 'Organization', original_com_id, com_legal_name_uuid
+            FROM mi_cleaned WHERE com_legal_name_uuid IS NOT NULL
+            UNION ALL
+            SELECT year, 'Organization', NULL, vend_name_uuid
+            FROM mi_cleaned WHERE vend_name_uuid IS NOT NULL
+        )
+        SELECT 'MI' AS state, year, entity_type, provided_id, database_id
+        FROM entities
+        """
+    )
+
+
+def create_pennsylvania_tables(
+    connection: duckdb.DuckDBPyConnection,
+    state_cleaner: PartitionedTransformer,
+    filepaths: list[Path],
+    staging_directory: Path,
+) -> None:
+    """Creates views of the Pennsylvania individuals, organizations and transactions
+
+    Follows utils.transform.pennsylvania.PennsylvaniaTransformer: each year's
+    contributions and expenditures are joined to the year's filers, donors
+    are classified by name, and entities are given the uuid of their provided
+    id and year in the state cleaner's id lookup table, else one derived from
+    them, or else the uuid of their name. The provided ids are kept in the
+    provided_donor_id and provided_recipient_id columns of pa_standardized,
+    to add those new to the lookup table (see write_pennsylvania_id_lookup).
+
+    Args:
+        connection: connection made by connect
+        state_cleaner: Pennsylvania state cleaner
+        filepaths: contributor, filer, and expenditure file paths, each inside
+            a directory named after its year
+        staging_directory: directory for UTF-8 copies of the raw files
+    """
+    state = state_cleaner.name
+    filepaths = [Path(filepath) for filepath in filepaths]
+    utf8_filepaths = transcode_files(filepaths, "latin-1", staging_directory)
+
+    selects = {"contrib": [], "filer": [], "expense": []}
+    for filepath, utf8_filepath in zip(filepaths, utf8_filepaths):
+        year = int(filepath.parent.name)
+        scan = read_csv_sql(
+            utf8_filepath,
+            assign_PA_column_names(filepath.stem, year),
+            ",",
+            null_padding=True,
+        )
+        # missing ids and names are read by pandas as the text 'nan'
+        if "contrib" in filepath.stem:
+            selects["contrib"].append(
+                f"""
+                SELECT
+                    coalesce(RECIPIENT_ID, 'nan') AS recipient_id,
+                    {year} AS year,
+                    title_case(coalesce(DONOR, 'nan')) AS donor,
+                    PURPOSE AS purpose,
+                    TRY_CAST(CONT_AMT_1 AS DOUBLE) + TRY_CAST(CONT_AMT_2 AS DOUBLE)
+                        + TRY_CAST(CONT_AMT_3 AS DOUBLE) AS amount
+                FROM {scan}
+                """
+            )
+        elif "filer" in filepath.stem:
+            selects["filer"].append(
+                f"""
+                SELECT
+                    coalesce(RECIPIENT_ID, 'nan') AS recipient_id,
+                    {year} AS year,
+                    RECIPIENT_TYPE AS recipient_type,
+                    title_case(coalesce(RECIPIENT, 'nan')) AS recipient,
+                    RECIPIENT_OFFICE AS recipient_office,
+                    RECIPIENT_PARTY AS recipient_party
+                FROM {scan}
+                """
+            )
+        elif "expense" in filepath.stem:
+            selects["expense"].append(
+                f"""
+                SELECT
+                    coalesce(DONOR_ID, 'nan') AS donor_id,
+                    {year} AS year,
+                    title_case(coalesce(RECIPIENT, 'nan')) AS recipient,
+                    TRY_CAST(AMOUNT AS DOUBLE) AS amount,
+                    title_case(coalesce(PURPOSE, 'nan')) AS purpose
+                FROM {scan}
+                """
+            )
+
+    connection.execute(
+        f"""
+        CREATE MACRO classify_contributor(name) AS
+            CASE WHEN list_has_any(
+                string_split_regex(upper(name), '[[:space:]]+'),
+                {sql_list(const.PA_ORGANIZATION_IDENTIFIERS)}
+            ) THEN 'Organization' ELSE 'Individual' END
+        """
+    )
+    filer_types = " ".join(
+        f"WHEN {abbreviation} THEN {sql_string(filer_type)}"
+        for abbreviation, filer_type in const.PA_FILER_ABBREV_DICT.items()
+    )
+    # a filer's first row in its year's file describes it, so keep file order
+    connection.execute("SET preserve_insertion_order = true")
+    connection.execute(
+        "CREATE TABLE pa_filer_rows AS "
+        + union_all(
+            selects["filer"],
+            [
+                "recipient_id",
+                "year",
+                "recipient_type",
+                "recipient",
+                "recipient_office",
+                "recipient_party",
+            ],
+        )
+    )
+    connection.execute("SET preserve_insertion_order = false")
+    connection.execute(
+        f"""
+        CREATE VIEW pa_filers AS
+        SELECT
+            recipient_id,
+            year,
+            CASE TRY_CAST(recipient_type AS DOUBLE) {filer_types} END
+                AS recipient_type,
+            recipient,
+            recipient_office,
+            recipient_party
+        FROM pa_filer_rows
+        QUALIFY row_number() OVER (PARTITION BY year, recipient_id ORDER BY rowid) = 1
+        """
+    )
+    connection.execute(
+        "CREATE VIEW pa_contributions AS "
+        + union_all(
+            selects["contrib"],
+            ["recipient_id", "year", "donor", "purpose", "amount"],
+        )
+    )
+    connection.execute(
+        "CREATE VIEW pa_expenses AS "
+        + union_all(
+            selects["expense"],
+            ["donor_id", "year", "recipient", "amount", "purpose"],
+        )
+    )
+
+    connection.execute(
+        "CREATE TABLE pa_id_lookup (raw_id VARCHAR, year BIGINT, uuid VARCHAR)"
+    )
+    if state_cleaner.id_lookup_path.exists():
+        connection.execute(
+            "INSERT INTO pa_id_lookup SELECT raw_id, year, uuid "
+            f"FROM read_parquet({sql_string(state_cleaner.id_lookup_path)})"
+        )
+    # keyed like PennsylvaniaTransformer.transaction_ids keys them, see
+    # utils.transform.utils.text_keys
+    transaction_key = f" || chr({ord(KEY_SEPARATOR)}) || ".join(
+        f"coalesce(CAST({column.lower()} AS VARCHAR), '<NA>')"
+        for column in const.PA_TRANSACTION_KEY_COLUMNS
+    )
+    connection.execute(
+        f"""
+        CREATE TABLE pa_standardized AS
+        WITH merged AS (
+            SELECT
+                contributions.amount,
+                contributions.donor,
+                NULL AS donor_id,
+                NULL AS donor_office,
+                NULL AS donor_party,
+                classify_contributor(contributions.donor) AS donor_type,
+                contributions.purpose,
+                filers.recipient,
+                contributions.recipient_id,
+                filers.recipient_office,
+                filers.recipient_party,
+                coalesce(filers.recipient_type, 'Organization') AS recipient_type,
+                contributions.year
+            FROM pa_contributions AS contributions
+            LEFT JOIN pa_filers AS filers
+                ON contributions.recipient_id = filers.recipient_id
+                AND contributions.year = filers.year
+            UNION ALL
+            -- recipients of expenditures are not described, so are
+            -- organizations
+            SELECT
+                expenses.amount,
+                filers.recipient,
+                expenses.donor_id,
+                filers.recipient_office,
+                filers.recipient_party,
+                coalesce(
+                    filers.recipient_type, classify_contributor(filers.recipient)
+                ),
+                expenses.purpose,
+                expenses.recipient,
+                NULL,
+                NULL,
+                NULL,
+                'Organization',
+                expenses.year
+            FROM pa_expenses AS expenses
+            JOIN pa_filers AS filers
+                ON expenses.donor_id = filers.recipient_id
+                AND expenses.year = filers.year
+        ),
+        keyed AS (
+            SELECT *, {transaction_key} AS transaction_key FROM merged
+        ),
+        identified AS (
+            -- identical transactions are told apart by their occurrence
+            SELECT
+                * EXCLUDE (transaction_key),
+                uuid5(
+                    {sql_string(state)},
+                    'transaction',
+                    transaction_key || chr({ord(KEY_SEPARATOR)}) || CAST(
+                        row_number() OVER (PARTITION BY transaction_key) - 1
+                        AS VARCHAR
+                    )
+                ) AS transaction_id
+            FROM keyed
+        )
+        SELECT
+            identified.* REPLACE (
+                CASE
+                    WHEN donor_id IS NOT NULL THEN coalesce(
+                        donor_lookup.uuid,
+                        uuid5(
+                            {sql_string(state)},
+                            'entity',
+                            donor_id || chr(31) || CAST(identified.year AS VARCHAR)
+                        )
+                    )
+                    WHEN normalize_name(donor) <> '' THEN uuid5(
+                        {sql_string(state)}, 'named entity', normalize_name(donor)
+                    )
+                    ELSE uuid5({sql_string(state)}, 'unnamed entity', transaction_id)
+                END AS donor_id,
+                CASE
+                    WHEN recipient_id IS NOT NULL THEN coalesce(
+                        recipient_lookup.uuid,
+                        uuid5(
+                            {sql_string(state)},
+                            'entity',
+                            recipient_id || chr(31)
+                            || CAST(identified.year AS VARCHAR)
+                        )
+                    )
+                    WHEN normalize_name(recipient) <> '' THEN uuid5(
+                        {sql_string(state)}, 'named entity', normalize_name(recipient)
+                    )
+                    ELSE uuid5({sql_string(state)}, 'unnamed entity', transaction_id)
+                END AS recipient_id
+            ),
+            identified.donor_id AS provided_donor_id,
+            identified.recipient_id AS provided_recipient_id
+        FROM identified
+        LEFT JOIN pa_id_lookup AS donor_lookup
+            ON identified.donor_id = donor_lookup.raw_id
+            AND identified.year = donor_lookup.year
+        LEFT JOIN pa_id_lookup AS recipient_lookup
+            ON identified.recipient_id = recipient_lookup.raw_id
+            AND identified.year = recipient_lookup.year
+        """
+    )
+    connection.execute(
+        f"""
+        CREATE VIEW individuals AS
+        WITH entities AS (
+            SELECT
+                donor AS full_name, donor_id AS id, donor_party AS party,
+                donor_type AS entity_type
+            FROM pa_standardized
+            WHERE donor_type IN {tuple(PA_INDIVIDUAL_TYPES)}
+            UNION
+            SELECT recipient, recipient_id, recipient_party, recipient_type
+            FROM pa_standardized
+            WHERE recipient_type IN {tuple(PA_INDIVIDUAL_TYPES)}
+        )
+        SELECT
+            *,
+            NULL AS first_name,
+            NULL AS last_name,
+            NULL AS company,
+            'PA' AS state
+        FROM entities
+        """
+    )
+    connection.execute(
+        f"""
+        CREATE VIEW organizations AS
+        WITH entities AS (
+            SELECT donor_id AS id, donor AS name, donor_type AS entity_type
+            FROM pa_standardized
+            WHERE donor_type IN {tuple(PA_ORGANIZATION_TYPES)}
+            UNION
+            SELECT recipient_id, recipient, recipient_type
+            FROM pa_standardized
+            WHERE recipient_type IN {tuple(PA_ORGANIZATION_TYPES)}
+        )
+        SELECT *, 'PA' AS state FROM entities
+        """
+    )
+    connection.execute(
+        """
+        CREATE VIEW transactions AS
+        SELECT
+            amount, donor_id, donor_type, donor_office, purpose, recipient_id,
+            recipient_type, recipient_office AS office_sought, year, transaction_id
+        FROM pa_standardized
+        """
+    )
+
+
+def write_michigan_id_mapping(
+    connection: duckdb.DuckDBPyConnection, state_cleaner: PartitionedTransformer
+) -> None:
+    """Writes MichiganIDMap.csv from the id_mapping view
+
+    The mapping is written to the state cleaner's id_mapping_path, through a
+    temporary file as the pandas transformer writes it. It has the same
+    individual and organization rows, but no transaction rows.
+    """
+    output_path = state_cleaner.id_mapping_path
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = output_path.with_name(f"{output_path.name}.tmp")
+    connection.execute(
+        f"COPY (SELECT * FROM id_mapping) TO {sql_string(temporary_path)} "
+        "(FORMAT csv, HEADER)"
+    )
+    temporary_path.replace(output_path)
+
+
+def write_pennsylvania_id_lookup(
+    connection: duckdb.DuckDBPyConnection, state_cleaner: PartitionedTransformer
+) -> None:
+    """Adds the provided ids that are new to Pennsylvania's id lookup table
+
+    The table is written by the state cleaner's write_id_lookup, so later
+    runs of either backend reuse the ids.
+    """
+    new_ids = connection.execute(
+        """
+        SELECT DISTINCT raw_id, year, uuid
+        FROM (
+            SELECT provided_donor_id AS raw_id, year, donor_id AS uuid
+            FROM pa_standardized WHERE provided_donor_id IS NOT NULL
+            UNION ALL
+            SELECT provided_recipient_id, year, recipient_id
+            FROM pa_standardized WHERE provided_recipient_id IS NOT NULL
+        ) AS provided_ids
+        ANTI JOIN pa_id_lookup USING (raw_id, year)
+        """
+    ).df()
+    if new_ids.empty:
+        return
+    id_lookup = pd.concat(
+        [connection.execute("SELECT * FROM pa_id_lookup").df(), new_ids],
+        ignore_index=True,
+    )
+    id_lookup["year"] = id_lookup["year"].astype("Int64")
+    state_cleaner.write_id_lookup(id_lookup)
+
+
+# functions creating the individuals, organizations and transactions views
+# of each state transformed by this backend, by state transformer name
+DUCKDB_STATE_TABLES: dict[
+    str,
+    Callable[
+        [duckdb.DuckDBPyConnection, PartitionedTransformer, list[Path], Path], None
+    ],
+] = {
+    "Michigan": create_michigan_tables,
+    "Pennsylvania": create_pennsylvania_tables,
+}
+
+# functions writing the id outputs of each state's pandas transformer (its id
+# mapping or id lookup table) once its tables are written, by state name
+DUCKDB_STATE_ID_OUTPUTS: dict[
+    str, Callable[[duckdb.DuckDBPyConnection, PartitionedTransformer], None]
+] = {
+    "Michigan": write_michigan_id_mapping,
+    "Pennsylvania": write_pennsylvania_id_lookup,
+}
+
+
+def write_tables(
+    connection: duckdb.DuckDBPyConnection, state: str, output_directory: str | Path
+) -> dict[str, Path]:
+    """Writes a state's table views as partitioned Parquet datasets
+
+    Tables are written with the layout of
+    utils.transform.storage.write_state_tables and cast to the standard column
+    types. The state's previous partitions are removed first.
+
+    Args:
+        connection: connection with individuals, organizations and
+            transactions views
+        state: name of the state the tables were transformed from
+        output_directory: root directory of the datasets
+
+    Returns: dict mapping each table name to its dataset directory
+    """
+    output_directory = Path(output_directory)
+    dataset_directories = {}
+    for table_name in TABLE_NAMES:
+        dataset_directory = output_directory / table_name
+        dataset_directories[table_name] = dataset_directory
+        state_directory = dataset_directory / f"{SOURCE_STATE_PARTITION}={state}"
+        shutil.rmtree(state_directory, ignore_errors=True)
+        state_directory.mkdir(parents=True)
+
+        columns = connection.table(table_name).columns
+        select = ", ".join(
+            f"CAST({sql_identifier(column)} AS "
+            f"{DUCKDB_TYPES[STANDARD_COLUMN_TYPES[column]]}) AS {sql_identifier(column)}"
+            if column in STANDARD_COLUMN_TYPES
+            else sql_identifier(column)
+            for column in columns
+        )
+        query = f"SELECT {select} FROM {table_name}"
+        if YEAR_PARTITION in columns:
+            connection.execute(
+                f"COPY ({query}) TO {sql_string(state_directory)} "
+                f"(FORMAT parquet, COMPRESSION zstd, "
+                f"PARTITION_BY ({YEAR_PARTITION}), OVERWRITE_OR_IGNORE)"
+            )
+        else:
+            connection.execute(
+                f"COPY ({query}) TO {sql_string(state_directory / 'part-0.parquet')} "
+                f"(FORMAT parquet, COMPRESSION zstd)"
+            )
+    return dataset_directories
+
+
+def transform_state_to_parquet(
+    state_cleaner: PartitionedTransformer,
+    output_directory: str | Path,
+    filepaths: list[Path] = None,
+    temp_directory: str | Path = None,
+    memory_limit: str = None,
+    threads: int = None,
+) -> dict[str, Path]:
+    """Transforms a state's raw files with DuckDB into partitioned Parquet
+
+    The tables are written out of core: only DuckDB's memory_limit is used,
+    and the rest spills to temp_directory. Raw files are also copied there as
+    UTF-8, so it needs about as much free space as the raw files take up.
+    The state's id mapping or id lookup table is then written as the pandas
+    transformer writes it (see DUCKDB_STATE_ID_OUTPUTS).
+
+    Args:
+        state_cleaner: state cleaner of a state in DUCKDB_STATE_TABLES
+        output_directory: root directory of the datasets, as in
+            utils.transform.storage.write_state_tables
+        filepaths: raw files to transform. Defaults to all of the state's raw
+            partitions
+        temp_directory: directory to stage UTF-8 copies and spill in.
+            Defaults to the system temporary directory
+        memory_limit: see connect
+        threads: see connect
+
+    Returns: dict mapping each table name to its dataset directory
+    """
+    create_tables = DUCKDB_STATE_TABLES.get(state_cleaner.name)
+    if create_tables is None:
+        raise ValueError(f"{state_cleaner.name} has no DuckDB backend")
+    if filepaths is None:
+        filepaths = [
+            filepath
+            for partition_filepaths in state_cleaner.raw_partitions().values()
+            for filepath in partition_filepaths
+        ]
+    with tempfile.TemporaryDirectory(dir=temp_directory) as staging_directory:
+        connection = connect(staging_directory, memory_limit, threads)
+        try:
+            create_tables(connection, state_cleaner, filepaths, Path(staging_directory))
+            dataset_directories = write_tables(
+                connection, state_cleaner.name, output_directory
+            )
+            DUCKDB_STATE_ID_OUTPUTS[state_cleaner.name](connection, state_cleaner)
+            return dataset_directories
+        finally:
+            connection.close()
@@ -0,0 +1,265 @@
+"""Skip re-transforming raw data partitions that have not changed
+
+Each state's tables are cached per partition of its raw files (see
+PartitionedTransformer.raw_partitions) along with a manifest recording, for every
+raw file, its content hash, modification time and size, plus a version of the
+transformer's code. On the next run a partition is only transformed again if
+one of its files or the code changed.
+
+Layout of the cache directory:
+    <state>/manifest.json
+    <state>/<partition>/<table>.arrow
+    <state>/<partition>/id_mapping.arrow, for states with an id mapping
+"""
+
+import hashlib
+import inspect
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from utils.transform import clean, storage
+from utils.transform.clean import PartitionedTransformer
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+# tables of entities, which may appear in the tables of several partitions
+ENTITY_TABLE_NAMES = ["individuals", "organizations"]
+
+# cached alongside a partition's tables (see
+# PartitionedTransformer.clean_partition_with_id_mapping)
+ID_MAPPING_NAME = "id_mapping"
+
+# bytes read at a time when hashing raw files
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(path: str | Path) -> str:
+    """Returns the sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(state_cleaner: PartitionedTransformer) -> str:
+    """Returns a hash of the code used to transform a state's data
+
+    Covers every module of the transform package, since a state's cleaner
+    may build on any of them (e.g. the Pennsylvania cleaner is timed by the
+    instrumentation module), so editing any of them invalidates the cached
+    partitions. The module defining the state cleaner's class is included
+    too, in case it lives outside the package.
+    """
+    package_directory = Path(inspect.getsourcefile(clean)).parent
+    module_paths = sorted(package_directory.glob("*.py"))
+    state_module_path = Path(inspect.getsourcefile(type(state_cleaner))).resolve()
+    if state_module_path.parent != package_directory.resolve():
+        module_paths.append(state_module_path)
+    digest = hashlib.sha256()
+    for module_path in module_paths:
+        digest.update(module_path.name.encode())
+        digest.update(module_path.read_bytes())
+    return digest.hexdigest()
+
+
+def fingerprint_files(
+    filepaths: list[Path], previous_fingerprints: dict[str, dict]
+) -> dict[str, dict]:
+    """Records the content hash, modification time and size of raw files
+
+    A file whose modification time and size match its previous fingerprint
+    keeps its previous hash instead of being read again.
+
+    Args:
+        filepaths: raw files to fingerprint
+        previous_fingerprints: fingerprints from the last run, by file path
+
+    Returns: dict mapping each file path to its fingerprint
+    """
+    fingerprints = {}
+    for filepath in filepaths:
+        stat = Path(filepath).stat()
+        fingerprint = {"mtime": stat.st_mtime, "size": stat.st_size}
+        previous = previous_fingerprints.get(str(filepath), {})
+        if (
+            previous.get("mtime") == fingerprint["mtime"]
+            and previous.get("size") == fingerprint["size"]
+        ):
+            fingerprint["sha256"] = previous["sha256"]
+        else:
+            fingerprint["sha256"] = hash_file(filepath)
+        fingerprints[str(filepath)] = fingerprint
+    return fingerprints
+
+
+def read_manifest(manifest_path: Path) -> dict:
+    """Reads a state's manifest, or returns an empty one if there is none"""
+    if not manifest_path.exists():
+        return {"code_version": None, "partitions": {}}
+    with manifest_path.open() as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict, manifest_path: Path) -> None:
+    """Writes a manifest, replacing the previous one only once fully written"""
+    temporary_path = manifest_path.with_suffix(".tmp")
+    with temporary_path.open("w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    temporary_path.replace(manifest_path)
+
+
+def partition_is_unchanged(
+    previous_partition: dict | None,
+    fingerprints: dict[str, dict],
+    partition_directory: Path,
+) -> bool:
+    """Checks whether a partition's cached tables can be reused
+
+    Args:
+        previous_partition: the partition's entry in the previous manifest
+        fingerprints: current fingerprints of the partition's files
+        partition_directory: directory holding the partition's cached tables
+
+    Returns: True if the partition has the same files with the same contents
+        as when its tables were cached, and they are all still there
+    """
+    if previous_partition is None:
+        return False
+    previous_hashes = {
+        filepath: fingerprint["sha256"]
+        for filepath, fingerprint in previous_partition["files"].items()
+    }
+    current_hashes = {
+        filepath: fingerprint["sha256"]
+        for filepath, fingerprint in fingerprints.items()
+    }
+    return previous_hashes == current_hashes and all(
+        (partition_directory / f"{table_name}.arrow").exists()
+        for table_name in previous_partition["tables"]
+    )
+
+
+def read_cached_table(
+    partition_directory: Path, table_name: str, cached_table_names: list[str]
+) -> pd.DataFrame | None:
+    """Reads a partition's cached table, None if the partition has no such table"""
+    if table_name not in cached_table_names:
+        return None
+    return storage.read_ipc(partition_directory / f"{table_name}.arrow")
+
+
+def clean_state_incrementally(
+    state_cleaner: PartitionedTransformer, cache_directory: str | Path
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Runs a state cleaner, reusing cached tables of unchanged partitions
+
+    Partitions whose raw files changed, are new, or were transformed with
+    different code are transformed with clean_partition_with_id_mapping and
+    cached along with their id mapping, if the state has one. Cached
+    partitions whose raw files are gone are deleted. Partitions are
+    transformed within one cleaning session of the state cleaner (see
+    PartitionedTransformer.cleaning_session). Once every partition is
+    transformed or reused, the state's id mapping is written from those of
+    all partitions (see PartitionedTransformer.output_id_mapping).
+
+    Args:
+        state_cleaner: state cleaner to run
+        cache_directory: root directory of the cache shared by all states
+
+    Returns: (individuals, organizations, transactions) tables of the state,
+        made up of every partition's tables. A table is None if no partition
+        produced it.
+    """
+    state_directory = Path(cache_directory) / state_cleaner.name
+    state_directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = state_directory / MANIFEST_FILE_NAME
+    previous_manifest = read_manifest(manifest_path)
+    current_code_version = code_version(state_cleaner)
+    if previous_manifest["code_version"] != current_code_version:
+        previous_manifest["partitions"] = {}
+    manifest = {"code_version": current_code_version, "partitions": {}}
+
+    partition_tables = []
+    partition_id_mappings = []
+    with state_cleaner.cleaning_session():
+        for partition, filepaths in state_cleaner.raw_partitions().items():
+            partition_directory = state_directory / partition
+            previous_partition = previous_manifest["partitions"].get(partition)
+            fingerprints = fingerprint_files(
+                filepaths,
+                {} if previous_partition is None else previous_partition["files"],
+            )
+            if partition_is_unchanged(
+                previous_partition, fingerprints, partition_directory
+            ):
+                print(f"Reusing {state_cleaner.name} partition {partition}")
+                cached_table_names = previous_partition["tables"]
+                tables = [
+                    read_cached_table(
+                        partition_directory, table_name, cached_table_names
+                    )
+                    for table_name in storage.TABLE_NAMES
+                ]
+                id_mapping = read_cached_table(
+                    partition_directory, ID_MAPPING_NAME, cached_table_names
+                )
+            else:
+                print(f"Transforming {state_cleaner.name} partition {partition}")
+                tables, id_mapping = state_cleaner.clean_partition_with_id_mapping(
+                    filepaths
+                )
+                shutil.rmtree(partition_directory, ignore_errors=True)
+                partition_directory.mkdir(parents=True)
+                cached_table_names = []
+                for table_name, table in zip(
+                    [*storage.TABLE_NAMES, ID_MAPPING_NAME], [*tables, id_mapping]
+                ):
+                    if table is not None:
+                        storage.write_ipc(
+                            table, partition_directory / f"{table_name}.arrow"
+                        )
+                        cached_table_names.append(table_name)
+            manifest["partitions"][partition] = {
+                "files": fingerprints,
+                "tables": cached_table_names,
+            }
+            partition_tables.append(tables)
+            if id_mapping is not None:
+                partition_id_mappings.append(id_mapping)
+            # record progress so an interrupted run keeps finished partitions
+            write_manifest(
+                {
+                    "code_version": current_code_version,
+                    "partitions": previous_manifest["partitions"]
+                    | manifest["partitions"],
+                },
+                manifest_path,
+            )
+
+    for partition in previous_manifest["partitions"]:
+        if partition not in manifest["partitions"]:
+            shutil.rmtree(state_directory / partition, ignore_errors=True)
+    write_manifest(manifest, manifest_path)
+    if partition_id_mappings:
+        state_cleaner.output_id_mapping(partition_id_mappings)
+
+    state_tables = []
+    for position, table_name in enumerate(storage.TABLE_NAMES):
+        present_tables = [
+            tables[position]
+            for tables in partition_tables
+            if tables[position] is not None
+        ]
+        if not present_tables:
+            state_tables.append(None)
+            continue
+        state_table = pd.concat(present_tables, ignore_index=True)
+        if state_cleaner.drops_duplicate_entities and table_name in ENTITY_TABLE_NAMES:
+            # as in a full run, an entity in several partitions is listed once
+            state_table = state_table.drop_duplicates(ignore_index=True)
+        state_tables.append(state_table)
+    return tuple(state_tables)
@@ -0,0 +1,213 @@
+"""Timing and memory instrumentation of state transformer stages
+
+Every preprocess, clean, standardize and create_tables method of a
+StateTransformer subclass is decorated with instrumented_stage (see
+StateTransformer.__init_subclass__). Stages run as usual unless a StageRecorder
+is recording, in which case each call of a stage is measured:
+- wall_seconds and cpu_seconds: time taken by the stage, CPU time including
+  any threads it runs
+- max_rss_mb: peak resident memory of the process by the end of the stage,
+  and max_rss_growth_mb: how much the stage raised that peak
+- traced_peak_mb: peak memory allocated by Python during the stage, if the
+  recorder traces memory with tracemalloc (which slows stages down)
+- input_rows and output_rows: number of rows of each dataframe passed to and
+  returned by the stage
+
+A run report of the recorded stages is written as JSON, e.g. by
+transform_and_merge(report_path=...), so runs can be compared stage by stage.
+"""
+
+import datetime
+import functools
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+STAGE_NAMES = ["preprocess", "clean", "standardize", "create_tables"]
+
+# recorder measuring stages in this process, if any
+_active_recorder = None
+
+
+def max_rss_mb() -> float | None:
+    """Peak resident memory of this process so far, in MB"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def count_rows(data: object) -> list[int]:
+    """Number of rows of each dataframe in data
+
+    Args:
+        data: a dataframe, or lists, tuples and dicts holding dataframes
+
+    Returns: row counts, in the order the dataframes appear in data
+    """
+    if isinstance(data, pd.DataFrame):
+        return [len(data)]
+    if isinstance(data, dict):
+        data = list(data.values())
+    if isinstance(data, list | tuple):
+        return [row_count for item in data for row_count in count_rows(item)]
+    return []
+
+
+class StageRecorder:
+    """Records the time, memory and row counts of state transformer stages"""
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        """Creates a recorder with no recorded stages
+
+        Args:
+            trace_memory: whether to measure the peak memory allocated during
+                each stage with tracemalloc
+        """
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._recording = False
+
+    def record(
+        self, state: str, stage: str, method: Callable, *args, **kwargs
+    ) -> object:
+        """Calls a stage method, recording its measurements
+
+        A stage called from within another stage is only measured as part of
+        the outer stage.
+
+        Args:
+            state: name of the state the stage transforms
+            stage: name of the stage, e.g. 'clean'
+            method: the stage method
+            *args: positional arguments to call method with
+            **kwargs: keyword arguments to call method with
+
+        Returns: what the stage method returns
+        """
+        if self._recording:
+            return method(*args, **kwargs)
+        self._recording = True
+        try:
+            if self.trace_memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+            rss_before = max_rss_mb()
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            result = method(*args, **kwargs)
+            cpu_seconds = time.process_time() - cpu_start
+            wall_seconds = time.perf_counter() - wall_start
+            rss_after = max_rss_mb()
+            traced_peak_mb = None
+            if self.trace_memory:
+                traced_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            self._recording = False
+
+        self.stages.append(
+            {
+                "state": state,
+                "stage": stage,
+                "wall_seconds": wall_seconds,
+                "cpu_seconds": cpu_seconds,
+                "max_rss_mb": rss_after,
+                "max_rss_growth_mb": (
+                    None if rss_after is None else rss_after - rss_before
+                ),
+                "traced_peak_mb": traced_peak_mb,
+                "input_rows": count_rows([args, kwargs]),
+                "output_rows": count_rows(result),
+            }
+        )
+        return result
+
+    def report(self) -> dict:
+        """Returns the run report of the recorded stages
+
+        The report holds every recorded stage in the order they ran, and the
+        total time of each state's stages.
+        """
+        state_totals = {}
+        for stage in self.stages:
+            totals = state_totals.setdefault(
+                stage["state"], {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+            )
+            totals["wall_seconds"] += stage["wall_seconds"]
+            totals["cpu_seconds"] += stage["cpu_seconds"]
+        return {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "trace_memory": self.trace_memory,
+            "states": state_totals,
+            "stages": self.stages,
+        }
+
+    def write_report(self, path: str | Path) -> Path:
+        """Writes the run report to a JSON file
+
+        Returns: path to the report
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+@contextmanager
+def recording_stages(recorder: StageRecorder | None) -> Iterator[StageRecorder]:
+    """Records the stages run in this process with recorder while in context
+
+    Args:
+        recorder: recorder to record stages with. If None, stages are not
+            recorded.
+
+    Yields: recorder
+    """
+    global _active_recorder
+    previous_recorder = _active_recorder
+    _active_recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _active_recorder = previous_recorder
+
+
+def instrumented_stage(stage: str) -> Callable:
+    """Decorates a stage method so it is measured by the active recorder, if any
+
+    StateTransformer subclasses' stage methods are decorated automatically. A
+    helper that does a stage's work outside of the stage method, e.g. reading
+    one partition's raw files, can be decorated with the stage's name.
+
+    Args:
+        stage: name of the stage, e.g. 'preprocess'
+
+    Returns: decorator of a StateTransformer method
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs) -> object:  # noqa: ANN001
+            if _active_recorder is None:
+                return method(self, *args, **kwargs)
+            return _active_recorder.record(
+                self.name, stage, method, self, *args, **kwargs
+            )
+
+        return wrapper
+
+    return decorator
@@ -1,32 +1,96 @@
 """State transformer implementation for Michigan"""
 
-import uuid
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_numeric_dtype
 
 from utils.constants import BASE_FILEPATH
-from utils.transform.clean import StateTransformer
+from utils.transform.clean import PartitionedTransformer
 from utils.transform.constants import (
+    MI_CHUNKSIZE,
     MI_CON_FILEPATH,
     MI_CONT_DROP_COLS,
     MI_CONTRIBUTION_COLUMNS,
     MI_EXP_DROP_COLS,
     MI_EXP_FILEPATH,
     MI_EXPENDITURE_COLUMNS,
+    MI_MENOMINEE_COUNTY,
+    MI_NUMERIC_COLUMNS,
     MICHIGAN_CONTRIBUTION_COLS_RENAME,
     MICHIGAN_CONTRIBUTION_COLS_REORDER,
 )
+from utils.transform.instrumentation import instrumented_stage
+from utils.transform.storage import append_parquet_part
+from utils.transform.utils import content_keys, stable_uuid_arrow, uuid5_arrow
 
 
-def read_expenditure_data(filepath: str, columns: list[str]) -> pd.DataFrame:
+def fix_menominee_county_rows(contribution_df: pd.DataFrame) -> pd.DataFrame:
+    """Shifts the Menominee County rows of MI contribution data back in place
+
+    The raw Menominee County Democratic Party rows have their values one
+    column off. Only those rows are rewritten, so data without them (nearly
+    every file or chunk) is returned untouched.
+
+    Inputs:
+        contribution_df (Pandas DataFrame): MI contribution data as read from
+            one file or chunk
+
+    Returns: contribution_df, fixed in place
+    """
+    is_menominee = (contribution_df["com_type"] == MI_MENOMINEE_COUNTY).to_numpy()
+    if not is_menominee.any():
+        return contribution_df
+
+    shifted_rows = contribution_df.loc[
+        is_menominee, MICHIGAN_CONTRIBUTION_COLS_REORDER
+    ].to_numpy()
+    for column in MICHIGAN_CONTRIBUTION_COLS_RENAME:
+        # shifted values may not fit the type parsed for their new column
+        if contribution_df[column].dtype != object:
+            contribution_df[column] = contribution_df[column].astype(object)
+    contribution_df.loc[is_menominee, MICHIGAN_CONTRIBUTION_COLS_RENAME] = shifted_rows
+    contribution_df.loc[is_menominee, "aggregate"] = 0.0
+
+    return contribution_df
+
+
+def drop_menominee_county_rows(expenditure_df: pd.DataFrame) -> pd.DataFrame:
+    """Drops the Menominee County rows of MI expenditure data
+
+    There are only 20 Menominee County expenditure rows, read in incorrectly
+    and missing key data. Data without them is returned untouched.
+
+    Inputs:
+        expenditure_df (Pandas DataFrame): MI expenditure data as read from
+            one file or chunk
+
+    Returns: expenditure_df without the Menominee County rows
+    """
+    is_menominee = expenditure_df["com_type"] == MI_MENOMINEE_COUNTY
+    if is_menominee.any():
+        expenditure_df = expenditure_df[~is_menominee]
+
+    return expenditure_df
+
+
+def read_expenditure_data(
+    filepath: str, columns: list[str], chunksize: int = None
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
     """Reads in the MI expenditure data
 
     Inputs:
         filepath (str): filepath to the MI Expenditure Data txt file
         columns (lst): list of string names of the campaign data columns
+        chunksize (int): if given, read the file lazily in chunks of this
+            many rows
 
     Returns: df (Pandas DataFrame): dataframe of the MI Expenditure data
+        without the Menominee County rows, or an iterator of dataframes if
+        chunksize is given
     """
     if filepath.endswith("txt"):
         expenditure_df = pd.read_csv(
@@ -36,19 +100,28 @@ def read_expenditure_data(filepath: str, columns: list[str]) -> pd.DataFrame:
             usecols=columns,
             encoding="mac_roman",
             low_memory=False,
+            chunksize=chunksize,
         )
 
-    return expenditure_df
+    if chunksize is not None:
+        return (drop_menominee_county_rows(chunk) for chunk in expenditure_df)
+    return drop_menominee_county_rows(expenditure_df)
 
 
-def read_contribution_data(filepath: str, columns: list[str]) -> pd.DataFrame:
+def read_contribution_data(
+    filepath: str, columns: list[str], chunksize: int = None
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
     """Reads in the MI campaign data and skips the errors
 
     Inputs:
         filepath (str): filepath to the MI Campaign Data txt file
         columns (lst): list of string names of the campaign data columns
+        chunksize (int): if given, read the file lazily in chunks of this
+            many rows
 
-    Returns: df (Pandas DataFrame): dataframe of the MI campaign data
+    Returns: df (Pandas DataFrame): dataframe of the MI campaign data with
+        the Menominee County rows fixed, or an iterator of dataframes if
+        chunksize is given
     """
     if filepath.endswith("00.txt"):
         # MI files that contain 00 or between 1998 and 2003 contain headers
@@ -61,6 +134,7 @@ def read_contribution_data(filepath: str, columns: list[str]) -> pd.DataFrame:
             usecols=columns,
             low_memory=False,
             on_bad_lines="skip",
+            chunksize=chunksize,
         )
     else:
         contribution_df = pd.read_csv(
@@ -72,12 +146,15 @@ def read_contribution_data(filepath: str, columns: list[str]) -> pd.DataFrame:
             names=columns,
             low_memory=False,
             on_bad_lines="skip",
+            chunksize=chunksize,
         )
 
-    return contribution_df
+    if chunksize is not None:
+        return (fix_menominee_county_rows(chunk) for chunk in contribution_df)
+    return fix_menominee_county_rows(contribution_df)
 
 
-class MichiganTransformer(StateTransformer):
+class MichiganTransformer(PartitionedTransformer):
     """State transformer implementation for Michigan"""
 
     name = "Michigan"
@@ -102,6 +179,14 @@ class MichiganTransformer(StateTransformer):
     ]
     # map to entity types listed in the schema
 
+    uuid_column_names = [
+        "full_name",
+        "candidate_full_name",
+        "com_legal_name",
+        "vend_name",
+    ]
+    # columns naming the entities that are given uuids
+
     def clean_state(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """Runs the StateTransformer pipeline returning a tuple of cleaned dataframes
 
@@ -117,6 +202,100 @@ class MichiganTransformer(StateTransformer):
 
         return tables
 
+    def stream_state(
+        self, output_directory: str | Path, chunksize: int = MI_CHUNKSIZE
+    ) -> dict[str, Path]:
+        """Runs the StateTransformer pipeline one chunk of raw rows at a time
+
+        Each raw file is read in chunks of chunksize rows. Every chunk goes
+        through cleaning, uuid generation and table
+        creation on its own, and its tables are appended to partitioned Parquet
+        outputs, so peak memory depends on chunksize rather than on how many
+        years of data are loaded. A name is given the same uuid in every chunk.
+
+        Inputs:
+            output_directory: directory to write the partitioned tables to
+            chunksize: number of raw rows to process at once
+
+        Returns: dict mapping 'individuals', 'organizations', 'transactions'
+            and 'id_mapping' to the directories holding each table's parts
+        """
+        output_directory = Path(output_directory)
+        expenditure_filepaths, contribution_filepaths = self.create_filepaths_list()
+        merged_columns = self.merged_columns()
+        occurrence_counts = Counter()
+        table_directories = {
+            table_name: output_directory / table_name
+            for table_name in [
+                "individuals",
+                "organizations",
+                "transactions",
+                "id_mapping",
+            ]
+        }
+
+        def cleaned_chunks() -> Iterator[pd.DataFrame]:
+            for filepath in contribution_filepaths:
+                for chunk in read_contribution_data(
+                    filepath, MI_CONTRIBUTION_COLUMNS, chunksize
+                ):
+                    yield self.clean_contribution_dataframe(chunk)
+            for filepath in expenditure_filepaths:
+                for chunk in read_expenditure_data(
+                    filepath, MI_EXPENDITURE_COLUMNS, chunksize
+                ):
+                    yield self.clean_expenditure_dataframe(chunk)
+
+        for cleaned_chunk in cleaned_chunks():
+            cleaned_chunk = cleaned_chunk.reindex(columns=merged_columns)
+            cleaned_chunk = self.generate_uuid(
+                cleaned_chunk, self.uuid_column_names, occurrence_counts
+            )
+            standardized_chunk = cleaned_chunk.rename(
+                columns=self.entity_name_dictionary
+            )
+            partitions = self.partition_rows(standardized_chunk)
+            individuals, individuals_id_mapping = self.create_individuals_table(
+                standardized_chunk, partitions
+            )
+            organizations, organizations_id_mapping = self.create_organizations_table(
+                standardized_chunk, partitions
+            )
+            transactions, transactions_id_mapping = self.create_transactions_table(
+                standardized_chunk, partitions
+            )
+            id_mapping = pd.concat(
+                [
+                    individuals_id_mapping,
+                    organizations_id_mapping,
+                    transactions_id_mapping,
+                ],
+                ignore_index=True,
+            )
+            for table_name, table in zip(
+                table_directories,
+                [individuals, organizations, transactions, id_mapping],
+            ):
+                append_parquet_part(table, table_directories[table_name])
+
+        return table_directories
+
+    def merged_columns(self) -> pd.Index:
+        """Returns the columns of the cleaned, merged Michigan dataframe
+
+        These are the columns clean outputs when contribution and expenditure
+        data are concatenated, used to give every streamed chunk the same
+        columns whichever kind of file it came from.
+        """
+        empty_contributions = pd.DataFrame(columns=MI_CONTRIBUTION_COLUMNS)
+        empty_expenditures = pd.DataFrame(columns=MI_EXPENDITURE_COLUMNS)
+        return pd.concat(
+            [
+                self.clean_contribution_dataframe(empty_contributions),
+                self.clean_expenditure_dataframe(empty_expenditures),
+            ]
+        ).columns
+
     def create_filepaths_list(self) -> list[list[str], list[str]]:
         """Creates a list of Michigan Contribution and Expenditure filepaths
 
@@ -136,6 +315,60 @@ class MichiganTransformer(StateTransformer):
 
         return [exp_filepath_lst, con_filepath_lst]
 
+    def raw_partitions(self) -> dict[str, list[Path]]:
+        """Makes each Michigan Contribution and Expenditure file a partition
+
+        Returns: dict mapping '<Contribution or Expenditure>-<file stem>' to a
+            list holding that file's path
+        """
+        expenditure_filepaths, contribution_filepaths = self.create_filepaths_list()
+        return {
+            f"{Path(filepath).parent.name}-{Path(filepath).stem}": [Path(filepath)]
+            for filepath in sorted(contribution_filepaths + expenditure_filepaths)
+        }
+
+    def clean_partition(
+        self, filepaths: list[Path]
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Runs the StateTransformer pipeline on the given raw files only
+
+        Inputs:
+            filepaths: Contribution and/or Expenditure file paths
+
+        Returns: (individuals_table, organizations_table, transactions_table)
+        """
+        tables, id_mapping = self.clean_partition_with_id_mapping(filepaths)
+        self.output_id_mapping([id_mapping])
+        return tables
+
+    def clean_partition_with_id_mapping(
+        self, filepaths: list[Path]
+    ) -> tuple[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], pd.DataFrame]:
+        """Runs clean_partition without writing the partition's id mapping
+
+        Inputs:
+            filepaths: Contribution and/or Expenditure file paths
+
+        Returns: ((individuals_table, organizations_table, transactions_table),
+            id_mapping) where id_mapping is in the ID mapping format
+        """
+        expenditure_filepaths = [
+            str(filepath)
+            for filepath in filepaths
+            if Path(filepath).parent.name == MI_EXP_FILEPATH.name
+        ]
+        contribution_filepaths = [
+            str(filepath)
+            for filepath in filepaths
+            if Path(filepath).parent.name != MI_EXP_FILEPATH.name
+        ]
+        preprocessed_dataframe_lst = self.preprocess(
+            [expenditure_filepaths, contribution_filepaths]
+        )
+        cleaned_dataframe_lst = self.clean(preprocessed_dataframe_lst)
+        standardized_dataframe_lst = self.standardize(cleaned_dataframe_lst)
+        return self.create_tables_and_id_mapping(standardized_dataframe_lst)
+
     # NOTE: Helper methods above are called throughout the class
 
     def preprocess(self, filepaths_list: list[str]) -> list[pd.DataFrame]:
@@ -161,6 +394,11 @@ class MichiganTransformer(StateTransformer):
             temp_exp_list.append(read_expenditure_data(file, MI_EXPENDITURE_COLUMNS))
         for file in contributions_lst:
             temp_cont_list.append(read_contribution_data(file, MI_CONTRIBUTION_COLUMNS))
+        # a partition may hold only one kind of file
+        if not temp_exp_list:
+            temp_exp_list.append(pd.DataFrame(columns=MI_EXPENDITURE_COLUMNS))
+        if not temp_cont_list:
+            temp_cont_list.append(pd.DataFrame(columns=MI_CONTRIBUTION_COLUMNS))
 
         contribution_dataframe = self.merge_dataframes(temp_cont_list)
         expenditure_dataframe = self.merge_dataframes(temp_exp_list)
@@ -174,6 +412,9 @@ class MichiganTransformer(StateTransformer):
     ) -> pd.DataFrame:
         """Merges the list of dataframes into one Pandas DataFrame
 
+        The Menominee County rows are already fixed by the readers, so this
+        is the only copy of the data made while merging.
+
         Inputs:
                 temp_list: list of contribution of expenditure dataframes
 
@@ -181,77 +422,7 @@ class MichiganTransformer(StateTransformer):
                 merged_dataframe: Pandas DataFrame of merged contribution
                                     or expenditure data
         """
-        merged_dataframe = pd.concat(temp_list)
-        if "schedule_desc" not in merged_dataframe.columns:
-            # "schedule_desc" is only in the expenditure dataframe
-            merged_dataframe = self.fix_menominee_county_bug_contribution(
-                merged_dataframe
-            )
-        else:
-            merged_dataframe = self.drop_menominee_county(merged_dataframe)
-
-        return merged_dataframe
-
-    def fix_menominee_county_bug_contribution(
-        self, merged_campaign_dataframe: pd.DataFrame
-    ) -> pd.DataFrame:
-        """Fixes the Menominee County Rows within the Contribution data
-
-        Inputs:
-            merged_campaign_dataframe: Pandas DataFrame of merged MI
-                contribution data
-
-
-        Returns:
-            merged_campaign_dataframe: Pandas DataFrame of merged MI
-            contribution data edited in place to fix the
-            Menominee County Democratic Party bug
-
-        """
-        subset_condition = (
-            merged_campaign_dataframe["com_type"] == "MENOMINEE COUNTY DEMOCRATIC PARTY"
-        )
-
-        rows_to_fix = merged_campaign_dataframe[subset_condition]
-
-        merged_campaign_dataframe = merged_campaign_dataframe.drop(
-            merged_campaign_dataframe.loc[subset_condition].index
-        )
-
-        rows_to_fix = rows_to_fix[MICHIGAN_CONTRIBUTION_COLS_REORDER]
-        rows_to_fix.columns = MICHIGAN_CONTRIBUTION_COLS_RENAME
-
-        rows_to_fix["aggregate"] = 0.0
-
-        merged_campaign_dataframe = pd.concat(
-            [merged_campaign_dataframe, rows_to_fix], ignore_index=True
-        )
-
-        return merged_campaign_dataframe
-
-    def drop_menominee_county(
-        self, merged_campaign_dataframe: pd.DataFrame
-    ) -> pd.DataFrame:
-        """Drops the menominee county rows within the Michigan Expenditure data
-
-        Inputs:
-            merged_campaign_dataframe: Pandas DataFrame of merged MI expenditure data
-
-        Returns:
-            merged_campaign_dataframe: Pandas DataFrame of merged MI
-            expenditure data with menominee County Democratic Party columns dropped
-        """
-        # There are only 20 menominee county rows read in incorrectly and
-        # missing key data these rows are dropped
-        subset_condition = (
-            merged_campaign_dataframe["com_type"] == "MENOMINEE COUNTY DEMOCRATIC PARTY"
-        )
-
-        merged_campaign_dataframe = merged_campaign_dataframe.drop(
-            merged_campaign_dataframe.loc[subset_condition].index
-        )
-
-        return merged_campaign_dataframe
+        return pd.concat(temp_list, ignore_index=True)
 
     def clean(self, data: list[pd.DataFrame]) -> list[pd.DataFrame]:  # noqa: D102
         contribution_dataframe, expenditure_dataframe = data
@@ -260,7 +431,16 @@ class MichiganTransformer(StateTransformer):
 
         clean_exp = self.clean_expenditure_dataframe(expenditure_dataframe)
 
-        merged_dataframe = pd.concat([clean_cont, clean_exp], axis=0, ignore_index=True)
+        if clean_cont.empty or clean_exp.empty:
+            # a partition may hold only one kind of file. Concatenating its
+            # empty counterpart would turn numeric columns to object
+            merged_dataframe = pd.concat(
+                [clean_exp if clean_cont.empty else clean_cont], ignore_index=True
+            ).reindex(columns=self.merged_columns())
+        else:
+            merged_dataframe = pd.concat(
+                [clean_cont, clean_exp], axis=0, ignore_index=True
+            )
         # concatenate the dataframes along rows ignore the prior index
 
         return [merged_dataframe]
@@ -299,12 +479,13 @@ class MichiganTransformer(StateTransformer):
             + merged_contribution_dataframe["l_name_or_org"]
         )
 
+        # a chunk without candidates reads their names as all-NaN floats
         merged_contribution_dataframe["candidate_full_name"] = np.where(
             merged_contribution_dataframe["can_first_name"].notna()
             & merged_contribution_dataframe["can_last_name"].notna(),
-            merged_contribution_dataframe["can_first_name"]
+            merged_contribution_dataframe["can_first_name"].astype(object)
             + " "
-            + merged_contribution_dataframe["can_last_name"],
+            + merged_contribution_dataframe["can_last_name"].astype(object),
             np.nan,
         )
 
@@ -377,326 +558,304 @@ class MichiganTransformer(StateTransformer):
         """
         merged_dataframe = cleaned_dataframe_lst[0]
 
-        merged_dataframe = self.generate_uuid(
-            merged_dataframe,
-            ["full_name", "candidate_full_name", "com_legal_name", "vend_name"],
-        )
+        merged_dataframe = self.generate_uuid(merged_dataframe, self.uuid_column_names)
 
         return [merged_dataframe]
 
     def generate_uuid(
-        self, merged_campaign_dataframe: pd.DataFrame, column_names: list[str]
+        self,
+        merged_campaign_dataframe: pd.DataFrame,
+        column_names: list[str],
+        occurrence_counts: Counter = None,
     ) -> pd.DataFrame:
         """Generates uuids for the pandas DataFrame based on the column names provided
 
+        Ids are derived from the data (see StateTransformer.stable_ids), so a
+        value always gets the same uuid, in every chunk, partition and run.
+        Each column is factorized once and its ids are formatted in bulk into
+        compact pyarrow-backed string columns, without a Python string per row.
+
         Inputs:
             merged_campaign_dataframe:  Merged Michigan campaign
             expenditure or contribution dataframe
             column_names: List of column names for which UUIDs will be generated
+            occurrence_counts: optional Counter shared by every chunk of a
+                dataframe processed in chunks, so identical transactions in
+                different chunks get different transaction ids
 
         Returns:
             merged_campaign_dataframe: Merged Michigan campaign
             expenditure or contribution dataframe modified in place
 
         """
+        # create transaction ID for each row of the dataframe
+        transaction_ids = uuid5_arrow(
+            self.name,
+            "transaction",
+            content_keys(
+                self.transaction_key_columns(merged_campaign_dataframe),
+                occurrence_counts,
+            ),
+        )
         for col_name in column_names:
-            non_null_values = merged_campaign_dataframe[
-                merged_campaign_dataframe[col_name].notna()
-            ][col_name]
+            merged_campaign_dataframe[f"{col_name}_uuid"] = stable_uuid_arrow(
+                self.name, col_name, merged_campaign_dataframe[col_name]
+            )
 
-            ids = {value: str(uuid.uuid4()) for value in non_null_values}
+        merged_campaign_dataframe["transaction_id"] = transaction_ids
 
-            # Map the generated UUIDs to a new column in the DataFrame
-            merged_campaign_dataframe[f"{col_name}_uuid"] = merged_campaign_dataframe[
-                col_name
-            ].map(ids)
+        return merged_campaign_dataframe
 
-        # create transaction ID for each row of the dataframe
-        merged_campaign_dataframe["transaction_id"] = [
-            uuid.uuid4() for _ in range(len(merged_campaign_dataframe))
-        ]
+    def transaction_key_columns(
+        self, merged_campaign_dataframe: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Casts the merged dataframe to the types its rows are keyed as
 
-        return merged_campaign_dataframe
+        A column's type depends on which rows were read together, e.g. amounts
+        are integers in a file of whole dollar amounts, and a column only
+        expenditure files have is all NaN floats in a partition of
+        contribution files. Keying MI_NUMERIC_COLUMNS as floats and other
+        columns as objects gives a transaction the same id in a full run, a
+        partition and a streamed chunk.
+
+        Inputs:
+            merged_campaign_dataframe: Merged Michigan campaign
+            expenditure or contribution dataframe
+
+        Returns: the dataframe with its columns cast
+        """
+        return merged_campaign_dataframe.astype(
+            {
+                column: (
+                    "float64"
+                    if column in MI_NUMERIC_COLUMNS and is_numeric_dtype(dtype)
+                    else object
+                )
+                for column, dtype in merged_campaign_dataframe.dtypes.items()
+            }
+        )
 
     def create_tables(
         self, data: list[pd.DataFrame]
     ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """Creates the Individuals, Organizations, and Transactions tables
 
+        Their ID mapping is written to MichiganIDMap.csv (see
+        output_id_mapping).
+
         Inputs:
             data: a list of 1 or 3 dataframes as outputted from standardize method.
 
         Returns: (individuals_table, organizations_table, transactions_table)
                     tuple containing the tables as defined in database schema
         """
+        tables, id_mapping = self.create_tables_and_id_mapping(data)
+        self.output_id_mapping([id_mapping])
+
+        return tables
+
+    @instrumented_stage("create_tables")
+    def create_tables_and_id_mapping(
+        self, data: list[pd.DataFrame]
+    ) -> tuple[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], pd.DataFrame]:
+        """Creates the tables as create_tables does, returning their ID mapping
+
+        Inputs:
+            data: a list of 1 or 3 dataframes as outputted from standardize method.
+
+        Returns: ((individuals_table, organizations_table, transactions_table),
+            id_mapping) where id_mapping holds the ids of all three tables
+        """
+        merged_dataframe = data[0]
+        partitions = self.partition_rows(merged_dataframe)
         (
             individuals_table,
             individuals_id_mapping,
-        ) = self.create_individuals_table(data)
+        ) = self.create_individuals_table(merged_dataframe, partitions)
         (
             organizations_table,
             organizations_id_mapping,
-        ) = self.create_organizations_table(data)
+        ) = self.create_organizations_table(merged_dataframe, partitions)
         (
             transactions_table,
             transactions_id_mapping,
-        ) = self.create_transactions_table(data)
-        # TODO: fix duplicated transaction_type column
-        transactions_table = transactions_table.loc[
-            :, ~transactions_table.columns.duplicated()
-        ]
-        self.output_id_mapping(
-            individuals_id_mapping,
-            organizations_id_mapping,
-            transactions_id_mapping,
+        ) = self.create_transactions_table(merged_dataframe, partitions)
+        id_mapping = pd.concat(
+            [individuals_id_mapping, organizations_id_mapping, transactions_id_mapping],
+            ignore_index=True,
         )
 
-        return (individuals_table, organizations_table, transactions_table)
+        return (individuals_table, organizations_table, transactions_table), id_mapping
 
     # NOTE: The helper functions for ID_mapping output are below
 
-    def output_id_mapping(
-        self,
-        individuals_map: pd.DataFrame,
-        organizations_map: pd.DataFrame,
-        transactions_map: pd.DataFrame,
-    ) -> None:
-        """Creates MichiganIDMAp.csv
-
-        Inputs:
-            individuals_map: dataframe of individuals mapped to database
-            and provided uuid
-            organizations_map: dataframe of organizations mapped to database
-            and provided uuid
-            transactions_map: database of transactions mapped to databasee
-            and provided uuid
-
-        Returns: None, Creates data/output/MichiganIDMAp.csv
-        """
-        output_path = BASE_FILEPATH / "output" / "MichiganIDMap.csv"
-
-        michigan_id_map = pd.concat(
-            [individuals_map, organizations_map, transactions_map],
-            ignore_index=True,
-        )
-
-        if not output_path.parent.exists():
-            output_path.parent.mkdir()
+    @property
+    def id_mapping_path(self) -> Path:
+        """CSV file the ID mapping of the state's provided ids is written to"""
+        return BASE_FILEPATH / "output" / "MichiganIDMap.csv"
 
-        michigan_id_map.to_csv(output_path, index=False)
+    def output_id_mapping(self, id_mappings: Iterable[pd.DataFrame]) -> None:
+        """Creates MichiganIDMap.csv from the ID mappings of a run's parts
 
-    def create_individuals_id_mapping(
-        self, individuals: pd.DataFrame, candidates: pd.DataFrame
-    ) -> pd.DataFrame:
-        """Creates the ID mapping dataframe for individuals
+        The mappings, e.g. of each partition or chunk, are appended one at a
+        time to a temporary file, which then replaces the previous mapping, so
+        an interrupted run leaves the previous mapping as it was.
 
         Inputs:
-            individuals: DataFrame with individuals data
-            candidates: DataFrame with candidates data
+            id_mappings: dataframes in the ID mapping format, such as those
+            returned by create_tables_and_id_mapping
 
-        Returns: id_mapping: dataframe in the ID mapping format
+        Returns: None, Creates output/MichiganIDMap.csv
         """
-        individuals = individuals[["year", "full_name_uuid"]].copy()
-        candidates = candidates[["year", "candidate_full_name_uuid"]].copy()
-
-        individuals = individuals.rename(columns={"full_name_uuid": "database_id"})
-        candidates = candidates.rename(
-            columns={"candidate_full_name_uuid": "database_id"}
-        )
-
-        id_mapping = pd.concat([individuals, candidates], ignore_index=True)
-        id_mapping["state"] = "MI"
-        id_mapping["entity_type"] = "Individual"
-        id_mapping["provided_id"] = np.nan
-
-        id_mapping = id_mapping[self.id_mapping_column_order].copy()
-
-        return id_mapping
+        output_path = self.id_mapping_path
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = output_path.with_name(f"{output_path.name}.tmp")
+        pd.DataFrame(columns=self.id_mapping_column_order).to_csv(
+            temporary_path, index=False
+        )
+        for id_mapping in id_mappings:
+            id_mapping[self.id_mapping_column_order].to_csv(
+                temporary_path, mode="a", header=False, index=False
+            )
+        temporary_path.replace(output_path)
 
-    def create_organizations_id_mapping(
-        self,
-        corporations: pd.DataFrame,
-        committees: pd.DataFrame,
-        vendors: pd.DataFrame,
+    def create_id_mapping(
+        self, id_mappings: list[pd.DataFrame], entity_type: str
     ) -> pd.DataFrame:
-        """Creates the ID mapping dataframe for organizations
+        """Concatenates the ID mappings of one table's partitions
 
         Inputs:
-            corporations: dataframe with corporations data
-            committees: dataFrame with campaign committee data
-            vendors: dataFrame with vendors data
+            id_mappings: dataframes with the 'year' and 'database_id', and
+            optionally 'provided_id', of each partition of a table
+            entity_type: entity type of the table's ids
 
         Returns: id_mapping: dataframe in the ID mapping format
         """
-        corporations = corporations[["year", "full_name_uuid"]].copy()
-        committees = committees[
-            ["year", "com_legal_name_uuid", "original_com_id"]
-        ].copy()
-        vendors = vendors[["year", "vend_name_uuid"]].copy()
-
-        corporations = corporations.rename(columns={"full_name_uuid": "database_id"})
-        committees = committees.rename(
-            columns={
-                "com_legal_name_uuid": "database_id",
-                "original_com_id": "provided_id",
-            }
-        )
-        vendors = vendors.rename(columns={"vend_name_uuid": "database_id"})
-
-        id_mapping = pd.concat([corporations, committees, vendors], ignore_index=True)
+        id_mapping = pd.concat(id_mappings, ignore_index=True)
+        if "provided_id" not in id_mapping.columns:
+            id_mapping["provided_id"] = np.nan
         id_mapping["state"] = "MI"
-        id_mapping["entity_type"] = "Organization"
+        id_mapping["entity_type"] = entity_type
 
-        id_mapping = id_mapping[self.id_mapping_column_order].copy()
+        return id_mapping[self.id_mapping_column_order]
 
-        return id_mapping
-
-    def create_transactions_id_mapping(
-        self,
-        org_com: pd.DataFrame,
-        ind_com: pd.DataFrame,
-        com_vend: pd.DataFrame,
-    ) -> pd.DataFrame:
-        """Creates the ID mapping dataframe for transactions
+    # NOTE: universal helper functions for creating the tables are below
 
-        Inputs:
-            org_com: dataframe with organizations to organization (committee)
-            transactions
+    def partition_rows(self, merged_dataframe: pd.DataFrame) -> dict[str, np.ndarray]:
+        """Finds the rows of each kind of entity in the dataframe
 
-            ind_com: dataframe with individual to organization (committee)
-            transactions
+        Every table is built from the same partitions, so each null mask is
+        computed once rather than once per table:
+        - individuals: rows with a first name, the individual contributors
+        and donors of individual -> committee transactions
+        - corporations: rows without a first name, the contributing
+        organizations and donors of organization -> committee transactions
+        - candidates, committees and vendors: rows naming a candidate,
+        committee or vendor. Vendors' rows are committee -> vendor transactions
 
-            com_vend: dataframe with  committee (organization) to vendor
-            (organization) transactions
+        Inputs:
+            merged_dataframe: standardized Michigan contribution and
+            expenditure data
 
-        Returns: id_mapping: dataframe in the ID mapping format
+        Returns: dict mapping each partition to the positions of its rows
         """
-        org_com = org_com[["year", "transaction_id"]].copy()
-        ind_com = ind_com[["year", "transaction_id"]].copy()
-        com_vend = com_vend[["year", "transaction_id"]].copy()
-
-        org_com = org_com.rename(columns={"transaction_id": "database_id"})
-        ind_com = ind_com.rename(columns={"transaction_id": "database_id"})
-        com_vend = com_vend.rename(columns={"transaction_id": "database_id"})
-
-        id_mapping = pd.concat([org_com, ind_com, com_vend], ignore_index=True)
-        id_mapping["provided_id"] = np.nan
-        id_mapping["state"] = "MI"
-        id_mapping["entity_type"] = "Transaction"
-
-        id_mapping = id_mapping[self.id_mapping_column_order].copy()
-
-        return id_mapping
+        has_first_name = merged_dataframe["first_name"].notna().to_numpy()
+        partitions = {
+            "individuals": np.flatnonzero(has_first_name),
+            "corporations": np.flatnonzero(~has_first_name),
+        }
+        for partition, column_name in [
+            ("candidates", "candidate_full_name_uuid"),
+            ("committees", "com_legal_name_uuid"),
+            ("vendors", "vend_name_uuid"),
+        ]:
+            partitions[partition] = np.flatnonzero(
+                merged_dataframe[column_name].notna().to_numpy()
+            )
 
-    # NOTE: universal helper functions for creating the tables are below
+        return partitions
 
-    def filter_dataframe(
-        self, merged_campaign_dataframe: pd.DataFrame, column_name: str
+    def select_partition(
+        self,
+        merged_dataframe: pd.DataFrame,
+        positions: np.ndarray,
+        columns: dict[str, str],
     ) -> pd.DataFrame:
-        """Filters the inputted dataframe based on the column name
+        """Takes the rows of a partition from the given columns only
+
+        Only the selected columns' values are copied. The merged dataframe has
+        two 'transaction_type' columns, of which the first is taken.
 
         Inputs:
-            merged_campaign_dataframe:
-            column_name: name of a column to filter the dataset on
+            merged_dataframe: standardized Michigan contribution and
+            expenditure data
+            positions: positions of the partition's rows, from partition_rows
+            columns: dict mapping the columns to take to their new names
 
         Returns:
-            filtered_df: dataframe filtered based on the given column name
-
+            partition_df: dataframe of the partition's rows and renamed columns
         """
-        filtered_df = merged_campaign_dataframe[
-            merged_campaign_dataframe[column_name].notna()
-        ]
-        # returns all the columns and rows associated with the column name
-        # that are not null
+        partition = {}
+        for column_name, new_column_name in columns.items():
+            column_position = merged_dataframe.columns.get_indexer_for([column_name])[0]
+            values = merged_dataframe.iloc[:, column_position].array
+            partition[new_column_name] = values.take(positions)
 
-        return filtered_df
+        return pd.DataFrame(partition, copy=False)
 
-    # NOTE: Helper functions for creating the individuals table are below
+    # NOTE: the helper functions below are used directly in create tables
 
-    def standardize_and_concatenate_individuals(
-        self, individuals: pd.DataFrame, candidates: pd.DataFrame
-    ) -> pd.DataFrame:
-        """Standardizes and concatenates the individuals and candidate dataframes
+    def create_individuals_table(
+        self, merged_dataframe: pd.DataFrame, partitions: dict[str, np.ndarray]
+    ) -> list[pd.DataFrame, pd.DataFrame]:
+        """Creates the Individuals tables from the individuals and candidates
 
         Inputs:
-            individuals: DataFrame with individuals data
-            candidates: DataFrame with candidates data
-
-        Returns: individuals_df: standardized DataFrame with individual data
-            following the database schema
+            merged_dataframe: standardized Michigan contribution and
+            expenditure data
+            partitions: positions of each partition's rows, from partition_rows
 
+        Returns:
+            individuals_table: table as defined in database schema
+            id_mapping: id mapping for the individuals table
         """
+        individuals = self.select_partition(
+            merged_dataframe,
+            partitions["individuals"],
+            {
+                "full_name_uuid": "id",
+                "first_name": "first_name",
+                "last_name": "last_name",
+                "full_name": "full_name",
+                "state": "state",
+                "company": "company",
+                "year": "year",
+            },
+        )
         individuals["entity_type"] = "Individual"
-        candidates["entity_type"] = "Candidate"
-
-        # rename the columns so they can be concatenated
-        individuals = individuals.rename(columns={"full_name_uuid": "id"})
-        candidates = candidates.rename(
-            columns={
+        candidates = self.select_partition(
+            merged_dataframe,
+            partitions["candidates"],
+            {
                 "candidate_full_name_uuid": "id",
                 "can_first_name": "first_name",
                 "can_last_name": "last_name",
                 "candidate_full_name": "full_name",
-            }
+                "year": "year",
+            },
         )
-        individuals_df = pd.concat(
-            [
-                individuals,
-                candidates,
-            ],
-            ignore_index=True,
-            sort=False,
-        )
-        individuals_df["party"] = np.nan
-        individuals_df["state"] = individuals_df["state"].fillna("MI")
-
-        return individuals_df
-
-    def create_filtered_individuals_tables(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
-    ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Filters the list of dataframes to create the individuals dataframe
-
-        Inputs:
-            standardized_dataframe_lst: list containing one of dataframes
-            containing standardized Michigan contribution and expenditure data
-
-        Returns:
-            individuals_df: individuals dataframe as defined in the
-            database schema
-            id_mapping: id mapping for the individuals table
-        """
-        merged_dataframe = standardized_dataframe_lst[0]
+        candidates["entity_type"] = "Candidate"
 
-        individuals_df = self.filter_dataframe(merged_dataframe, "first_name")
-        candidates_df = self.filter_dataframe(
-            merged_dataframe, "candidate_full_name_uuid"
+        individuals_table = pd.concat(
+            [individuals, candidates], ignore_index=True, sort=False
         )
-        id_mapping = self.create_individuals_id_mapping(individuals_df, candidates_df)
-        individuals_df = individuals_df[
-            [
-                "full_name_uuid",
-                "first_name",
-                "last_name",
-                "full_name",
-                "state",
-                "company",
-            ]
-        ].copy()
-
-        candidates_df = candidates_df[
-            [
-                "candidate_full_name_uuid",
-                "can_first_name",
-                "can_last_name",
-                "candidate_full_name",
-            ]
-        ]
-
-        individuals_df = self.standardize_and_concatenate_individuals(
-            individuals_df, candidates_df
+        id_mapping = self.create_id_mapping(
+            [individuals_table[["year", "id"]].rename(columns={"id": "database_id"})],
+            "Individual",
         )
-        individuals_df = individuals_df[
+        individuals_table["party"] = np.nan
+        individuals_table["state"] = individuals_table["state"].fillna("MI")
+        individuals_table = individuals_table[
             [
                 "id",
                 "first_name",
@@ -709,202 +868,115 @@ class MichiganTransformer(StateTransformer):
             ]
         ]
 
-        return [individuals_df, id_mapping]
-
-    # NOTE: Helper functions for creating the organizations table are below
-
-    def standardize_and_concatenate_organizations(
-        self,
-        corporations: pd.DataFrame,
-        committees: pd.DataFrame,
-        vendors: pd.DataFrame,
-    ) -> pd.DataFrame:
-        """Standardizes and concatenates the corporations, committees, and vendor dfs
-
-        Inputs:
-            corporations: dataframe with corporations data
-            committees: dataFrame with campaign committee data
-            vendors: dataFrame with vendors data
-
-        Returns:
-            organizations: standardized DataFrame with organizations data
-            following the database schema
-        """
-        corporations["entity_type"] = "corporation"
-        committees["entity_type"] = "committee"
-        vendors["entity_type"] = "vendor"
-
-        corporations = corporations.rename(
-            columns={"full_name_uuid": "id", "full_name": "name"}
-        )
-        committees = committees.rename(
-            columns={"com_legal_name_uuid": "id", "com_legal_name": "name"}
-        )
-        vendors = vendors.rename(columns={"vend_name_uuid": "id", "vend_name": "name"})
-
-        organizations = pd.concat(
-            [corporations, committees, vendors],
-            ignore_index=True,
-            sort=False,
-        )
-        organizations["state"] = "MI"
-
-        return organizations
+        return [individuals_table, id_mapping]
 
-    def create_filtered_organizations_tables(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
+    def create_organizations_table(
+        self, merged_dataframe: pd.DataFrame, partitions: dict[str, np.ndarray]
     ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Filters the list of dataframes to create the organizations dataframe
+        """Creates the Organizations tables from corporations, committees, vendors
 
         Inputs:
-            standardized_dataframe_lst: list containing one of dataframes
-            containing standardized Michigan contribution and expenditure data
+            merged_dataframe: standardized Michigan contribution and
+            expenditure data
+            partitions: positions of each partition's rows, from partition_rows
 
         Returns:
-            organizations_df: organizations dataframe as defined in the
-            database schema
+            organizations_table: table as defined in database schema
             id_mapping: id mapping for the organizations table
-
         """
-        merged_dataframe = standardized_dataframe_lst[0]
-
-        # contributing corporations have a first name that is null
-        corporations_df = merged_dataframe[merged_dataframe["first_name"].isna()]
-        committees_df = self.filter_dataframe(merged_dataframe, "com_legal_name_uuid")
-        vendors_df = self.filter_dataframe(merged_dataframe, "vend_name_uuid")
-
-        id_mapping = self.create_organizations_id_mapping(
-            corporations_df, committees_df, vendors_df
-        )
-
-        corporations_df = corporations_df[["full_name_uuid", "full_name"]]
-
-        committees_df = committees_df[["com_legal_name_uuid", "com_legal_name"]]
-
-        vendors_df = vendors_df[["vend_name_uuid", "vend_name"]]
-
-        organizations_df = self.standardize_and_concatenate_organizations(
-            corporations_df, committees_df, vendors_df
-        )
-
-        organizations_df = organizations_df[["id", "name", "state", "entity_type"]]
-
-        return [organizations_df, id_mapping]
-
-    # NOTE: Helper functions for generating the transactions table are below
-
-    def standardize_and_concatenate_transactions(
-        self,
-        org_com: pd.DataFrame,
-        ind_com: pd.DataFrame,
-        com_vend: pd.DataFrame,
-    ) -> pd.DataFrame:
-        """Standardizes and concatenates the corporations, committees, and vendors dfs
-
-        Inputs:
-            org_com: dataframe with organizations to committee transactions
-            ind_com: dataframe with individual to committee transactions
-            com_vend: dataframe with  committee  to vendor transactions
-
-        Returns:
-            transactions: standardized DataFrame with transactions data
-            following the database schema
+        organizations = []
+        for partition, columns, entity_type in [
+            (
+                "corporations",
+                {"full_name_uuid": "id", "full_name": "name"},
+                "corporation",
+            ),
+            (
+                "committees",
+                {
+                    "com_legal_name_uuid": "id",
+                    "com_legal_name": "name",
+                    "original_com_id": "provided_id",
+                },
+                "committee",
+            ),
+            ("vendors", {"vend_name_uuid": "id", "vend_name": "name"}, "vendor"),
+        ]:
+            organizations_df = self.select_partition(
+                merged_dataframe, partitions[partition], {**columns, "year": "year"}
+            )
+            organizations_df["entity_type"] = entity_type
+            organizations.append(organizations_df)
 
-        """
-        org_com = org_com.rename(
-            columns={
-                "full_name_uuid": "donor_id",
-                "com_legal_name_uuid": "recipient_id",
-            }
-        )
-        ind_com = ind_com.rename(
-            columns={
-                "full_name_uuid": "donor_id",
-                "com_legal_name_uuid": "recipient_id",
-            }
-        )
-        com_vend = com_vend.rename(
-            columns={
-                "com_legal_name_uuid": "donor_id",
-                "vend_name_uuid": "recipient_id",
-            }
-        )
-        transactions = pd.concat(
-            [org_com, ind_com, com_vend], axis=0, ignore_index=True, sort=False
+        organizations_table = pd.concat(organizations, ignore_index=True, sort=False)
+        id_mapping = self.create_id_mapping(
+            [
+                organizations_table[["year", "id", "provided_id"]].rename(
+                    columns={"id": "database_id"}
+                )
+            ],
+            "Organization",
         )
+        organizations_table["state"] = "MI"
+        organizations_table = organizations_table[
+            ["id", "name", "state", "entity_type"]
+        ]
 
-        transactions["office_sought"] = np.nan
-
-        return transactions
+        return [organizations_table, id_mapping]
 
-    def create_filtered_transactions_tables(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
+    def create_transactions_table(
+        self, merged_dataframe: pd.DataFrame, partitions: dict[str, np.ndarray]
     ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Creates the Transactions tables from the dataframe list
+        """Creates the Transactions tables from the donors' and vendors' rows
+
+        Corporations and individuals give to committees, and committees pay
+        vendors.
 
         Inputs:
-            standardized_dataframe_lst: list containing one of dataframes
-            containing standardized Michigan contribution and expenditure data
+            merged_dataframe: standardized Michigan contribution and
+            expenditure data
+            partitions: positions of each partition's rows, from partition_rows
 
         Returns:
             transactions_table: table as defined in database schema
             id_mapping: id mapping for the transactions table
         """
-        merged_dataframe = standardized_dataframe_lst[0]
-
-        # contributing corporations have a first name that is null
-
-        # organization -> committee transaction
-        org_to_com = merged_dataframe[merged_dataframe["first_name"].isna()]
-        # individual -> committee transaction
-        ind_to_com = self.filter_dataframe(merged_dataframe, "first_name")
-        #  committee -> vendor transaction
-        com_to_vend = self.filter_dataframe(merged_dataframe, "vend_name_uuid")
-
-        id_mapping = self.create_transactions_id_mapping(
-            org_to_com, ind_to_com, com_to_vend
-        )
-        org_to_com = org_to_com[
-            [
-                "transaction_id",
-                "full_name_uuid",
-                "year",
-                "amount",
-                "com_legal_name_uuid",
-                "purpose",
-                "transaction_type",
-            ]
-        ]
-
-        ind_to_com = ind_to_com[
-            [
-                "transaction_id",
-                "full_name_uuid",
-                "year",
-                "amount",
-                "com_legal_name_uuid",
-                "purpose",
-                "transaction_type",
-            ]
-        ]
+        transaction_columns = {
+            "transaction_id": "transaction_id",
+            "year": "year",
+            "amount": "amount",
+            "purpose": "purpose",
+            "transaction_type": "transaction_type",
+        }
+        transactions = []
+        for partition, donor_column, recipient_column in [
+            ("corporations", "full_name_uuid", "com_legal_name_uuid"),
+            ("individuals", "full_name_uuid", "com_legal_name_uuid"),
+            ("vendors", "com_legal_name_uuid", "vend_name_uuid"),
+        ]:
+            transactions.append(
+                self.select_partition(
+                    merged_dataframe,
+                    partitions[partition],
+                    {
+                        donor_column: "donor_id",
+                        recipient_column: "recipient_id",
+                        **transaction_columns,
+                    },
+                )
+            )
 
-        com_to_vend = com_to_vend[
+        transactions_table = pd.concat(transactions, ignore_index=True, sort=False)
+        id_mapping = self.create_id_mapping(
             [
-                "transaction_id",
-                "com_legal_name_uuid",
-                "year",
-                "amount",
-                "vend_name_uuid",
-                "purpose",
-                "transaction_type",
-            ]
-        ]
-
-        transactions_df = self.standardize_and_concatenate_transactions(
-            org_to_com, ind_to_com, com_to_vend
+                transactions_table[["year", "transaction_id"]].rename(
+                    columns={"transaction_id": "database_id"}
+                )
+            ],
+            "Transaction",
         )
-
-        transactions_df = transactions_df[
+        transactions_table["office_sought"] = np.nan
+        transactions_table = transactions_table[
             [
                 "donor_id",
                 "year",
@@ -916,65 +988,4 @@ class MichiganTransformer(StateTransformer):
             ]
         ]
 
-        return [transactions_df, id_mapping]
-
-    # NOTE: the helper functions below are used directly in create tables
-    # calling the functions above
-
-    def create_individuals_table(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
-    ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Creates the Individuals tables from the dataframe list
-
-        Inputs:
-            standardized_dataframe_lst: a list of 1 or 3 dataframes as
-            outputted from standardize method.
-
-        Returns:
-            individuals_table: table as defined in database schema
-            id_mapping: id mapping for the individuals table
-        """
-        individuals_table, id_mapping = self.create_filtered_individuals_tables(
-            standardized_dataframe_lst
-        )
-
-        return [individuals_table, id_mapping]
-
-    def create_organizations_table(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
-    ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Creates the Organizations tables from the dataframe
-
-        Inputs:
-            standardized_dataframe_lst: a list of 1 or 3 dataframes as
-            outputted from standardize method.
-
-        Returns:
-            organizations_table: table as defined in database schema
-            id_mapping: id mapping for the organizations table
-        """
-        (
-            organizations_table,
-            id_mapping,
-        ) = self.create_filtered_organizations_tables(standardized_dataframe_lst)
-
-        return [organizations_table, id_mapping]
-
-    def create_transactions_table(
-        self, standardized_dataframe_lst: list[pd.DataFrame]
-    ) -> list[pd.DataFrame, pd.DataFrame]:
-        """Creates the Transactions tables from the dataframe list
-
-        Inputs:
-            standardized_dataframe_lst: a list of 1 or 3 dataframes as
-            outputted from standardize method.
-
-        Returns:
-            transactions_table: table as defined in database schema
-            id_mapping: id mapping for the transactions table
-        """
-        (
-            transactions_table,
-            id_mapping,
-        ) = self.create_filtered_transactions_tables(standardized_dataframe_lst)
         return [transactions_table, id_mapping]
@@ -1,24 +1,26 @@
 """State transformer implementation for Minnesota"""
 
-import uuid
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
-from utils.transform.clean import StateTransformer
+from utils.transform.clean import PartitionedTransformer
 from utils.transform.constants import (
     MN_CANDIDATE_CONTRIBUTION_COL,
     MN_CANDIDATE_CONTRIBUTION_MAP,
     MN_FILEPATHS_LST,
     MN_INDEPENDENT_EXPENDITURE_COL,
     MN_INDEPENDENT_EXPENDITURE_MAP,
+    MN_MISSING_ID_VALUES,
+    MN_MISSING_NAME_VALUES,
     MN_NONCANDIDATE_CONTRIBUTION_COL,
     MN_NONCANDIDATE_CONTRIBUTION_MAP,
     MN_RACE_MAP,
 )
 
 
-class MinnesotaTransformer(StateTransformer):
+class MinnesotaTransformer(PartitionedTransformer):
     """State transformer implementation for Minnesota"""
 
     name = "Minnesota"
@@ -241,72 +243,93 @@ class MinnesotaTransformer(StateTransformer):
         entity_map = self.entity_name_dictionary
         data["recipient_type"] = data["recipient_type"].map(entity_map)
         data["donor_type"] = data["donor_type"].map(entity_map)
-        id_mapping = {}
 
-        # Standardize entity names to match othe states in database schema
-        data["recipient_type"] = data["recipient_type"].replace(
-            self.entity_name_dictionary
-        )
-        data["donor_type"] = data["donor_type"].replace(self.entity_name_dictionary)
-        id_mapping = {}
-        for index, row in data.iterrows():
-            recipient_uuid = str(uuid.uuid4())
-            donor_uuid = str(uuid.uuid4())
-            transaction_uuid = str(uuid.uuid4())
-
-            # MN has partial recipient id, generate uuid, map them to original id
-            if row["recipient_id"]:
-                if (
-                    row["recipient_type"] == "Individual"
-                    or row["recipient_type"] == "Lobbyist"
-                ):
-                    entity_type = "Individual"
-                else:
-                    entity_type = "Organization"
-                id_mapping[row["recipient_id"]] = (
-                    row["state"],
-                    row["year"],
-                    entity_type,
-                    row["recipient_id"],
-                    recipient_uuid,
-                )
-
-                data.loc[index, "recipient_id"] = recipient_uuid
-
-            # MN has partial donor id, generate uuid, map them to original id
-            if row["donor_id"]:
-                if row["donor_type"] == "Individual" or row["donor_type"] == "Lobbyist":
-                    entity_type = "Individual"
-                else:
-                    entity_type = "Organization"
-                id_mapping[row["donor_id"]] = (
-                    row["state"],
-                    row["year"],
-                    entity_type,
-                    row["donor_id"],
-                    donor_uuid,
-                )
-
-                data.loc[index, "donor_id"] = donor_uuid
-
-            data.loc[index, "transaction_id"] = transaction_uuid
-
-        # Convert id_mapping to DataFrame and save to CSV
-        id_mapping_df = pd.DataFrame.from_dict(
-            id_mapping,
-            orient="index",
-            columns=[
-                "state",
-                "year",
-                "entity_type",
-                "provided_id",
-                "database_id",
-            ],
-        )
+        data, id_mapping_df = self.assign_ids(data)
         id_mapping_df.to_csv("MNIDMap.csv", index=False)
 
         return [data]
 
+    def assign_ids(self, data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Replaces provided MN ids with UUIDs and assigns transaction ids
+
+        Ids are derived from the data (see StateTransformer.entity_ids and
+        transaction_ids), so the same data always gets the same ids. Donor and
+        recipient ids are keyed the same way, so a provided id gets the same
+        UUID whichever side of a transaction it appears on. Entities without a
+        provided id are keyed by name.
+
+        Inputs:
+            data: standardized MN DataFrame with provided 'recipient_id' and
+                'donor_id' columns
+
+        Returns: (data, id_mapping) where data has its id columns replaced and
+            id_mapping has one row per provided id in the MNIDMap.csv format
+        """
+        row_count = len(data)
+        transaction_ids = self.transaction_ids(data.drop(columns=["transaction_id"]))
+        provided_ids = pd.concat(
+            [data["recipient_id"], data["donor_id"]], ignore_index=True
+        )
+        entity_types = pd.concat(
+            [data["recipient_type"], data["donor_type"]], ignore_index=True
+        )
+        names = pd.concat(
+            [self.entity_names(data, "recipient"), self.entity_names(data, "donor")],
+            ignore_index=True,
+        )
+        missing_id = provided_ids.isna() | provided_ids.isin(MN_MISSING_ID_VALUES)
+        provided_ids = provided_ids.mask(missing_id)
+        fallback_keys = pd.Series(np.tile(transaction_ids, 2)) + np.repeat(
+            [":recipient", ":donor"], row_count
+        )
+        database_ids = self.entity_ids(provided_ids, names, fallback_keys=fallback_keys)
+        codes, unique_provided_ids = pd.factorize(provided_ids)
+
+        # the mapping records each provided id as of its first appearance
+        unique_codes, first_positions = np.unique(codes, return_index=True)
+        first_positions = first_positions[unique_codes >= 0]
+        unique_codes = unique_codes[unique_codes >= 0]
+        first_entity_types = entity_types.iloc[first_positions]
+        id_mapping = pd.DataFrame(
+            {
+                "state": np.tile(data["state"].to_numpy(), 2)[first_positions],
+                "year": np.tile(data["year"].to_numpy(), 2)[first_positions],
+                "entity_type": np.where(
+                    first_entity_types.isin(["Individual", "Lobbyist"]),
+                    "Individual",
+                    "Organization",
+                ),
+                "provided_id": unique_provided_ids[unique_codes],
+                "database_id": database_ids[first_positions],
+            }
+        )
+
+        data["recipient_id"] = database_ids[:row_count]
+        data["donor_id"] = database_ids[row_count:]
+        data["transaction_id"] = transaction_ids
+
+        return data, id_mapping
+
+    def entity_names(self, data: pd.DataFrame, side: str) -> pd.Series:
+        """Returns the full names of one side's entities, missing if unknown
+
+        Inputs:
+            data: standardized MN DataFrame
+            side: 'recipient' or 'donor'
+
+        Returns: full name, or first and last name where there is no full name
+        """
+        full_names = data[f"{side}_full_name"]
+        first_last_names = (
+            data[f"{side}_first_name"] + " " + data[f"{side}_last_name"]
+        ).where(
+            ~data[f"{side}_first_name"].isin(MN_MISSING_NAME_VALUES)
+            & ~data[f"{side}_last_name"].isin(MN_MISSING_NAME_VALUES)
+        )
+        return full_names.mask(
+            full_names.isin(MN_MISSING_NAME_VALUES), first_last_names
+        )
+
     def create_tables(
         self, data: list[pd.DataFrame]
     ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
@@ -425,7 +448,16 @@ class MinnesotaTransformer(StateTransformer):
     def clean_state(  # noqa: D102
         self,
     ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-        preprocessed_df = self.preprocess(MN_FILEPATHS_LST)
+        return self.clean_partition(MN_FILEPATHS_LST)
+
+    def raw_partitions(self) -> dict[str, list[Path]]:
+        """MN files are read together, as a single partition"""
+        return {"all": list(MN_FILEPATHS_LST)}
+
+    def clean_partition(  # noqa: D102
+        self, filepaths: list[Path]
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        preprocessed_df = self.preprocess(filepaths)
         cleaned_df = self.clean(preprocessed_df)
         standardized_df = self.standardize(cleaned_df)
         (ind_df, org_df, tran_df) = self.create_tables(standardized_df)
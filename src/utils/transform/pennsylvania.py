@@ -1,13 +1,23 @@
 """Implements state transformer class for Pennsylvania"""
 
-import uuid
+import io
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv
 
 from utils.constants import BASE_FILEPATH
 from utils.transform import clean
 from utils.transform import constants as const
+from utils.transform.instrumentation import instrumented_stage
+from utils.transform.utils import text_keys, uuid5_strings
 
 
 def assign_PA_column_names(file_name: str, year: int) -> list:
@@ -38,19 +48,137 @@ def assign_PA_column_names(file_name: str, year: int) -> list:
             return const.PA_EXPENSE_COLS_NAMES_POST2022
 
 
-class PennsylvaniaTransformer(clean.StateTransformer):
+def PA_arrow_table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Converts a parsed PA file to the dataframe pandas.read_csv would make
+
+    ISO dates are kept as text, columns without any values are float and
+    missing text is NaN.
+    """
+    for position, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            column = table.column(position).cast(pa.float64())
+        elif pa.types.is_temporal(field.type):
+            column = pc.cast(table.column(position), pa.string())
+        else:
+            continue
+        table = table.set_column(position, field.name, column)
+
+    raw_finance_table = table.to_pandas()
+    # pandas marks missing text as NaN rather than None
+    text_columns = raw_finance_table.select_dtypes(object).columns
+    raw_finance_table[text_columns] = raw_finance_table[text_columns].fillna(np.nan)
+    return raw_finance_table
+
+
+def read_PA_file(file_path: Path, year: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Parses a raw PA file with the pyarrow CSV reader
+
+    Columns are typed the way pandas.read_csv would type them, and as with
+    pandas.read_csv, lines with too few fields are padded with nulls.
+
+    Args:
+        file_path: path to a contributor, filer, or expenditure file
+        year: year the file's data is from, which determines its columns
+
+    Returns:
+        the file's data, and a report of the lines that were skipped because
+        they have too many fields
+    """
+    column_names = assign_PA_column_names(file_path.stem, year)
+    bad_lines = []
+    short_rows = []
+
+    def record_bad_line(row: csv.InvalidRow) -> str:
+        if row.actual_columns < row.expected_columns:
+            missing_fields = row.expected_columns - row.actual_columns
+            short_rows.append((row.number, row.text + "," * missing_fields))
+        else:
+            bad_lines.append(
+                [
+                    str(file_path),
+                    row.number,
+                    row.expected_columns,
+                    row.actual_columns,
+                    row.text,
+                ]
+            )
+        return "skip"
+
+    parse_options = csv.ParseOptions(newlines_in_values=True)
+    convert_options = csv.ConvertOptions(
+        null_values=const.CSV_NULL_VALUES, strings_can_be_null=True
+    )
+    table = csv.read_csv(
+        file_path,
+        read_options=csv.ReadOptions(
+            column_names=column_names,
+            encoding="latin-1",
+            # files are read concurrently by read_raw_files instead
+            use_threads=False,
+        ),
+        parse_options=csv.ParseOptions(
+            newlines_in_values=True, invalid_row_handler=record_bad_line
+        ),
+        convert_options=convert_options,
+    )
+    raw_finance_table = PA_arrow_table_to_pandas(table)
+
+    if short_rows:
+        # short rows are parsed again once padded, then put back in place
+        short_row_numbers = [number for number, _ in short_rows]
+        padded_table = csv.read_csv(
+            io.BytesIO("\n".join(text for _, text in short_rows).encode()),
+            read_options=csv.ReadOptions(column_names=column_names, use_threads=False),
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+        padded_rows = PA_arrow_table_to_pandas(padded_table)
+        unparsed_row_numbers = {line[1] for line in bad_lines}
+        unparsed_row_numbers.update(short_row_numbers)
+        row_count = len(raw_finance_table) + len(unparsed_row_numbers)
+        parsed_row_numbers = [
+            number
+            for number in range(1, row_count + 1)
+            if number not in unparsed_row_numbers
+        ]
+        raw_finance_table = (
+            pd.concat(
+                [
+                    raw_finance_table.set_axis(parsed_row_numbers),
+                    padded_rows.set_axis(short_row_numbers),
+                ]
+            )
+            .sort_index()
+            .reset_index(drop=True)
+        )
+
+    if bad_lines:
+        print(f"Skipped {len(bad_lines)} bad lines in {file_path}")
+    return (
+        raw_finance_table,
+        pd.DataFrame(bad_lines, columns=const.PA_BAD_LINES_COLUMNS),
+    )
+
+
+class PennsylvaniaTransformer(clean.PartitionedTransformer):
     """Pennsyvania state transformer implementation"""
 
     name = "Pennsylvania"
     stable_id_across_years = False
+    drops_duplicate_entities = True
+
+    # id lookup table as loaded by cleaning_session, and the ids added to it
+    _id_lookup = None
+    _new_ids = None
 
     def clean_state(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """Return tables of proper schema"""
         PA_directory = BASE_FILEPATH / "data" / "raw" / "PA"
-        pre_processed_dfs = self.preprocess(PA_directory)
-        clean_dfs = self.clean(pre_processed_dfs)
-        standardized_dfs = self.standardize(clean_dfs)
-        return self.create_tables(standardized_dfs)
+        with self.cleaning_session():
+            pre_processed_dfs = self.preprocess(PA_directory)
+            clean_dfs = self.clean(pre_processed_dfs)
+            standardized_dfs = self.standardize(clean_dfs)
+            return self.create_tables(standardized_dfs)
 
     def preprocess(self, directory: str | Path = None) -> list[pd.DataFrame]:
         """Read raw campaign finance files from PA secretary of state
@@ -66,41 +194,129 @@ class PennsylvaniaTransformer(clean.StateTransformer):
         |--YYYY/
         ...
         """
-        contributor_datasets, filer_datasets, expense_datasets = [], [], []
+        filepaths = [
+            file_path
+            for partition_filepaths in self.raw_partitions(directory).values()
+            for file_path in partition_filepaths
+        ]
+        return self.read_raw_files(filepaths)
+
+    def raw_partitions(self, directory: str | Path = None) -> dict[str, list[Path]]:
+        """Groups the contributor, filer, and expenditure files by year
+
+        Inputs:
+            directory: directory of year directories as described in
+                preprocess. Defaults to 'data/raw/PA' in the repo root
+
+        Returns: dict mapping each year to the relevant files of that year
+        """
         if directory is None:
             directory = BASE_FILEPATH / "data" / "raw" / "PA"
         else:
             directory = Path(directory)
-        for year_directory in directory.iterdir():
-            year = int(year_directory.stem)
-            for file_path in year_directory.iterdir():
-                file_name = file_path.stem
-                # only want contributor, filer, and expenditure files:
-                if (
-                    ("contrib" in file_name)
-                    | ("filer" in file_name)
-                    | ("expense" in file_name)
-                ):
-                    raw_finance_table = pd.read_csv(
-                        file_path,
-                        names=assign_PA_column_names(file_name, year),
-                        sep=",",
-                        encoding="latin-1",
-                        on_bad_lines="warn",
-                    )
-                    raw_finance_table["YEAR"] = year
-
-                    if "contrib" in file_name:
-                        contributor_datasets.append(raw_finance_table)
-                    elif "filer" in file_name:
-                        filer_datasets.append(raw_finance_table)
-                    else:
-                        expense_datasets.append(raw_finance_table)
-                else:
-                    continue
+        partitions = {}
+        for year_directory in sorted(directory.iterdir()):
+            # only want contributor, filer, and expenditure files:
+            partitions[year_directory.name] = [
+                file_path
+                for file_path in sorted(year_directory.iterdir())
+                if ("contrib" in file_path.stem)
+                | ("filer" in file_path.stem)
+                | ("expense" in file_path.stem)
+            ]
+        return partitions
+
+    def clean_partition(
+        self, filepaths: list[Path]
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Return tables of proper schema built from the given year's files"""
+        with self.cleaning_session():
+            pre_processed_dfs = self.read_raw_files(filepaths)
+            clean_dfs = self.clean(pre_processed_dfs)
+            standardized_dfs = self.standardize(clean_dfs)
+            return self.create_tables(standardized_dfs)
+
+    @contextmanager
+    def cleaning_session(self) -> Iterator[None]:
+        """Loads the id lookup table once, saving the ids added to it at the end
+
+        Provided ids are looked up (see lookup_provided_ids) in the table as
+        it was loaded, and the ids not in it yet are collected in memory. When
+        the outermost session ends, even if cleaning failed, they are added to
+        the table, which is written once (see write_id_lookup).
+        """
+        if self._id_lookup is not None:
+            yield
+            return
+        self._id_lookup = self.read_id_lookup()
+        self._new_ids = []
+        try:
+            yield
+        finally:
+            if self._new_ids:
+                self.write_id_lookup(
+                    pd.concat(
+                        [self._id_lookup, *self._new_ids], ignore_index=True
+                    ).drop_duplicates(["raw_id", "year"], ignore_index=True)
+                )
+            self._id_lookup = None
+            self._new_ids = None
+
+    @instrumented_stage("preprocess")
+    def read_raw_files(
+        self, filepaths: list[Path], workers: int | None = None
+    ) -> list[pd.DataFrame]:
+        """Reads contributor, filer, and expenditure files concurrently
+
+        Files are parsed on a thread pool with the pyarrow CSV reader. Lines
+        with too many fields are skipped and reported in
+        'output/bad_lines/PA/<year>.csv' for each year read, while lines with
+        too few fields are padded with nulls.
+
+        Inputs:
+            filepaths: paths to raw files, each inside a directory named
+                after its year
+            workers: maximum number of files parsed at the same time.
+                Defaults to the ThreadPoolExecutor default
+
+        Returns: lists of contributor, filer, and expenditure dataframes,
+            in the order of filepaths
+        """
+        filepaths = [Path(file_path) for file_path in filepaths]
+        years = [int(file_path.parent.name) for file_path in filepaths]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parsed_files = list(executor.map(read_PA_file, filepaths, years))
+
+        contributor_datasets, filer_datasets, expense_datasets = [], [], []
+        bad_lines_by_year = {}
+        for file_path, year, (raw_finance_table, bad_lines) in zip(
+            filepaths, years, parsed_files
+        ):
+            raw_finance_table["YEAR"] = year
+            bad_lines_by_year.setdefault(year, []).append(bad_lines)
+
+            file_name = file_path.stem
+            if "contrib" in file_name:
+                contributor_datasets.append(raw_finance_table)
+            elif "filer" in file_name:
+                filer_datasets.append(raw_finance_table)
+            else:
+                expense_datasets.append(raw_finance_table)
+
+        for year, bad_lines in bad_lines_by_year.items():
+            self.write_bad_lines_report(pd.concat(bad_lines), year)
 
         return contributor_datasets, filer_datasets, expense_datasets
 
+    def write_bad_lines_report(self, bad_lines: pd.DataFrame, year: int) -> None:
+        """Saves a year's bad lines, or removes the year's old report if none"""
+        report_path = BASE_FILEPATH / "output" / "bad_lines" / "PA" / f"{year}.csv"
+        if bad_lines.empty:
+            report_path.unlink(missing_ok=True)
+            return
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        bad_lines.to_csv(report_path, index=False)
+
     def clean(self, data: list[pd.DataFrame]) -> list[pd.DataFrame]:  # noqa: D102
         contributor_datasets, filer_datasets, expense_datasets = [], [], []
         cont_ds, filer_ds, exp_ds = data
@@ -119,14 +335,38 @@ class PennsylvaniaTransformer(clean.StateTransformer):
         merged_dataset = self.combine_contributor_expenditure_datasets(
             contributor_ds, filer_ds, expense_ds
         )
-        merged_dataset = self.replace_id_with_uuid(merged_dataset, "DONOR_ID", "YEAR")
+        # assign transaction_id
+        merged_dataset["TRANSACTION_ID"] = self.transaction_ids(
+            merged_dataset[const.PA_TRANSACTION_KEY_COLUMNS]
+        )
         merged_dataset = self.replace_id_with_uuid(
-            merged_dataset, "RECIPIENT_ID", "YEAR"
+            merged_dataset, "DONOR_ID", "YEAR", "DONOR"
+        )
+        merged_dataset = self.replace_id_with_uuid(
+            merged_dataset, "RECIPIENT_ID", "YEAR", "RECIPIENT"
         )
-        # assign transaction_id
-        merged_dataset["TRANSACTION_ID"] = str(uuid.uuid4())
         return merged_dataset
 
+    def transaction_ids(
+        self, transactions: pd.DataFrame, occurrence_counts: Counter = None
+    ) -> np.ndarray:
+        """Derives deterministic transaction ids from the text of their values
+
+        Unlike StateTransformer.transaction_ids, which keys transactions by a
+        pandas hash, the keys are built the same way by the DuckDB backend
+        (see utils.transform.duckdb_backend), so both backends give a
+        transaction the same id.
+
+        Inputs:
+            transactions: transactions with the PA_TRANSACTION_KEY_COLUMNS
+            occurrence_counts: see utils.transform.utils.text_keys
+
+        Returns: object array of transaction id UUID strings, one per row
+        """
+        return uuid5_strings(
+            self.name, "transaction", text_keys(transactions, occurrence_counts)
+        )
+
     def create_tables(  # noqa: D102
         self, standardized_df: pd.DataFrame
     ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
@@ -146,7 +386,8 @@ class PennsylvaniaTransformer(clean.StateTransformer):
                 "RECIPIENT_TYPE",
             ]
         ]
-        individuals_table = self.make_individuals_table(individuals_df)
+        entity_classes = self.classify_entities(standardized_df)
+        individuals_table = self.make_individuals_table(individuals_df, entity_classes)
 
         # Organizations Table
         organizations_df = standardized_df[
@@ -159,7 +400,9 @@ class PennsylvaniaTransformer(clean.StateTransformer):
                 "RECIPIENT_TYPE",
             ]
         ]
-        organizations_table = self.make_organizations_table(organizations_df)
+        organizations_table = self.make_organizations_table(
+            organizations_df, entity_classes
+        )
         # Transactions Table
         transactions_df = standardized_df[
             [
@@ -182,46 +425,41 @@ class PennsylvaniaTransformer(clean.StateTransformer):
 
         return individuals_table, organizations_table, transactions_df
 
-    def make_individuals_table(self, df: pd.DataFrame) -> pd.DataFrame:
+    def make_individuals_table(
+        self, df: pd.DataFrame, entity_classes: dict[str, np.ndarray] = None
+    ) -> pd.DataFrame:
         """Returns entiteis that are likely individuals with only relevant columns
 
         Args:
             df: a pandas dataframe with donor and recipient information
+            entity_classes: the classes of df's donors and recipients, as
+                returned by classify_entities. Computed from df if None
         Returns:
             a pandas dataframe strictly with information regarding individuals
             from the inputted dataframe
         """
-        donor_individuals = df.loc[
-            (
-                (df.DONOR_TYPE == "Individual")
-                | (df.DONOR_TYPE == "Candidate")
-                | (df.DONOR_TYPE == "Lobbyist")
+        if entity_classes is None:
+            entity_classes = self.classify_entities(df)
+        role_individuals = []
+        for role in ["DONOR", "RECIPIENT"]:
+            is_individual = (
+                entity_classes[role] == const.PA_ENTITY_CLASSES["Individual"]
             )
-        ][["DONOR", "DONOR_ID", "DONOR_PARTY", "DONOR_TYPE"]].rename(
-            columns={
-                "DONOR": "full_name",
-                "DONOR_ID": "id",
-                "DONOR_PARTY": "party",
-                "DONOR_TYPE": "entity_type",
-            }
-        )
-
-        recipient_individuals = df.loc[
-            (
-                (df.RECIPIENT_TYPE == "Individual")
-                | (df.RECIPIENT_TYPE == "Candidate")
-                | (df.RECIPIENT_TYPE == "Lobbyist")
+            individuals = df.loc[
+                is_individual, [role, f"{role}_ID", f"{role}_PARTY", f"{role}_TYPE"]
+            ]
+            role_individuals.append(
+                individuals.rename(
+                    columns={
+                        role: "full_name",
+                        f"{role}_ID": "id",
+                        f"{role}_PARTY": "party",
+                        f"{role}_TYPE": "entity_type",
+                    }
+                )
             )
-        ][["RECIPIENT", "RECIPIENT_ID", "RECIPIENT_PARTY", "RECIPIENT_TYPE"]].rename(
-            columns={
-                "RECIPIENT": "full_name",
-                "RECIPIENT_ID": "id",
-                "RECIPIENT_PARTY": "party",
-                "RECIPIENT_TYPE": "entity_type",
-            }
-        )
 
-        all_individuals = pd.concat([donor_individuals, recipient_individuals])
+        all_individuals = pd.concat(role_individuals)
         all_individuals = all_individuals.drop_duplicates()
 
         new_cols = ["first_name", "last_name", "company"]
@@ -230,44 +468,43 @@ class PennsylvaniaTransformer(clean.StateTransformer):
 
         return all_individuals
 
-    def make_organizations_table(self, organizations_df: pd.DataFrame) -> pd.DataFrame:
+    def make_organizations_table(
+        self,
+        organizations_df: pd.DataFrame,
+        entity_classes: dict[str, np.ndarray] = None,
+    ) -> pd.DataFrame:
         """Returns entiteis that are likely organizations with only relevant columns
 
         Args:
             organizations_df: a pandas dataframe with donor and recipient information
+            entity_classes: the classes of the donors and recipients, as
+                returned by classify_entities. Computed from organizations_df
+                if None
         Returns:
             a pandas dataframe strictly with information regarding committess or
             organizations from the inputted dataframe.
         """
-        donor_organizations = organizations_df.loc[
-            (
-                (organizations_df.DONOR_TYPE == "Committee")
-                | (organizations_df.DONOR_TYPE == "Organization")
+        if entity_classes is None:
+            entity_classes = self.classify_entities(organizations_df)
+        role_organizations = []
+        for role in ["DONOR", "RECIPIENT"]:
+            is_organization = (
+                entity_classes[role] == const.PA_ENTITY_CLASSES["Organization"]
             )
-        ][["DONOR_ID", "DONOR", "DONOR_TYPE"]].rename(
-            columns={
-                "DONOR_ID": "id",
-                "DONOR": "name",
-                "DONOR_TYPE": "entity_type",
-            }
-        )
-        recipient_organizations = organizations_df.loc[
-            (
-                (organizations_df.RECIPIENT_TYPE == "Committee")
-                | (organizations_df.RECIPIENT_TYPE == "Organization")
+            organizations = organizations_df.loc[
+                is_organization, [f"{role}_ID", role, f"{role}_TYPE"]
+            ]
+            role_organizations.append(
+                organizations.rename(
+                    columns={
+                        f"{role}_ID": "id",
+                        role: "name",
+                        f"{role}_TYPE": "entity_type",
+                    }
+                )
             )
-        ]
-        recipient_organizations = recipient_organizations[
-            ["RECIPIENT_ID", "RECIPIENT", "RECIPIENT_TYPE"]
-        ]
-        recipient_organizations = recipient_organizations.rename(
-            columns={
-                "RECIPIENT_ID": "id",
-                "RECIPIENT": "name",
-                "RECIPIENT_TYPE": "entity_type",
-            }
-        )
-        all_organizations = pd.concat([donor_organizations, recipient_organizations])
+
+        all_organizations = pd.concat(role_organizations)
         all_organizations = all_organizations.drop_duplicates()
         all_organizations["state"] = "PA"
 
@@ -284,6 +521,9 @@ class PennsylvaniaTransformer(clean.StateTransformer):
         3. Organizations -> Individuals
         4. Organizations -> Organizations.
 
+        Each row is routed to its dataframe by a code combining its donor's and
+        recipient's class, so the rows are split in a single pass.
+
         Args:
             organizations_df: a pandas dataframe with donor and recipient information that
                 details relevant information about a singular transactions,
@@ -293,91 +533,99 @@ class PennsylvaniaTransformer(clean.StateTransformer):
             a list of pandas dataframe with 4 dataframes detailing the 4
             aformentioned transaction types.
         """
-        organizations_df = organizations_df.copy()
-        column_names = list(organizations_df.columns.str.lower())
-        organizations_df.columns = column_names
+        organizations_df = organizations_df.rename(columns=str.lower)
         organizations_df["transaction_type"] = None
-        organizations_df["office_sought"] = organizations_df.apply(
-            lambda x: (
-                x["donor_office"]
-                if x["recipient_office"] is None
-                else x["recipient_office"]
-            ),
-            axis=1,
+        # the recipient's office, or the donor's if the recipient has none
+        organizations_df["office_sought"] = organizations_df["recipient_office"].fillna(
+            organizations_df["donor_office"]
         )
         organizations_df = organizations_df.drop(
-            columns={"donor_office", "recipient_office"}
+            columns=["donor_office", "recipient_office"]
         )
 
-        # now to separate the tables into 4:
-        # individuals -> individuals:
-        ind_to_ind = organizations_df.loc[
-            (
-                (
-                    (organizations_df.donor_type == "Individual")
-                    | (organizations_df.donor_type == "Candidate")
-                    | (organizations_df.donor_type == "Lobbyist")
-                )
-                & (
-                    (organizations_df.recipient_type == "Candidate")
-                    | (organizations_df.recipient_type == "Individual")
-                    | (organizations_df.recipient_type == "Lobbyist")
-                )
-            )
-        ]
+        donor_classes = self.classify_entity_types(organizations_df["donor_type"])
+        recipient_classes = self.classify_entity_types(
+            organizations_df["recipient_type"]
+        )
+        # 0: ind -> ind, 1: ind -> org, 2: org -> ind, 3: org -> org
+        routes = np.where(
+            (donor_classes >= 0) & (recipient_classes >= 0),
+            2 * donor_classes + recipient_classes,
+            -1,
+        )
 
-        # individuals -> Organizations:
-        ind_to_org = organizations_df.loc[
-            (
-                (
-                    (organizations_df.donor_type == "Individual")
-                    | (organizations_df.donor_type == "Candidate")
-                    | (organizations_df.donor_type == "Lobbyist")
-                )
-                & (
-                    (organizations_df.recipient_type == "Committee")
-                    | (organizations_df.recipient_type == "Organization")
-                )
-            )
-        ]
+        return self.split_by_code(organizations_df, routes, 4)
 
-        # Organizations -> Individuals
-        org_to_ind = organizations_df.loc[
-            (
-                (
-                    (organizations_df.donor_type == "Committee")
-                    | (organizations_df.donor_type == "Organization")
-                )
-                & (
-                    (organizations_df.recipient_type == "Candidate")
-                    | (organizations_df.recipient_type == "Lobbyist")
-                )
-            )
-        ]
+    def classify_entity_types(self, entity_types: pd.Series) -> np.ndarray:
+        """Codes entity types by the table their entities belong in
 
-        # Organizations -> Organizations:
-        org_to_org = organizations_df.loc[
-            (
-                (
-                    (organizations_df.donor_type == "Committee")
-                    | (organizations_df.donor_type == "Organization")
-                )
-                & (
-                    (organizations_df.recipient_type == "Committee")
-                    | (organizations_df.recipient_type == "Organization")
-                )
-            )
-        ]
+        The column is factorized once against the known entity types, rather
+        than compared to each type name.
+
+        Args:
+            entity_types: column of entity types, e.g. DONOR_TYPE
+        Returns:
+            array of each entity's class in const.PA_ENTITY_CLASSES, 0 for
+            individuals and 1 for organizations, or -1 for unknown types
+        """
+        type_codes = pd.Categorical(
+            entity_types, categories=list(const.PA_ENTITY_CLASSES)
+        ).codes
+        # the extra last entry is picked by the -1 code of unknown types
+        classes = np.array([*const.PA_ENTITY_CLASSES.values(), -1], dtype=np.int8)
+        return classes[type_codes]
 
-        return [ind_to_ind, ind_to_org, org_to_ind, org_to_org]
+    def classify_entities(self, df: pd.DataFrame) -> dict[str, np.ndarray]:
+        """Codes the class of each row's donor and recipient
+
+        Args:
+            df: a pandas dataframe with DONOR_TYPE and RECIPIENT_TYPE columns
+        Returns:
+            dict mapping 'DONOR' and 'RECIPIENT' to the classes of their
+            entity types, see classify_entity_types
+        """
+        return {
+            role: self.classify_entity_types(df[f"{role}_TYPE"])
+            for role in ["DONOR", "RECIPIENT"]
+        }
+
+    def split_by_code(
+        self, df: pd.DataFrame, codes: np.ndarray, code_count: int
+    ) -> list[pd.DataFrame]:
+        """Splits the rows of a dataframe by their code in a single pass
+
+        Rows keep their order and index within each part.
+
+        Args:
+            df: dataframe to split
+            codes: integer code of each row of df. Rows with a negative code
+                are left out of every part
+            code_count: number of parts, one for each code from 0 to
+                code_count - 1
+        Returns:
+            list of dataframes of the rows of df with each code
+        """
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(code_count + 1))
+        return [
+            df.take(order[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
 
     def replace_id_with_uuid(
-        self, df_with_ids: pd.DataFrame, id_column: str, year_column: int = None
+        self,
+        df_with_ids: pd.DataFrame,
+        id_column: str,
+        year_column: int = None,
+        name_column: str = None,
     ) -> pd.DataFrame:
         """For each row, replaces id with UUID. Creates mapping from any previous ids
 
-        If the id_column is na, just replaces it with a uuid. If the id_column is not
-        na, creates a UUID for each unique value of the id_column*
+        If the id_column is na, replaces it with a UUID derived from the entity's
+        name, or from the row's TRANSACTION_ID if it has no name either. If the
+        id_column is not na, looks up the UUID of each unique value of the
+        id_column* in the id lookup table (see lookup_provided_ids). UUIDs are
+        derived from the data (see StateTransformer.entity_ids), so the same
+        data always gets the same ids.
 
         * Some states' ids are not stable across year. This is noted by the
         `stable_id_across_years` attribute. If False, the id is treated as the
@@ -388,44 +636,119 @@ class PennsylvaniaTransformer(clean.StateTransformer):
                 ids for donor/contributor entities.
             id_column: Column containing raw ids provided by state
             year_column: Column containing year transaction/entity appeared in data.
+            name_column: Column containing the entities' names
+        Returns:
+            df_with_ids, with the ids replaced in place and rows in their
+            original order
         """
-        na_id_mask = df_with_ids[id_column].isna()
-        rows_with_no_id = df_with_ids[na_id_mask]
-        rows_with_id = df_with_ids[~na_id_mask]
-        # generate and replace na ids with uuids
-        rows_with_no_id[id_column] = rows_with_no_id[id_column].apply(
-            lambda _: uuid.uuid4()
-        )
-        # identify unique identifiers
-        if self.stable_id_across_years:
-            unique_id_year_pairs = [
-                (row_id, None) for row_id in rows_with_id[id_column].unique()
-            ]
+        provided_ids = df_with_ids[id_column]
+        has_id = provided_ids.notna().to_numpy()
+        ids = np.empty(len(df_with_ids), dtype=object)
+
+        # replace na ids with uuids derived from names
+        no_id_positions = np.flatnonzero(~has_id)
+        if name_column is None:
+            names = pd.Series(None, index=provided_ids.index, dtype=object)
         else:
-            unique_id_year_pairs = (
-                rows_with_id[[id_column, year_column]].drop_duplicates().to_numpy()
-            )
-        # generate uuids for existing ids
-        uuid_lookup_table_data = []
-        for identifier in unique_id_year_pairs:
-            uuid_lookup_table_data.append([*identifier, uuid.uuid4()])
-        uuid_lookup_table = pd.DataFrame(
-            columns=["Raw ID", "Year", "UUID"], data=uuid_lookup_table_data
+            names = df_with_ids[name_column]
+        fallback_keys = df_with_ids.get("TRANSACTION_ID")
+        ids[no_id_positions] = self.entity_ids(
+            provided_ids.iloc[no_id_positions],
+            names.iloc[no_id_positions],
+            fallback_keys=(
+                None if fallback_keys is None else fallback_keys.iloc[no_id_positions]
+            ),
+        )
+
+        # replace provided ids with their uuids from the lookup table
+        id_positions = np.flatnonzero(has_id)
+        years = None
+        if not self.stable_id_across_years:
+            years = df_with_ids[year_column].iloc[id_positions]
+        ids[id_positions] = self.lookup_provided_ids(
+            provided_ids.iloc[id_positions], years
         )
-        uuid_lookup_table["State"] = self.name
-        # TODO: save uuid
-        # replace ids with uuids
-        uuid_lookup_table = uuid_lookup_table.set_index(["Raw ID", "Year"])
-        rows_with_id_and_uuid = rows_with_id.merge(
-            uuid_lookup_table,
-            how="left",
-            left_on=[id_column, year_column],
-            right_index=True,
+
+        df_with_ids[id_column] = ids
+        return df_with_ids
+
+    @property
+    def id_lookup_path(self) -> Path:
+        """Parquet file persisting the UUIDs of the ids provided by the state"""
+        return BASE_FILEPATH / "output" / "id_lookup" / f"{self.name}.parquet"
+
+    def read_id_lookup(self) -> pd.DataFrame:
+        """Reads the id lookup table, empty if there is none yet"""
+        if self.id_lookup_path.exists():
+            return pd.read_parquet(self.id_lookup_path)
+        return pd.DataFrame(
+            {
+                "raw_id": pd.Series(dtype=object),
+                "year": pd.Series(dtype="Int64"),
+                "uuid": pd.Series(dtype=object),
+            }
         )
-        rows_with_id_and_uuid[id_column] = rows_with_id_and_uuid["UUID"]
-        rows_with_id_and_uuid = rows_with_id_and_uuid.drop(columns=["UUID"])
-        # concatenate dfs and return
-        return pd.concat([rows_with_id_and_uuid, rows_with_no_id])
+
+    def write_id_lookup(self, id_lookup: pd.DataFrame) -> None:
+        """Replaces the id lookup table through a temporary file
+
+        The previous table is only replaced once the new one is fully
+        written, so an interrupted write never leaves a partial table behind.
+        """
+        lookup_path = self.id_lookup_path
+        lookup_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = lookup_path.with_name(f"{lookup_path.name}.tmp")
+        id_lookup.to_parquet(temporary_path, index=False)
+        temporary_path.replace(lookup_path)
+
+    def lookup_provided_ids(
+        self, provided_ids: pd.Series, years: pd.Series = None
+    ) -> np.ndarray:
+        """Finds the UUID of each provided id in the persisted id lookup table
+
+        The lookup table at id_lookup_path maps each (raw_id, year) pair seen so
+        far to its UUID. Pairs that are not in it yet get UUIDs keyed as in
+        StateTransformer.entity_ids and are added to it when the cleaning
+        session ends (see cleaning_session), so later partitions and runs
+        reuse them. Each unique pair is looked up once.
+
+        Args:
+            provided_ids: ids provided by the state, none missing
+            years: year each id appears in, or None if ids are stable across
+                years
+        Returns:
+            object array of UUID strings, one per id
+        """
+        keys = pd.DataFrame(
+            {
+                "raw_id": provided_ids.astype(str).to_numpy(),
+                "year": pd.array(
+                    pd.NA if years is None else years.to_numpy(), dtype="Int64"
+                ),
+            }
+        )
+        # codes number the unique pairs in order of first appearance
+        codes = keys.groupby(["raw_id", "year"], sort=False, dropna=False).ngroup()
+        unique_keys = keys.drop_duplicates(ignore_index=True)
+
+        with self.cleaning_session():
+            unique_keys = unique_keys.merge(
+                self._id_lookup, how="left", on=["raw_id", "year"]
+            )
+            is_new = unique_keys["uuid"].isna().to_numpy()
+            if is_new.any():
+                new_keys = unique_keys[is_new]
+                key_columns = [new_keys["raw_id"]]
+                if years is not None:
+                    key_columns.append(new_keys["year"])
+                unique_keys.loc[is_new, "uuid"] = self.stable_ids(
+                    "entity", *key_columns
+                )
+                # a later partition may collect the same ids again, they are
+                # added to the table once when the session ends
+                self._new_ids.append(unique_keys[is_new])
+
+        return unique_keys["uuid"].to_numpy(dtype=object)[codes.to_numpy()]
 
     def classify_contributor(self, entity: str) -> str:
         """Identifies whether an entity is likely an organization or individual
@@ -444,6 +767,35 @@ class PennsylvaniaTransformer(clean.StateTransformer):
             loc += 1
         return "Individual"
 
+    def classify_contributors(self, entities: pd.Series) -> pd.Series:
+        """Classifies a column of entities as organizations or individuals
+
+        Gives the same result as applying classify_contributor to each entity,
+        but each unique name is only split and checked once, against a set of
+        the organization identifiers.
+
+        Args:
+            entities: column of entity names. Missing names are classified
+                as individuals, since they contain no organization identifier
+        Returns:
+            column of "Organization" or "Individual" with the index of entities
+        """
+        codes, names = pd.factorize(entities)
+        organization_identifiers = set(const.PA_ORGANIZATION_IDENTIFIERS)
+        is_organization = np.fromiter(
+            (
+                not organization_identifiers.isdisjoint(name.upper().split())
+                for name in names
+            ),
+            dtype=bool,
+            count=len(names),
+        )
+        # the extra last entry is picked by the -1 code of missing names
+        entity_types = np.append(
+            np.where(is_organization, "Organization", "Individual"), "Individual"
+        ).astype(object)
+        return pd.Series(entity_types[codes], index=entities.index)
+
     def pre_process_contributor_dataset(
         self, contributor_df: pd.DataFrame
     ) -> pd.DataFrame:
@@ -463,8 +815,8 @@ class PennsylvaniaTransformer(clean.StateTransformer):
         contributor_df["RECIPIENT_ID"] = contributor_df["RECIPIENT_ID"].astype("str")
         contributor_df["DONOR"] = contributor_df["DONOR"].astype("str")
         contributor_df["DONOR"] = contributor_df["DONOR"].str.title()
-        contributor_df["DONOR_TYPE"] = contributor_df["DONOR"].apply(
-            self.classify_contributor
+        contributor_df["DONOR_TYPE"] = self.classify_contributors(
+            contributor_df["DONOR"]
         )
         contributor_df = contributor_df.drop(
             columns={
@@ -619,11 +971,12 @@ class PennsylvaniaTransformer(clean.StateTransformer):
 
         # There are some recipients whose entity_types isn't specified, so I
         # auto-fill the nan entries with 'Organization.'
-        na_free = merged_contributor_filer_df.dropna(subset="RECIPIENT_TYPE")
-        only_na = merged_contributor_filer_df[
-            ~merged_contributor_filer_df.index.isin(na_free.index)
-        ]
-        only_na["RECIPIENT_TYPE"] = "Organization"
+        # the years' rows repeat index labels, so select them with a mask
+        is_na = merged_contributor_filer_df["RECIPIENT_TYPE"].isna().to_numpy()
+        na_free = merged_contributor_filer_df[~is_na]
+        only_na = merged_contributor_filer_df[is_na].assign(
+            RECIPIENT_TYPE="Organization"
+        )
         merged_contributor_filer_df = pd.concat([na_free, only_na])
 
         columns = merged_contributor_filer_df.columns.to_list()
@@ -664,11 +1017,12 @@ class PennsylvaniaTransformer(clean.StateTransformer):
         # There are some donors whose entity_types isn't specified, so I
         # implement the same classify_contributor function used in the
         # contributors dataset
-        na_free = merged_expense_filer_df.dropna(subset="DONOR_TYPE")
-        only_na = merged_expense_filer_df[
-            ~merged_expense_filer_df.index.isin(na_free.index)
-        ]
-        only_na["DONOR_TYPE"] = only_na["DONOR"].apply(self.classify_contributor)
+        is_na = merged_expense_filer_df["DONOR_TYPE"].isna().to_numpy()
+        na_free = merged_expense_filer_df[~is_na]
+        only_na = merged_expense_filer_df[is_na]
+        only_na = only_na.assign(
+            DONOR_TYPE=self.classify_contributors(only_na["DONOR"]).to_numpy()
+        )
         merged_expense_filer_df = pd.concat([na_free, only_na])
 
         columns = merged_expense_filer_df.columns.to_list()
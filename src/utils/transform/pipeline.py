@@ -1,12 +1,28 @@
 """Merge raw state campaign finance into standardized schema"""
 
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 import pandas as pd
 
 from utils.transform.arizona import ArizonaTransformer
-from utils.transform.clean import StateTransformer
+from utils.transform.clean import PartitionedTransformer, StateTransformer
+from utils.transform.constants import MI_CHUNKSIZE
+from utils.transform.incremental import clean_state_incrementally
+from utils.transform.instrumentation import StageRecorder, recording_stages
 from utils.transform.michigan import MichiganTransformer
 from utils.transform.minnesota import MinnesotaTransformer
 from utils.transform.pennsylvania import PennsylvaniaTransformer
+from utils.transform.schema import enforce_schema
+from utils.transform.storage import (
+    TABLE_NAMES,
+    parquet_parts_dataset,
+    read_ipc,
+    write_ipc,
+    write_state_tables,
+)
 
 ALL_STATE_CLEANERS = [
     ArizonaTransformer(),
@@ -16,39 +32,254 @@ ALL_STATE_CLEANERS = [
 ]
 
 
+def clean_state(
+    state_cleaner: StateTransformer, cache_directory: str | Path = None
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Runs a state cleaner, incrementally if given a cache directory
+
+    The tables are cast to the standard schema (see utils.transform.schema).
+
+    Args:
+        state_cleaner: state cleaner to run
+        cache_directory: if given and the state cleaner is a
+            PartitionedTransformer, unchanged raw data partitions reuse their
+            tables cached there by a previous run (see
+            utils.transform.incremental)
+
+    Returns: (individuals, organizations, transactions) tables of the state
+    """
+    if cache_directory is None or not isinstance(state_cleaner, PartitionedTransformer):
+        tables = state_cleaner.clean_state()
+    else:
+        tables = clean_state_incrementally(state_cleaner, cache_directory)
+    return tuple(enforce_schema(table) for table in tables)
+
+
+def clean_state_to_ipc(
+    state_cleaner: StateTransformer,
+    directory: str | Path,
+    cache_directory: str | Path = None,
+    recorder: StageRecorder = None,
+) -> list[Path | None]:
+    """Runs a state cleaner and writes its tables to Arrow IPC files
+
+    This is the unit of work for each worker process in transform_and_merge.
+    Tables are handed back as files rather than pickled DataFrames.
+
+    Args:
+        state_cleaner: state cleaner to run
+        directory: directory to write the IPC files in
+        cache_directory: cache of unchanged partitions, passed to clean_state
+        recorder: if given, the state's stages are recorded with it and the
+            recorded stages are also written to stages_path(state_cleaner,
+            directory), to be read back by the parent process
+
+    Returns:
+        paths to the individuals, organizations, and transactions tables. A
+        path is None if the state produced no such table.
+    """
+    with recording_stages(recorder):
+        tables = clean_state(state_cleaner, cache_directory)
+    if recorder is not None:
+        with stages_path(state_cleaner, directory).open("w") as f:
+            json.dump(recorder.stages, f)
+    table_paths = []
+    for table_name, table in zip(TABLE_NAMES, tables):
+        if table is None:
+            table_paths.append(None)
+            continue
+        table_path = Path(directory) / f"{state_cleaner.name}_{table_name}.arrow"
+        table_paths.append(write_ipc(table, table_path))
+    return table_paths
+
+
+def stages_path(state_cleaner: StateTransformer, directory: str | Path) -> Path:
+    """Path of the stages recorded by clean_state_to_ipc in directory"""
+    return Path(directory) / f"{state_cleaner.name}_stages.json"
+
+
+def clean_states_in_pool(
+    state_cleaners: list[StateTransformer],
+    workers: int,
+    cache_directory: str | Path = None,
+    recorder: StageRecorder = None,
+) -> list[tuple[StateTransformer, tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]]:
+    """Runs each state cleaner in its own worker process
+
+    A state that raises is reported and left out of the results so the other
+    states still complete.
+
+    Args:
+        state_cleaners: state cleaners to run
+        workers: maximum number of worker processes
+        cache_directory: cache of unchanged partitions, passed to clean_state
+        recorder: if given, each worker records its state's stages, which are
+            added to this recorder
+
+    Returns:
+        (state_cleaner, (individuals, organizations, transactions)) for each
+        state that was cleaned successfully, in the order of state_cleaners
+    """
+    state_tables = {}
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        ProcessPoolExecutor(max_workers=workers) as executor,
+    ):
+        futures = {
+            executor.submit(
+                clean_state_to_ipc,
+                state_cleaner,
+                directory,
+                cache_directory,
+                recorder,
+            ): position
+            for position, state_cleaner in enumerate(state_cleaners)
+        }
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                table_paths = future.result()
+            except Exception as e:
+                print(f"Cleaning {state_cleaners[position].name} failed: {e!r}")
+                continue
+            if recorder is not None:
+                with stages_path(state_cleaners[position], directory).open() as f:
+                    recorder.stages.extend(json.load(f))
+            state_tables[position] = tuple(
+                None if table_path is None else enforce_schema(read_ipc(table_path))
+                for table_path in table_paths
+            )
+            print(f"Cleaned {state_cleaners[position].name}")
+
+    return [
+        (state_cleaners[position], state_tables[position])
+        for position in sorted(state_tables)
+    ]
+
+
+def stream_state_to_parquet(
+    state_cleaner: MichiganTransformer,
+    output_directory: str | Path,
+    chunksize: int = MI_CHUNKSIZE,
+) -> dict[str, Path]:
+    """Transforms a state a chunk of raw rows at a time into Parquet datasets
+
+    The state's stream_state method (only Michigan has one) writes each
+    chunk's tables as part files to a temporary directory, and the parts are
+    then written into the same datasets as write_state_tables a batch at a
+    time, so the state's tables are never all held in memory. The chunks' id
+    mappings are written the same way to where clean_state writes the
+    state's id mapping (see MichiganTransformer.output_id_mapping).
+
+    Args:
+        state_cleaner: state cleaner with a stream_state method
+        output_directory: root directory of the datasets
+        chunksize: number of raw rows transformed at once
+
+    Returns: dict mapping each table name to its dataset directory
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        part_directories = state_cleaner.stream_state(directory, chunksize)
+        id_mapping_parts = parquet_parts_dataset(part_directories["id_mapping"])
+        if id_mapping_parts is not None:
+            state_cleaner.output_id_mapping(
+                batch.to_pandas() for batch in id_mapping_parts.to_batches()
+            )
+        return write_state_tables(
+            tuple(
+                parquet_parts_dataset(part_directories[table_name])
+                for table_name in TABLE_NAMES
+            ),
+            state_cleaner.name,
+            output_directory,
+        )
+
+
+def concatenate_state_tables(tables: list[pd.DataFrame | None]) -> pd.DataFrame:
+    """Concatenates the same table of several states, with standard types
+
+    Args:
+        tables: the table of each state, None for states without the table
+
+    Returns: the concatenated table, empty if no state has the table
+    """
+    tables = [table for table in tables if table is not None]
+    if not tables:
+        return pd.DataFrame()
+    # categoricals of different states are concatenated as objects
+    return enforce_schema(pd.concat(tables))
+
+
 def transform_and_merge(
     state_cleaners: list[StateTransformer] = None,
-) -> list[pd.DataFrame]:
+    workers: int = 1,
+    output_directory: str | Path = None,
+    cache_directory: str | Path = None,
+    report_path: str | Path = None,
+    trace_memory: bool = False,
+    return_tables: bool = True,
+) -> list[pd.DataFrame] | None:
     """From raw datafiles, clean, merge, and reformat data from specified states.
 
     Args:
         state_cleaners: List of state cleaners to merge data from. If None,
             will default to all state_cleaners
+        workers: number of processes to clean states in. With more than one,
+            each state is cleaned in its own worker process and a state that
+            fails is skipped instead of stopping the whole run.
+        output_directory: if given, each state's tables are also written there
+            as Parquet datasets partitioned by state and year (see
+            utils.transform.storage.write_state_tables)
+        cache_directory: if given, each state's raw data partitions are only
+            transformed if they changed since the previous run with this cache
+            directory (see utils.transform.incremental)
+        report_path: if given, the wall time, CPU time, memory and row counts
+            of every stage of every state are written there as a JSON run
+            report (see utils.transform.instrumentation)
+        trace_memory: whether the run report also measures the peak memory
+            allocated by each stage with tracemalloc, which slows stages down
+        return_tables: whether to merge and return the states' tables. When
+            they are only written to output_directory, pass False so they are
+            not merged in memory, and cleaning states one at a time keeps
+            only one state's tables in memory
 
     Returns:
-        list of individuals, organizations, and transactions tables
+        list of individuals, organizations, and transactions tables, with the
+        standard schema's column types, or None if return_tables is False. A
+        table is empty if no state was cleaned successfully.
     """
     if state_cleaners is None:
         state_cleaners = ALL_STATE_CLEANERS
-    single_state_individuals_tables = []
-    single_state_organizations_tables = []
-    single_state_transactions_tables = []
-    for state_cleaner in state_cleaners:
-        print("Cleaning...")
-        (
-            individuals_table,
-            organizations_table,
-            transactions_table,
-        ) = state_cleaner.clean_state()
-        single_state_individuals_tables.append(individuals_table)
-        single_state_organizations_tables.append(organizations_table)
-        single_state_transactions_tables.append(transactions_table)
-
-    complete_individuals_table = pd.concat(single_state_individuals_tables)
-    complete_organizations_table = pd.concat(single_state_organizations_tables)
-    complete_transactions_table = pd.concat(single_state_transactions_tables)
-    return (
-        complete_individuals_table,
-        complete_organizations_table,
-        complete_transactions_table,
+    recorder = None
+    if report_path is not None:
+        recorder = StageRecorder(trace_memory=trace_memory)
+    state_tables = []
+
+    def collect(state_cleaner: StateTransformer, tables: tuple) -> None:
+        """Writes a state's tables if asked to, and keeps them if returned"""
+        if output_directory is not None:
+            write_state_tables(tables, state_cleaner.name, output_directory)
+        if return_tables:
+            state_tables.append(tables)
+
+    if workers > 1:
+        for state_cleaner, tables in clean_states_in_pool(
+            state_cleaners, workers, cache_directory, recorder
+        ):
+            collect(state_cleaner, tables)
+    else:
+        for state_cleaner in state_cleaners:
+            print("Cleaning...")
+            with recording_stages(recorder):
+                tables = clean_state(state_cleaner, cache_directory)
+            collect(state_cleaner, tables)
+    if recorder is not None:
+        print(f"Stage report written to {recorder.write_report(report_path)}")
+    if not return_tables:
+        return None
+    if not state_tables:
+        print("No state was cleaned successfully")
+    return tuple(
+        concatenate_state_tables([tables[position] for tables in state_tables])
+        for position in range(len(TABLE_NAMES))
     )
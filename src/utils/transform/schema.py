@@ -0,0 +1,85 @@
+"""Typed schema of the standardized individuals, organizations and transactions
+
+Every state's tables are given these column types as they leave the state
+transformer (see utils.transform.pipeline.clean_state), so a column has the
+same compact type whichever state it came from:
+- enumerations such as entity types, parties and offices are categoricals
+- names, free text and UUID ids are pyarrow-backed strings
+- years are nullable Int32, since some raw rows have no year
+"""
+
+import pandas as pd
+import pyarrow as pa
+
+STRING = pd.StringDtype("pyarrow")
+CATEGORY = "category"
+
+# pandas types of the standardized tables' columns, used in memory
+STANDARD_DTYPES = {
+    "id": STRING,
+    "first_name": STRING,
+    "last_name": STRING,
+    "full_name": STRING,
+    "name": STRING,
+    "entity_type": CATEGORY,
+    "state": CATEGORY,
+    "party": CATEGORY,
+    "company": STRING,
+    "transaction_id": STRING,
+    "donor_id": STRING,
+    "donor_type": CATEGORY,
+    "recipient_id": STRING,
+    "recipient_type": CATEGORY,
+    "office_sought": CATEGORY,
+    "purpose": STRING,
+    "transaction_type": CATEGORY,
+    "year": "Int32",
+    "amount": "float64",
+}
+
+# arrow types of the standardized tables' columns, used in files, so a column
+# is stored with the same type whichever state or chunk it came from
+ARROW_TYPES = {
+    STRING: pa.string(),
+    CATEGORY: pa.string(),
+    "Int32": pa.int32(),
+    "float64": pa.float64(),
+}
+STANDARD_COLUMN_TYPES = {
+    column: ARROW_TYPES[dtype] for column, dtype in STANDARD_DTYPES.items()
+}
+
+
+def enforce_schema(table: pd.DataFrame | None) -> pd.DataFrame | None:
+    """Casts the standard schema columns of a table to their standard types
+
+    Values that are not strings in string or categorical columns (e.g.
+    numeric ids or uuid.UUID objects) are converted to strings, keeping
+    missing values missing. Columns outside of the schema are left as they
+    are. Concatenating tables of different states turns categoricals with
+    different categories back into objects, so enforce the schema again after
+    concatenating.
+
+    Args:
+        table: a standardized individuals, organizations, or transactions
+            table, or None if a state has no such table
+
+    Returns: the table with its columns cast, or None
+    """
+    if table is None:
+        return None
+    dtypes = {}
+    for column in table.columns.intersection(STANDARD_DTYPES.keys()):
+        dtype = STANDARD_DTYPES[column]
+        if table[column].dtype == dtype:
+            continue
+        if dtype == CATEGORY and table[column].dtype == object:
+            table = table.assign(
+                **{
+                    column: table[column].where(
+                        table[column].isna(), table[column].astype(str)
+                    )
+                }
+            )
+        dtypes[column] = dtype
+    return table.astype(dtypes)
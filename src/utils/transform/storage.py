@@ -0,0 +1,239 @@
+"""Reading and writing standardized tables with Arrow"""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.transform.schema import STANDARD_COLUMN_TYPES
+
+TABLE_NAMES = ["individuals", "organizations", "transactions"]
+
+# hive partition key holding the name of the state a row was transformed from.
+# Not called 'state' since entity tables already have a 'state' column
+SOURCE_STATE_PARTITION = "source_state"
+YEAR_PARTITION = "year"
+
+
+def to_arrow_table(table: pd.DataFrame, cast_standard_types: bool = True) -> pa.Table:
+    """Converts a standardized table to an Arrow table
+
+    Object columns holding values Arrow can't store natively (e.g. uuid.UUID
+    objects or a mix of strings and numbers) are written as strings, keeping
+    missing values missing. Unless cast_standard_types is False, standard
+    schema columns are cast to their STANDARD_COLUMN_TYPES type and other
+    columns with no values at all are typed as strings, so a column has the
+    same type in every state and chunk.
+
+    Args:
+        table: a standardized individuals, organizations, or transactions table
+        cast_standard_types: whether to cast columns to the standard types
+
+    Returns: the table as a pyarrow Table, without the pandas index
+    """
+    table = table.copy(deep=False)
+    for column in table.columns[table.dtypes == object]:
+        try:
+            pa.array(table[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            table[column] = table[column].where(
+                table[column].isna(), table[column].astype(str)
+            )
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    if not cast_standard_types:
+        return arrow_table
+    for position, field in enumerate(arrow_table.schema):
+        column_type = STANDARD_COLUMN_TYPES.get(field.name)
+        if column_type is None and pa.types.is_null(field.type):
+            column_type = pa.string()
+        if column_type is not None and column_type != field.type:
+            arrow_table = arrow_table.set_column(
+                position,
+                field.with_type(column_type),
+                arrow_table.column(position).cast(column_type),
+            )
+    return arrow_table
+
+
+def write_ipc(table: pd.DataFrame, path: str | Path) -> Path:
+    """Writes a table to an Arrow IPC file
+
+    Column types are kept as they are, so read_ipc returns the same dataframe.
+
+    Args:
+        table: dataframe to write
+        path: destination of the IPC file
+
+    Returns: path to the written file
+    """
+    path = Path(path)
+    arrow_table = to_arrow_table(table, cast_standard_types=False)
+    with (
+        pa.OSFile(str(path), "wb") as sink,
+        pa.ipc.new_file(sink, arrow_table.schema) as writer,
+    ):
+        writer.write_table(arrow_table)
+    return path
+
+
+def read_ipc(path: str | Path) -> pd.DataFrame:
+    """Reads a table written by write_ipc back into pandas"""
+    with pa.OSFile(str(path), "rb") as source:
+        return pa.ipc.open_file(source).read_pandas()
+
+
+def append_parquet_part(table: pd.DataFrame, directory: str | Path) -> Path:
+    """Writes a table as the next numbered Parquet part file in a directory
+
+    Together the part files in a directory form one table that is written a
+    chunk at a time, so the whole table never has to be held in memory. A
+    part is written to a temporary file first and only then renamed, so an
+    interrupted write never leaves a partial part behind and the number of
+    parts counts the chunks written completely.
+
+    Args:
+        table: chunk of the table to write
+        directory: directory holding the table's part files
+
+    Returns: path to the written part file
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    part_number = len(list(directory.glob("part-*.parquet")))
+    part_path = directory / f"part-{part_number:05d}.parquet"
+    temporary_path = part_path.with_name(f"{part_path.name}.tmp")
+    pq.write_table(to_arrow_table(table), temporary_path)
+    temporary_path.replace(part_path)
+    return part_path
+
+
+def read_parquet_parts(directory: str | Path) -> pd.DataFrame:
+    """Reads the part files written by append_parquet_part into one table"""
+    part_paths = sorted(Path(directory).glob("part-*.parquet"))
+    return pd.concat(
+        [pd.read_parquet(part_path) for part_path in part_paths], ignore_index=True
+    )
+
+
+def parquet_parts_dataset(directory: str | Path) -> ds.Dataset | None:
+    """Opens the part files written by append_parquet_part as one dataset
+
+    Unlike read_parquet_parts, the parts are not read, so the dataset can be
+    scanned or written elsewhere a batch at a time.
+
+    Args:
+        directory: directory holding the table's part files
+
+    Returns: the dataset, with the schemas of all parts unified, or None if
+        the directory has no parts
+    """
+    part_paths = sorted(Path(directory).glob("part-*.parquet"))
+    if not part_paths:
+        return None
+    part_paths = [str(part_path) for part_path in part_paths]
+    schema = pa.unify_schemas(
+        [pq.read_schema(part_path) for part_path in part_paths],
+        promote_options="permissive",
+    )
+    return ds.dataset(part_paths, format="parquet", schema=schema)
+
+
+def write_state_tables(
+    tables: tuple[pd.DataFrame | ds.Dataset, ...],
+    state: str,
+    output_directory: str | Path,
+) -> dict[str, Path]:
+    """Writes one state's standardized tables as partitioned Parquet datasets
+
+    Tables are written with zstd compression to
+    output_directory/<table>/source_state=<state>/ and transactions are further
+    split into year=<year>/ directories. Rewriting a state deletes all of its
+    previous partitions first, including years it no longer has, and leaves
+    other states untouched.
+
+    Args:
+        tables: (individuals, organizations, transactions) tables of one state.
+            A table may be None if the state has no such data, or a pyarrow
+            dataset (e.g. from parquet_parts_dataset), which is written a
+            batch at a time
+        state: name of the state the tables were transformed from
+        output_directory: root directory of the datasets
+
+    Returns: dict mapping each table name to its dataset directory
+    """
+    output_directory = Path(output_directory)
+    file_options = ds.ParquetFileFormat().make_write_options(compression="zstd")
+    dataset_directories = {}
+    for table_name, table in zip(TABLE_NAMES, tables):
+        dataset_directory = output_directory / table_name
+        dataset_directories[table_name] = dataset_directory
+        state_directory = dataset_directory / f"{SOURCE_STATE_PARTITION}={state}"
+        # removes years the state no longer has, not only those written again
+        shutil.rmtree(state_directory, ignore_errors=True)
+        if table is None:
+            continue
+        if not isinstance(table, ds.Dataset):
+            table = to_arrow_table(table)
+        partitioning = None
+        if YEAR_PARTITION in table.schema.names:
+            partitioning = ds.partitioning(
+                pa.schema([(YEAR_PARTITION, pa.int32())]), flavor="hive"
+            )
+        ds.write_dataset(
+            table,
+            state_directory,
+            format="parquet",
+            partitioning=partitioning,
+            file_options=file_options,
+        )
+    return dataset_directories
+
+
+def read_table(
+    dataset_directory: str | Path,
+    columns: list[str] = None,
+    states: list[str] = None,
+    years: list[int] = None,
+) -> pd.DataFrame:
+    """Reads a table written by write_state_tables
+
+    Only the requested columns are read, and partitions outside of the
+    requested states and years are skipped without being opened.
+
+    Args:
+        dataset_directory: directory of one table's dataset
+        columns: columns to read. Defaults to all columns of the table, leaving
+            out the source_state partition key.
+        states: names of the states to read. Defaults to all states
+        years: years to read. Only applies to tables partitioned by year.
+
+    Returns: the requested part of the table as a dataframe
+    """
+    dataset = ds.dataset(dataset_directory, format="parquet", partitioning="hive")
+    # states may have written the same column with different types
+    # (e.g. all missing in one state), so unify their schemas
+    schema = pa.unify_schemas(
+        [dataset.schema]
+        + [fragment.physical_schema for fragment in dataset.get_fragments()],
+        promote_options="permissive",
+    )
+    dataset = ds.dataset(
+        dataset_directory, format="parquet", partitioning="hive", schema=schema
+    )
+    if columns is None:
+        columns = [name for name in schema.names if name != SOURCE_STATE_PARTITION]
+
+    row_filter = None
+    if states is not None:
+        row_filter = ds.field(SOURCE_STATE_PARTITION).isin(states)
+    if years is not None and YEAR_PARTITION in schema.names:
+        year_filter = ds.field(YEAR_PARTITION).isin(years)
+        row_filter = year_filter if row_filter is None else row_filter & year_filter
+
+    # nullable, so years stay integers even when some are missing
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas(
+        types_mapper={pa.int32(): pd.Int32Dtype()}.get
+    )
@@ -1,9 +1,30 @@
 """Utilities for cleaning state campaign finance data"""
 
+import hashlib
 import re
+import uuid
+from collections import Counter
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# positions of the 32 hex digits within a canonical 36 character UUID string
+UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+# namespace of the version 5 UUIDs derived from state data
+ID_NAMESPACE = uuid.UUID("5f3c6f2e-8d0b-4c5e-9a57-6b1e2f9d4a80")
+# separates the parts of the keys UUIDs are derived from
+KEY_SEPARATOR = "\x1f"
+# most UUID strings in one Arrow array, whose offsets are 32 bit
+ARROW_UUID_CHUNK = 2**25
+
+# .NET style JSON dates, e.g. '/Date(1262304000000)/' or
+# '/Date(1262304000000-0700)/', capturing the milliseconds since the epoch
+DOTNET_DATE_PATTERN = r"^/Date\((-?\d+)(?:[+-]\d{4})?\)/"
 
 
 def convert_date(date_str: str) -> datetime.utcfromtimestamp:
@@ -22,6 +43,28 @@ def convert_date(date_str: str) -> datetime.utcfromtimestamp:
         return None  # Return None for invalid date formats
 
 
+def convert_dates(dates: pd.Series) -> pd.Series:
+    """Convert a column of .NET style JSON dates to datetimes
+
+    Vectorized counterpart of convert_date: the milliseconds are extracted
+    from every date at once and converted with a single to_datetime call.
+
+    Args:
+        dates: column of dates formatted like '/Date(1262304000000)/', as
+            returned by the Arizona scraper. A UTC offset after the
+            milliseconds is allowed and ignored, since the milliseconds
+            are already UTC.
+
+    Returns:
+        column of UTC datetimes without timezone, NaT where a value is
+        missing, not formatted as a date or out of range
+    """
+    milliseconds = dates.astype(object).str.extract(DOTNET_DATE_PATTERN, expand=False)
+    return pd.to_datetime(
+        pd.to_numeric(milliseconds, errors="coerce"), unit="ms", errors="coerce"
+    )
+
+
 def remove_nonstandard(col: pd.Series) -> pd.Series:
     """Remove nonstandard characters from columns
 
@@ -43,3 +86,259 @@ def remove_nonstandard(col: pd.Series) -> pd.Series:
     # turns oversized whitespace to single space
 
     return col
+
+
+def uuid_characters(uuid_bytes: np.ndarray) -> np.ndarray:
+    """Spell raw 16 byte UUIDs out as the characters of canonical UUID strings
+
+    Args:
+        uuid_bytes: (n, 16) uint8 array, one UUID per row
+
+    Returns:
+        (n, 36) uint8 array of the ASCII characters of each UUID string
+    """
+    uuid_bytes = np.asarray(uuid_bytes, dtype=np.uint8).reshape(-1, 16)
+    hex_chars = np.empty((len(uuid_bytes), 32), dtype=np.uint8)
+    hex_chars[:, 0::2] = HEX_DIGITS[uuid_bytes >> 4]
+    hex_chars[:, 1::2] = HEX_DIGITS[uuid_bytes & 0x0F]
+
+    formatted = np.full((len(uuid_bytes), 36), ord("-"), dtype=np.uint8)
+    formatted[:, UUID_HEX_POSITIONS] = hex_chars
+    return formatted
+
+
+def format_uuid_bytes(uuid_bytes: np.ndarray) -> np.ndarray:
+    """Format raw 16 byte UUIDs as canonical UUID strings in one vectorized pass
+
+    Args:
+        uuid_bytes: (n, 16) uint8 array, one UUID per row
+
+    Returns:
+        length n object array of strings formatted like str(uuid.UUID)
+    """
+    return uuid_characters(uuid_bytes).view("S36").ravel().astype(str).astype(object)
+
+
+def format_uuid_arrow(uuid_bytes: np.ndarray) -> pa.ChunkedArray:
+    """Format raw 16 byte UUIDs as an Arrow array of canonical UUID strings
+
+    The characters are written straight into the Arrow string buffers, so
+    unlike format_uuid_bytes no Python string is created per UUID.
+
+    Args:
+        uuid_bytes: (n, 16) uint8 array, one UUID per row
+
+    Returns:
+        length n Arrow string array of strings formatted like str(uuid.UUID)
+    """
+    characters = uuid_characters(uuid_bytes)
+    chunks = []
+    for start in range(0, len(characters), ARROW_UUID_CHUNK):
+        chunk = characters[start : start + ARROW_UUID_CHUNK]
+        offsets = np.arange(0, 36 * (len(chunk) + 1), 36, dtype=np.int32)
+        chunks.append(
+            pa.StringArray.from_buffers(
+                len(chunk), pa.py_buffer(offsets), pa.py_buffer(chunk)
+            )
+        )
+    return pa.chunked_array(chunks, type=pa.string())
+
+
+def uuid5_bytes(state: str, kind: str, keys: list[bytes]) -> np.ndarray:
+    """Derive the raw version 5 UUID of each key
+
+    Gives the bytes of uuid.uuid5(ID_NAMESPACE, name) where name is the
+    state, kind and key joined by KEY_SEPARATOR, without creating a UUID
+    object per key.
+
+    Args:
+        state: name of the state the data comes from
+        kind: what the ids identify, e.g. 'entity' or 'transaction', so the
+            same key gives different ids for different kinds
+        keys: encoded key of each id
+
+    Returns:
+        (n, 16) uint8 array, one UUID per key
+    """
+    prefix = (
+        ID_NAMESPACE.bytes + f"{state}{KEY_SEPARATOR}{kind}{KEY_SEPARATOR}".encode()
+    )
+    digests = b"".join(
+        [hashlib.sha1(prefix + key).digest()[:16] for key in keys]  # noqa: S324
+    )
+    uuid_bytes = np.frombuffer(digests, dtype=np.uint8).reshape(-1, 16).copy()
+    # set the version (5) and variant (RFC 4122) bits
+    uuid_bytes[:, 6] = (uuid_bytes[:, 6] & 0x0F) | 0x50
+    uuid_bytes[:, 8] = (uuid_bytes[:, 8] & 0x3F) | 0x80
+    return uuid_bytes
+
+
+def uuid5_strings(state: str, kind: str, keys: list[bytes]) -> np.ndarray:
+    """Format the version 5 UUID of each key in one vectorized pass
+
+    Gives the same ids as str(uuid.uuid5(ID_NAMESPACE, name)), see
+    uuid5_bytes.
+
+    Args:
+        state: name of the state the data comes from
+        kind: what the ids identify, e.g. 'entity' or 'transaction'
+        keys: encoded key of each id
+
+    Returns:
+        object array of UUID strings, one per key
+    """
+    return format_uuid_bytes(uuid5_bytes(state, kind, keys))
+
+
+def uuid5_arrow(state: str, kind: str, keys: list[bytes]) -> pd.arrays.ArrowStringArray:
+    """Format the version 5 UUID of each key as a pyarrow-backed string array
+
+    Gives the same ids as uuid5_strings, without a Python string per key.
+
+    Args:
+        state: name of the state the data comes from
+        kind: what the ids identify, e.g. 'entity' or 'transaction'
+        keys: encoded key of each id
+
+    Returns:
+        string[pyarrow] array of UUID strings, one per key
+    """
+    return pd.arrays.ArrowStringArray(format_uuid_arrow(uuid5_bytes(state, kind, keys)))
+
+
+def stable_uuids(state: str, kind: str, *key_columns: pd.Series) -> np.ndarray:
+    """Derive a deterministic (version 5) UUID string for each row's key
+
+    The same state, kind and key values always give the same UUID, so ids
+    stay the same when the same data is transformed again. Rows are
+    factorized first, so each unique key is only formatted and hashed once.
+
+    Args:
+        state: name of the state the data comes from
+        kind: what the ids identify, e.g. 'entity' or 'transaction'
+        key_columns: columns whose values together make up each row's key.
+            Missing values are keyed as '<NA>'.
+
+    Returns:
+        object array of UUID strings, one per row
+    """
+    key_columns = [np.asarray(key_column, dtype=object) for key_column in key_columns]
+    codes = np.zeros(len(key_columns[0]), dtype=np.int64)
+    for key_column in key_columns:
+        column_codes, column_uniques = pd.factorize(key_column, use_na_sentinel=False)
+        codes, _ = pd.factorize(codes * len(column_uniques) + column_codes)
+    # codes number unique keys in order of first appearance
+    _, first_positions = np.unique(codes, return_index=True)
+
+    unique_keys = None
+    for key_column in key_columns:
+        values = pd.Series(key_column[first_positions], dtype=object)
+        values = values.astype(str).mask(values.isna(), "<NA>")
+        unique_keys = (
+            values if unique_keys is None else unique_keys + KEY_SEPARATOR + values
+        )
+    encoded_keys = [key.encode() for key in unique_keys]
+    return uuid5_strings(state, kind, encoded_keys)[codes]
+
+
+def stable_uuid_arrow(state: str, kind: str, values: pd.Series) -> pd.Series:
+    """Derive the version 5 UUID of each value as a pyarrow-backed string column
+
+    Gives the same ids as stable_uuids(state, kind, values) for present values
+    and missing ids for missing values. The column is factorized once, each
+    unique value is hashed once, and the ids are formatted in NumPy straight
+    into Arrow buffers and gathered per row with an Arrow take, so no Python
+    string is created per row.
+
+    Args:
+        state: name of the state the data comes from
+        kind: what the ids identify, e.g. 'entity' or 'transaction'
+        values: column of values to key the ids by
+
+    Returns:
+        string[pyarrow] Series of UUID strings with the index of values
+    """
+    codes, uniques = pd.factorize(values)
+    unique_ids = format_uuid_arrow(
+        uuid5_bytes(state, kind, [str(value).encode() for value in uniques])
+    )
+    # missing values have code -1, taken as a null id
+    indices = pa.array(codes, mask=codes < 0)
+    ids = pa.chunked_array(
+        [
+            chunk
+            for start in range(0, len(indices), ARROW_UUID_CHUNK)
+            for chunk in pc.take(
+                unique_ids, indices.slice(start, ARROW_UUID_CHUNK)
+            ).chunks
+        ],
+        type=pa.string(),
+    )
+    return pd.Series(pd.arrays.ArrowStringArray(ids), index=values.index)
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Normalize names for use as ids: upper case, single spaces, no padding"""
+    return names.str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def content_keys(rows: pd.DataFrame, occurrence_counts: Counter = None) -> list[bytes]:
+    """Key each row by its contents and the number of identical rows before it
+
+    Args:
+        rows: rows to key, with the columns that identify a row
+        occurrence_counts: optional Counter of how many times each row content
+            has been seen, updated in place. Pass the same Counter when keying
+            a table one chunk at a time so identical rows in different chunks
+            still get different keys.
+
+    Returns:
+        16 byte key of each row: the hash of its contents followed by the
+        number of identical rows before it
+    """
+    hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    occurrences = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    if occurrence_counts is not None:
+        unique_hashes, counts = np.unique(hashes, return_counts=True)
+        previous_counts = np.fromiter(
+            (occurrence_counts[row_hash] for row_hash in unique_hashes.tolist()),
+            dtype=np.int64,
+            count=len(unique_hashes),
+        )
+        occurrences = (
+            occurrences + previous_counts[np.searchsorted(unique_hashes, hashes)]
+        )
+        occurrence_counts.update(dict(zip(unique_hashes.tolist(), counts.tolist())))
+    keys = np.empty((len(hashes), 2), dtype=np.uint64)
+    keys[:, 0] = hashes
+    keys[:, 1] = occurrences
+    return keys.view("V16").ravel().tolist()
+
+
+def text_keys(rows: pd.DataFrame, occurrence_counts: Counter = None) -> list[bytes]:
+    """Key each row by the text of its values and the number of identical rows
+
+    Unlike content_keys, the keys can be built outside of pandas, e.g. in SQL
+    by utils.transform.duckdb_backend: each value as str() gives it, or
+    '<NA>' if missing, joined by KEY_SEPARATOR and followed by the number of
+    identical rows before it.
+
+    Args:
+        rows: rows to key, with the columns that identify a row in order
+        occurrence_counts: optional Counter of how many times each row's text
+            has been seen, updated in place, see content_keys
+
+    Returns:
+        UTF-8 encoded key of each row
+    """
+    texts = None
+    for column in rows.columns:
+        values = rows[column].astype(object)
+        values = values.astype(str).mask(values.isna(), "<NA>")
+        texts = values if texts is None else texts + KEY_SEPARATOR + values
+    occurrences = texts.groupby(texts, sort=False).cumcount()
+    if occurrence_counts is not None:
+        occurrences = occurrences + texts.map(occurrence_counts)
+        occurrence_counts.update(texts.tolist())
+    keys = texts + KEY_SEPARATOR + occurrences.astype(str)
+    return [key.encode() for key in keys]
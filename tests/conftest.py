@@ -0,0 +1,159 @@
+"""Fixtures shared by the tests: a stub HTTP server and fake state transformers"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+from utils.transform.clean import PartitionedTransformer, StateTransformer
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local HTTP server passing every request to a respond function
+
+    Each scraper test gives it the behavior of the site it stands in for.
+    Attributes a test needs to configure or inspect the server (e.g. the
+    bodies to serve or the requests received) can be set on it freely.
+    """
+
+    def __init__(self, respond) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.respond = respond
+        self.lock = threading.Lock()
+
+    def url(self, path="/"):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.respond(self)
+
+    def do_HEAD(self):
+        self.server.respond(self)
+
+    def do_POST(self):
+        self.server.respond(self)
+
+    def reply(self, status, body=b"", headers=None):
+        """Sends a response, with a Content-Length unless headers have one"""
+        headers = {"Content-Length": str(len(body)), **(headers or {})}
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def start_stub_server():
+    """Returns a function starting a StubServer, shut down after the test"""
+    servers = []
+
+    def start(respond):
+        server = StubServer(respond)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeTransformer(StateTransformer):
+    """Transformer of a made up state, for testing what runs transformers
+
+    Without a raw directory the state has one individual, organization and
+    transaction with ids made from its name. With one, each CSV file in the
+    directory holds transactions, and the state has no entity tables.
+    """
+
+    entity_name_dictionary = {}
+
+    def __init__(
+        self,
+        name="Fake",
+        raw_directory=None,
+        year=2020,
+        fail=False,
+        stable_id_across_years=True,
+    ):
+        self._name = name
+        self._stable_id_across_years = stable_id_across_years
+        self.raw_directory = raw_directory
+        self.year = year
+        self.fail = fail
+
+    def raw_filepaths(self):
+        if self.raw_directory is None:
+            return []
+        return sorted(self.raw_directory.iterdir())
+
+    def preprocess(self, filepaths=None):
+        return [pd.read_csv(filepath) for filepath in filepaths or []]
+
+    def clean(self, data):
+        return data
+
+    def standardize(self, data):
+        return data
+
+    def create_tables(self, data):
+        if data:
+            return None, None, pd.concat(data, ignore_index=True)
+        individuals = pd.DataFrame(
+            {"id": [f"{self.name}-1"], "full_name": ["jane doe"], "state": [self.name]}
+        )
+        organizations = pd.DataFrame(
+            {"id": [f"{self.name}-2"], "name": ["acme"], "state": [self.name]}
+        )
+        transactions = pd.DataFrame(
+            {
+                "transaction_id": [f"{self.name}-3"],
+                "donor_id": [f"{self.name}-1"],
+                "recipient_id": [f"{self.name}-2"],
+                "year": [self.year],
+                "amount": [10.5],
+            }
+        )
+        return individuals, organizations, transactions
+
+    def clean_state(self):
+        if self.fail:
+            raise ValueError("bad raw data")
+        data = self.preprocess(self.raw_filepaths())
+        return self.create_tables(self.standardize(self.clean(data)))
+
+
+class FakePartitionedTransformer(FakeTransformer, PartitionedTransformer):
+    """FakeTransformer whose raw files are each a partition"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cleaned_partitions = []
+
+    def raw_partitions(self):
+        return {filepath.stem: [filepath] for filepath in self.raw_filepaths()}
+
+    def clean_partition(self, filepaths):
+        self.cleaned_partitions.append(filepaths[0].stem)
+        data = self.preprocess(filepaths)
+        return self.create_tables(self.standardize(self.clean(data)))
+
+
+@pytest.fixture
+def fake_transformer():
+    """The FakeTransformer class"""
+    return FakeTransformer
+
+
+@pytest.fixture
+def fake_partitioned_transformer():
+    """The FakePartitionedTransformer class"""
+    return FakePartitionedTransformer
@@ -0,0 +1,149 @@
+"""Tests for transform/arizona.py"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.transform.arizona import (
+    az_donor_recipient_director,
+    az_employment_checker,
+    az_individual_name_checker,
+    az_name_clean,
+    az_transactor_sorter,
+)
+from utils.transform.utils import convert_date, convert_dates
+
+
+def test_employer_is_taken_from_first_transaction():
+    entities = pd.DataFrame(
+        {
+            "retrieved_id": [2, 1, 3],
+            "entity_type": ["Individual", "Individual", "Candidate"],
+        },
+        index=[10, 11, 12],
+    )
+    transactions = pd.DataFrame(
+        {
+            "retrieved_id": [1, 2, 1, 3],
+            "TransactionEmployer": ["Acme", None, "Other", "Ignored"],
+        }
+    )
+
+    companies = az_employment_checker(entities, transactions)["company"]
+
+    assert companies.index.tolist() == [10, 11, 12]
+    assert companies.tolist()[1:] == ["Acme", "None (Is a Candidate)"]
+    assert pd.isna(companies[10])
+
+
+def row_name_clean(df):
+    """Row by row az_name_clean of the original implementation"""
+    df_working = df.copy()
+    df_working["candidate"] = df.apply(
+        lambda row: (
+            row["committee_name"] if row["candidate"] == "" else row["candidate"]
+        ),
+        axis=1,
+    )
+    return df_working
+
+
+def row_transactor_sorter(row):
+    """Row by row az_transactor_sorter of the original implementation"""
+    if row["entity_type"] in ["Vendor", "Individual"]:
+        row["base_transactor_id"] = row["TransactionNameGroupId"]
+        row["other_transactor_id"] = row["CommitteeId"]
+    else:
+        row["base_transactor_id"] = row["CommitteeId"]
+        row["other_transactor_id"] = row["TransactionNameGroupId"]
+    return row
+
+
+def row_donor_recipient_director(row):
+    """Row by row az_donor_recipient_director of the original implementation"""
+    if row["TransactionTypeDispositionId"] == 2:  # noqa: PLR2004
+        row["donor_id"], row["recipient_id"] = row["recipient_id"], row["donor_id"]
+    return row
+
+
+def row_individual_name_checker(row):
+    """Row by row az_individual_name_checker of the original implementation"""
+    if row["entity_type"] == "Candidate":
+        row["full_name"] = row["candidate"]
+    else:
+        row["full_name"] = row["retrieved_name"]
+    return row
+
+
+@pytest.fixture
+def raw_transactions():
+    rng = np.random.default_rng(0)
+    row_count = 500
+    return pd.DataFrame(
+        {
+            "entity_type": rng.choice(["Vendor", "Individual", "Committee"], row_count),
+            "TransactionNameGroupId": rng.integers(1, 100, row_count),
+            "CommitteeId": rng.integers(100, 200, row_count),
+            "TransactionTypeDispositionId": rng.choice([1, 2, 3], row_count),
+            "Amount": rng.uniform(-500, 500, row_count),
+            "Memo": rng.choice(["dinner", None], row_count),
+        }
+    )
+
+
+@pytest.fixture
+def raw_details():
+    rng = np.random.default_rng(1)
+    row_count = 500
+    return pd.DataFrame(
+        {
+            "entity_type": rng.choice(["Candidate", "Individual"], row_count),
+            "candidate": rng.choice(["", "Jane Doe", None], row_count),
+            "committee_name": rng.choice(["Friends of Jane", "Doe PAC"], row_count),
+            "retrieved_name": rng.choice(["John Roe", "Ann Poe"], row_count),
+        }
+    )
+
+
+def test_transactor_sorter_matches_row_version(raw_transactions):
+    pd.testing.assert_frame_equal(
+        az_transactor_sorter(raw_transactions),
+        raw_transactions.apply(row_transactor_sorter, axis=1),
+    )
+
+
+def test_donor_recipient_director_matches_row_version(raw_transactions):
+    # as in az_transactions_convert, donor ids are strings and recipient ids ints
+    transactions = raw_transactions.assign(
+        donor_id=raw_transactions["TransactionNameGroupId"].astype(str),
+        recipient_id=raw_transactions["CommitteeId"],
+    )
+
+    pd.testing.assert_frame_equal(
+        az_donor_recipient_director(transactions),
+        transactions.apply(row_donor_recipient_director, axis=1),
+    )
+
+
+def test_name_functions_match_row_versions(raw_details):
+    pd.testing.assert_frame_equal(
+        az_name_clean(raw_details), row_name_clean(raw_details)
+    )
+    pd.testing.assert_frame_equal(
+        az_individual_name_checker(raw_details),
+        raw_details.apply(row_individual_name_checker, axis=1),
+    )
+
+
+def test_convert_dates_matches_scalar_version_and_rejects_invalid():
+    valid_dates = pd.Series(["/Date(1262304000000)/", "/Date(1699999999123)/"])
+    invalid_dates = pd.Series(
+        ["2020-01-01", None, 5, "/Date(99999999999999999)/", "x/Date(1)/"]
+    )
+
+    converted = convert_dates(pd.concat([valid_dates, invalid_dates]))
+
+    assert converted[:2].tolist() == valid_dates.apply(convert_date).tolist()
+    assert converted[2:].isna().all()
+    assert convert_dates(pd.Series(["/Date(-86400000-0700)/"]))[0] == pd.Timestamp(
+        "1969-12-31"
+    )
@@ -0,0 +1,80 @@
+"""Tests for the id service of transform/clean.py"""
+
+import uuid
+from collections import Counter
+
+import pandas as pd
+import pytest
+from utils.transform.utils import (
+    ID_NAMESPACE,
+    KEY_SEPARATOR,
+    stable_uuid_arrow,
+    stable_uuids,
+    uuid5_arrow,
+    uuid5_strings,
+)
+
+
+def test_stable_ids_are_uuid5(fake_transformer):
+    ids = fake_transformer().stable_ids("entity", pd.Series(["a", "b", "a"]))
+
+    expected = str(
+        uuid.uuid5(ID_NAMESPACE, KEY_SEPARATOR.join(["Fake", "entity", "a"]))
+    )
+    assert ids[0] == ids[2] == expected
+    assert ids[1] != ids[0]
+
+
+@pytest.mark.parametrize(
+    ("stable_id_across_years", "same_id"), [(True, True), (False, False)]
+)
+def test_entity_ids_by_year(fake_transformer, stable_id_across_years, same_id):
+    ids = fake_transformer(stable_id_across_years=stable_id_across_years).entity_ids(
+        pd.Series(["7", "7"]), pd.Series(["x", "y"]), years=pd.Series([2020, 2021])
+    )
+
+    assert (ids[0] == ids[1]) == same_id
+
+
+def test_entity_ids_without_provided_id(fake_transformer):
+    ids = fake_transformer().entity_ids(
+        pd.Series([None, None, None, None]),
+        pd.Series(["Jane  Doe", "JANE DOE ", None, None]),
+        fallback_keys=pd.Series(["t1", "t2", "t3", "t4"]),
+    )
+
+    # both unnamed rows get their own id
+    assert ids[0] == ids[1]
+    assert len({ids[0], ids[2], ids[3]}) == len(ids) - 1
+
+
+def test_transaction_ids_tell_identical_rows_apart(fake_transformer):
+    transformer = fake_transformer()
+    transactions = pd.DataFrame({"amount": [5.0, 5.0, 7.0], "year": [2020] * 3})
+
+    ids = transformer.transaction_ids(transactions)
+    occurrence_counts = Counter()
+    chunked_ids = [
+        *transformer.transaction_ids(transactions.iloc[:1], occurrence_counts),
+        *transformer.transaction_ids(transactions.iloc[1:], occurrence_counts),
+    ]
+
+    assert len(set(ids)) == len(transactions)
+    assert list(ids) == list(transformer.transaction_ids(transactions))
+    assert chunked_ids == list(ids)
+
+
+def test_arrow_ids_match_object_ids():
+    values = pd.Series(["b", None, "a", "b"], index=[3, 2, 1, 0])
+
+    ids = stable_uuid_arrow("Fake", "entity", values)
+    keys = [b"k1", b"k2"]
+
+    assert ids.dtype == "string[pyarrow]"
+    assert ids.index.equals(values.index)
+    assert ids.isna().tolist() == [False, True, False, False]
+    expected = stable_uuids("Fake", "entity", values.fillna("b"))
+    assert ids.fillna(ids.iloc[0]).tolist() == expected.tolist()
+    assert uuid5_arrow("Fake", "transaction", keys).tolist() == (
+        uuid5_strings("Fake", "transaction", keys).tolist()
+    )
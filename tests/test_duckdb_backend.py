@@ -0,0 +1,252 @@
+"""Tests for transform/duckdb_backend.py"""
+
+import pandas as pd
+import pytest
+from utils.transform import constants as const
+from utils.transform import michigan, pennsylvania
+from utils.transform.duckdb_backend import connect, transform_state_to_parquet
+from utils.transform.michigan import MichiganTransformer
+from utils.transform.pennsylvania import PennsylvaniaTransformer
+from utils.transform.schema import enforce_schema
+from utils.transform.storage import TABLE_NAMES, read_table
+from utils.transform.utils import stable_uuids
+
+
+def comparable(table, drop=()):
+    """Sorts a table's rows and columns, with missing values as None"""
+    table = enforce_schema(table).drop(columns=list(drop), errors="ignore")
+    table = table[sorted(table.columns)].astype(object)
+    table = table.where(table.notna(), None).astype(str)
+    return table.sort_values(list(table.columns)).reset_index(drop=True)
+
+
+def assert_same_tables(pandas_tables, dataset_directories, drop=()):
+    for table_name, pandas_table in zip(TABLE_NAMES, pandas_tables):
+        duckdb_table = read_table(dataset_directories[table_name])
+        pd.testing.assert_frame_equal(
+            comparable(duckdb_table, drop), comparable(pandas_table, drop)
+        )
+
+
+def sorted_rows(frame):
+    """A frame's rows in a fixed order"""
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def test_uuid5_matches_stable_ids(tmp_path):
+    keys = pd.Series(["Jane Doe", "", "Müller, José", None], dtype=object)
+    connection = connect(tmp_path)
+    connection.register("keys", pd.DataFrame({"key": keys}))
+
+    ids = connection.sql(
+        "SELECT uuid5('Michigan', 'full_name', key) FROM keys"
+    ).fetchall()
+
+    expected = stable_uuids("Michigan", "full_name", keys[:3]).tolist()
+    assert [row[0] for row in ids] == [*expected, None]
+
+
+def write_lines(path, lines, encoding):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(("\n".join(lines) + "\n").encode(encoding))
+
+
+def mi_line(columns, values):
+    return "\t".join(str(values.get(column, "")) for column in columns)
+
+
+def menominee_line(values):
+    # the raw Menominee County rows have their values one column off
+    shifted_values = {
+        raw_column: values.get(column, "")
+        for column, raw_column in zip(
+            const.MICHIGAN_CONTRIBUTION_COLS_RENAME,
+            const.MICHIGAN_CONTRIBUTION_COLS_REORDER,
+        )
+    }
+    return mi_line(const.MI_CONTRIBUTION_COLUMNS, shifted_values)
+
+
+def test_michigan_tables_match_pandas(tmp_path, monkeypatch):
+    monkeypatch.setattr(michigan, "BASE_FILEPATH", tmp_path)
+    committee = {
+        "com_legal_name": "FRIENDS OF ANN ARBOR",
+        "cfr_com_id": 1,
+        "com_type": "CAN",
+        "can_first_name": "ANN",
+        "can_last_name": "ARBOR",
+    }
+    contributions = [
+        {
+            **committee,
+            "doc_stmnt_year": 2020,
+            "contribtype": "DIRECT",
+            "f_name": "JOSÉ",
+            "l_name_or_org": "SMITH",
+            "state": "MI",
+            "employer": "ACME",
+            "amount": "25.50",
+        },
+        {
+            **committee,
+            "doc_stmnt_year": 2020,
+            "contribtype": "DIRECT",
+            "l_name_or_org": "ACME INC",
+            "state": "OH",
+            "amount": "100",
+        },
+    ]
+    menominee_contribution = {
+        "doc_stmnt_year": 2020,
+        "com_legal_name": "MENOMINEE DEMOCRATS",
+        "common_name": "MENOMINEE COUNTY DEMOCRATIC PARTY",
+        "contribtype": "DIRECT",
+        "f_name": "JOE",
+        "l_name_or_org": "DOE",
+        "state": "MI",
+        "employer": "SELF",
+        "extra_desc": "10",
+    }
+    columns = const.MI_CONTRIBUTION_COLUMNS
+    write_lines(
+        tmp_path / "Contribution" / "2020_mi_cfr_contributions.txt",
+        [mi_line(columns, row) for row in contributions]
+        + [menominee_line(menominee_contribution), mi_line(columns, {}) + "\textra"],
+        "mac_roman",
+    )
+    header_columns = ["unused", *reversed(columns)]
+    write_lines(
+        tmp_path / "Contribution" / "2021_mi_cfr_contributions_00.txt",
+        ["\t".join(header_columns)]
+        + [
+            mi_line(header_columns, {**row, "doc_stmnt_year": 2021})
+            for row in contributions
+        ],
+        "mac_roman",
+    )
+    expenditures = [
+        {
+            **committee,
+            "doc_stmnt_year": 2020,
+            "purpose": "ADS",
+            "lname_or_org": "PRINT SHOP",
+            "vend_name": "PRINT SHOP LLC",
+            "state": "MI",
+            "amount": "50",
+        },
+        {
+            **committee,
+            "doc_stmnt_year": 2020,
+            "purpose": "CANVASSING",
+            "f_name": "BOB",
+            "lname_or_org": "JONES",
+            "amount": "20",
+        },
+        {**committee, "com_type": "MENOMINEE COUNTY DEMOCRATIC PARTY"},
+    ]
+    write_lines(
+        tmp_path / "Expenditure" / "2020_mi_cfr_expenditures.txt",
+        ["\t".join(const.MI_EXPENDITURE_COLUMNS)]
+        + [mi_line(const.MI_EXPENDITURE_COLUMNS, row) for row in expenditures],
+        "mac_roman",
+    )
+    filepaths = sorted(tmp_path.glob("*/*.txt"))
+    transformer = MichiganTransformer()
+
+    pandas_tables = transformer.clean_partition(filepaths)
+    pandas_id_mapping = pd.read_csv(transformer.id_mapping_path)
+    transformer.id_mapping_path.unlink()
+    dataset_directories = transform_state_to_parquet(
+        transformer, tmp_path / "output", filepaths=filepaths
+    )
+
+    assert_same_tables(pandas_tables, dataset_directories)
+    # the DuckDB id map has every entity row, but no transaction rows
+    duckdb_id_mapping = pd.read_csv(transformer.id_mapping_path)
+    entity_id_mapping = pandas_id_mapping[
+        pandas_id_mapping["entity_type"] != "Transaction"
+    ]
+    assert not entity_id_mapping.empty
+    pd.testing.assert_frame_equal(
+        sorted_rows(duckdb_id_mapping),
+        sorted_rows(entity_id_mapping),
+        check_dtype=False,
+    )
+    individuals = read_table(dataset_directories["individuals"])
+    assert "JOSÉ SMITH" in individuals["full_name"].tolist()
+
+
+def test_pennsylvania_tables_match_pandas(tmp_path, monkeypatch):
+    monkeypatch.setattr(pennsylvania, "BASE_FILEPATH", tmp_path)
+
+    def pa_line(columns, values):
+        return ",".join(f'"{values.get(column, "")}"' for column in columns)
+
+    filers = [
+        {"RECIPIENT_ID": "F1", "RECIPIENT_TYPE": 1, "RECIPIENT": "jane doe"},
+        {"RECIPIENT_ID": "F1", "RECIPIENT_TYPE": 2, "RECIPIENT": "not first"},
+        {"RECIPIENT_ID": "F2", "RECIPIENT_TYPE": 2, "RECIPIENT": "friends of bob"},
+        {"RECIPIENT_ID": "F3", "RECIPIENT": "citizens for parks"},
+        {"RECIPIENT_ID": "F4", "RECIPIENT": "sam lee"},
+    ]
+    for filer in filers:
+        filer.update({"RECIPIENT_OFFICE": "STH", "RECIPIENT_PARTY": "DEM"})
+    contribution = {"RECIPIENT_ID": "F1", "DONOR": "JOHN SMITH", "CONT_AMT_1": 10}
+    contributions = [
+        contribution,
+        contribution,
+        {**contribution, "DONOR": "MÜLLER  GMBH PAC", "CONT_AMT_2": 5},
+        {"RECIPIENT_ID": "F2", "DONOR": "ACME PAC", "CONT_AMT_1": 20},
+        {"RECIPIENT_ID": "F9", "DONOR": "", "CONT_AMT_1": 30},
+    ]
+    for row in contributions:
+        row.setdefault("CONT_AMT_2", 0)
+        row.setdefault("CONT_AMT_3", 0)
+    expenses = [
+        {"DONOR_ID": "F3", "RECIPIENT": "print co", "AMOUNT": 40, "PURPOSE": "ads"},
+        {"DONOR_ID": "F4", "RECIPIENT": "STAPLES", "AMOUNT": 15},
+        {"DONOR_ID": "F1", "RECIPIENT": "staples", "AMOUNT": 15},
+        {"DONOR_ID": "F8", "RECIPIENT": "nobody", "AMOUNT": 5},
+    ]
+    year_directory = tmp_path / "PA" / "2020"
+    for file_name, columns, rows in [
+        ("filer_2020.txt", const.PA_FILER_COLS_NAMES_PRE2022, filers),
+        ("contrib_2020.txt", const.PA_CONT_COLS_NAMES_PRE2022, contributions),
+        ("expense_2020.txt", const.PA_EXPENSE_COLS_NAMES_PRE2022, expenses),
+    ]:
+        lines = [pa_line(columns, row) for row in rows]
+        # a line with too many fields is skipped, one with too few is padded
+        short_line = lines[-1].rsplit(",", 2)[0]
+        write_lines(
+            year_directory / file_name,
+            [*lines, lines[0] + ",x", short_line],
+            "latin-1",
+        )
+    transformer = PennsylvaniaTransformer()
+    filepaths = transformer.raw_partitions(tmp_path / "PA")["2020"]
+
+    pandas_tables = transformer.clean_partition(filepaths)
+    pandas_id_lookup = transformer.read_id_lookup()
+    transformer.id_lookup_path.unlink()
+    dataset_directories = transform_state_to_parquet(
+        transformer, tmp_path / "output", filepaths=filepaths
+    )
+
+    assert_same_tables(pandas_tables, dataset_directories)
+    assert not pandas_id_lookup.empty
+    pd.testing.assert_frame_equal(
+        sorted_rows(transformer.read_id_lookup()), sorted_rows(pandas_id_lookup)
+    )
+    transaction_ids = read_table(dataset_directories["transactions"])["transaction_id"]
+    # identical contributions are told apart, the same way by both backends
+    assert transaction_ids.notna().all()
+    assert transaction_ids.is_unique
+    assert sorted(transaction_ids) == sorted(pandas_tables[2]["transaction_id"])
+
+
+def test_transform_state_to_parquet_rejects_other_states(tmp_path):
+    transformer = MichiganTransformer()
+    transformer.name = "Arizona"
+
+    with pytest.raises(ValueError, match="Arizona"):
+        transform_state_to_parquet(transformer, tmp_path, filepaths=[])
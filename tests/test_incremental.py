@@ -0,0 +1,211 @@
+"""Tests for transform/incremental.py"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.transform import constants as const
+from utils.transform import michigan, pennsylvania
+from utils.transform.incremental import clean_state_incrementally
+from utils.transform.michigan import MichiganTransformer
+from utils.transform.pennsylvania import PennsylvaniaTransformer
+
+
+@pytest.fixture
+def raw_directory(tmp_path):
+    raw_directory = tmp_path / "raw"
+    raw_directory.mkdir()
+    for year in [2020, 2021]:
+        pd.DataFrame({"year": [year, year], "amount": [1.0, 2.0]}).to_csv(
+            raw_directory / f"{year}.csv", index=False
+        )
+    return raw_directory
+
+
+def test_unchanged_partitions_are_reused(
+    fake_partitioned_transformer, raw_directory, tmp_path
+):
+    state_cleaner = fake_partitioned_transformer(raw_directory=raw_directory)
+    first_run = clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    pd.DataFrame({"year": [2021], "amount": [5.0]}).to_csv(
+        raw_directory / "2021.csv", index=False
+    )
+    state_cleaner.cleaned_partitions = []
+    _, _, transactions = clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    assert first_run[0] is None
+    assert state_cleaner.cleaned_partitions == ["2021"]
+    assert transactions["amount"].tolist() == [1.0, 2.0, 5.0]
+
+
+def test_touched_but_identical_file_is_reused(
+    fake_partitioned_transformer, raw_directory, tmp_path
+):
+    state_cleaner = fake_partitioned_transformer(raw_directory=raw_directory)
+    clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    contents = (raw_directory / "2020.csv").read_text()
+    (raw_directory / "2020.csv").write_text(contents)
+    state_cleaner.cleaned_partitions = []
+    clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    assert state_cleaner.cleaned_partitions == []
+
+
+def test_removed_partition_is_dropped(
+    fake_partitioned_transformer, raw_directory, tmp_path
+):
+    state_cleaner = fake_partitioned_transformer(raw_directory=raw_directory)
+    clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    (raw_directory / "2020.csv").unlink()
+    _, _, transactions = clean_state_incrementally(state_cleaner, tmp_path / "cache")
+
+    assert transactions["year"].unique().tolist() == [2021]
+    assert not (tmp_path / "cache" / "Fake" / "2020").exists()
+
+
+def sorted_frame(table):
+    table = table.astype(object).fillna(np.nan)
+    return table.sort_values(list(table.columns)).reset_index(drop=True)
+
+
+def assert_same_tables(incremental_tables, full_tables):
+    for incremental_table, full_table in zip(incremental_tables, full_tables):
+        assert len(incremental_table) == len(full_table) > 0
+        pd.testing.assert_frame_equal(
+            sorted_frame(incremental_table), sorted_frame(full_table)
+        )
+
+
+def write_pa_year(directory, year):
+    directory.mkdir(parents=True)
+    filers = pd.DataFrame(
+        {column: "" for column in const.PA_FILER_COLS_NAMES_PRE2022}, index=range(3)
+    )
+    filers["RECIPIENT_ID"] = ["1001", "1002", "1003"]
+    filers["YEAR"] = year
+    filers["RECIPIENT_TYPE"] = ["1", "2", ""]
+    filers["RECIPIENT"] = ["Jane Smith", "Friends Of Bob", "Acme Pac"]
+    filers["RECIPIENT_OFFICE"] = ["GOV", "STH", ""]
+    filers.to_csv(directory / f"filer_{year}.txt", header=False, index=False)
+    contributions = pd.DataFrame(
+        {column: "" for column in const.PA_CONT_COLS_NAMES_PRE2022}, index=range(6)
+    )
+    contributions["RECIPIENT_ID"] = ["1001", "1002", "1003"] * 2
+    contributions["YEAR"] = year
+    # the same donors give in every year
+    contributions["DONOR"] = ["John Doe", "Acme Llc", "Mary Roe"] * 2
+    contributions["CONT_AMT_1"] = [10.0 * (i + year % 10) for i in range(6)]
+    contributions.to_csv(directory / f"contrib_{year}.txt", header=False, index=False)
+    expenses = pd.DataFrame(
+        {column: "" for column in const.PA_EXPENSE_COLS_NAMES_PRE2022}, index=range(2)
+    )
+    expenses["DONOR_ID"] = ["1001", "1003"]
+    expenses["YEAR"] = year
+    expenses["RECIPIENT"] = ["Print Shop", "Jane Smith"]
+    expenses["AMOUNT"] = [50.0, 75.0]
+    expenses.to_csv(directory / f"expense_{year}.txt", header=False, index=False)
+
+
+def test_pennsylvania_incremental_tables_match_clean_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(pennsylvania, "BASE_FILEPATH", tmp_path)
+    for year in [2020, 2021]:
+        write_pa_year(tmp_path / "data" / "raw" / "PA" / str(year), year)
+
+    full_tables = PennsylvaniaTransformer().clean_state()
+    incremental_tables = clean_state_incrementally(
+        PennsylvaniaTransformer(), tmp_path / "cache"
+    )
+
+    assert_same_tables(incremental_tables, full_tables)
+
+
+def test_pennsylvania_id_lookup_is_read_and_written_once_per_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(pennsylvania, "BASE_FILEPATH", tmp_path)
+    for year in [2020, 2021]:
+        write_pa_year(tmp_path / "data" / "raw" / "PA" / str(year), year)
+    transformer = PennsylvaniaTransformer()
+    calls = []
+
+    def record_calls(method):
+        def recorded(*args):
+            calls.append(method.__name__)
+            return method(*args)
+
+        return recorded
+
+    for method_name in ["read_id_lookup", "write_id_lookup"]:
+        monkeypatch.setattr(
+            transformer, method_name, record_calls(getattr(transformer, method_name))
+        )
+
+    clean_state_incrementally(transformer, tmp_path / "cache")
+
+    assert calls == ["read_id_lookup", "write_id_lookup"]
+    id_lookup = pd.read_parquet(transformer.id_lookup_path)
+    assert id_lookup["year"].unique().tolist() == [2020, 2021]
+    assert not id_lookup.duplicated(["raw_id", "year"]).any()
+    assert not transformer.id_lookup_path.with_suffix(".parquet.tmp").exists()
+
+
+def write_mi_files(directory, rows_by_file, columns):
+    directory.mkdir()
+    for file_name, rows in rows_by_file.items():
+        lines = ["\t".join(columns)]
+        lines += ["\t".join(row.get(column, "") for column in columns) for row in rows]
+        (directory / file_name).write_text(
+            "\n".join(lines) + "\n", encoding="mac_roman"
+        )
+
+
+def test_michigan_incremental_tables_match_clean_state(tmp_path, monkeypatch):
+    committees = [
+        {"com_legal_name": f"FRIENDS OF {name}", "cfr_com_id": str(i)}
+        for i, name in enumerate(["ANN", "BOB"], start=1)
+    ]
+    contributions = {
+        # only contribution files numbered 00 have a header row
+        f"{year}_mi_cfr_contributions_00.txt": [
+            {
+                **committees[i % 2],
+                "doc_stmnt_year": str(year),
+                # the same donors give in every year
+                "f_name": "" if i % 3 == 0 else "JOE",
+                "l_name_or_org": "ACME INC" if i % 3 == 0 else "DOE",
+                "amount": str(year % 100 + i),
+            }
+            for i in range(4)
+        ]
+        for year in [2020, 2021]
+    }
+    expenditures = {
+        "2020_mi_cfr_expenditures.txt": [
+            {**committee, "doc_stmnt_year": "2020", "vend_name": "PRINT SHOP"}
+            for committee in committees
+        ]
+    }
+    write_mi_files(
+        tmp_path / "Contribution", contributions, const.MI_CONTRIBUTION_COLUMNS
+    )
+    write_mi_files(tmp_path / "Expenditure", expenditures, const.MI_EXPENDITURE_COLUMNS)
+    monkeypatch.setattr(michigan, "MI_CON_FILEPATH", tmp_path / "Contribution")
+    monkeypatch.setattr(michigan, "MI_EXP_FILEPATH", tmp_path / "Expenditure")
+    monkeypatch.setattr(michigan, "BASE_FILEPATH", tmp_path)
+    id_mapping_path = MichiganTransformer().id_mapping_path
+
+    full_tables = MichiganTransformer().clean_state()
+    full_id_mapping = pd.read_csv(id_mapping_path)
+    incremental_tables = clean_state_incrementally(
+        MichiganTransformer(), tmp_path / "cache"
+    )
+    incremental_id_mapping = pd.read_csv(id_mapping_path)
+    # every partition is reused, and still part of the id mapping
+    id_mapping_path.unlink()
+    clean_state_incrementally(MichiganTransformer(), tmp_path / "cache")
+    reused_id_mapping = pd.read_csv(id_mapping_path)
+
+    assert_same_tables(incremental_tables, full_tables)
+    assert full_id_mapping["year"].unique().tolist() == [2020, 2021]
+    assert_same_tables([incremental_id_mapping], [full_id_mapping])
+    assert_same_tables([reused_id_mapping], [full_id_mapping])
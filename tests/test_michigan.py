@@ -0,0 +1,229 @@
+"""Tests for transform/michigan.py"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.transform import constants as const
+from utils.transform import michigan
+from utils.transform.michigan import (
+    MichiganTransformer,
+    read_contribution_data,
+    read_expenditure_data,
+)
+from utils.transform.pipeline import stream_state_to_parquet
+from utils.transform.storage import (
+    TABLE_NAMES,
+    read_parquet_parts,
+    read_table,
+    to_arrow_table,
+    write_state_tables,
+)
+
+
+def write_mi_file(path, rows, columns, header):
+    lines = ["\t".join(columns)] if header else []
+    lines += ["\t".join(row.get(column, "") for column in columns) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="mac_roman")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunksize", [None, 1])
+def test_read_contribution_data_fixes_menominee_rows(tmp_path, chunksize):
+    menominee_row = {
+        "com_legal_name": "MENOMINEE DEMOCRATS",
+        "common_name": "MENOMINEE COUNTY DEMOCRATIC PARTY",
+        "f_name": "JOE",
+        "l_name_or_org": "DOE",
+        "employer": "SELF",
+        "amount": "10",
+    }
+    # the raw Menominee County rows have their values one column off
+    shifted_row = {
+        raw_column: menominee_row.get(column, "")
+        for column, raw_column in zip(
+            const.MICHIGAN_CONTRIBUTION_COLS_RENAME,
+            const.MICHIGAN_CONTRIBUTION_COLS_REORDER,
+        )
+    }
+    rows = [{"l_name_or_org": "ACME INC", "amount": "25", "com_type": "CAN"}]
+    filepath = write_mi_file(
+        tmp_path / "2020_mi_cfr_contributions.txt",
+        [*rows, shifted_row],
+        const.MI_CONTRIBUTION_COLUMNS,
+        header=False,
+    )
+
+    contributions = read_contribution_data(
+        filepath, const.MI_CONTRIBUTION_COLUMNS, chunksize
+    )
+    if chunksize is not None:
+        contributions = pd.concat(contributions, ignore_index=True)
+
+    assert contributions["l_name_or_org"].tolist() == ["ACME INC", "DOE"]
+    assert contributions["com_legal_name"].tolist()[1] == "MENOMINEE DEMOCRATS"
+    assert contributions["employer"].tolist()[1] == "SELF"
+    assert float(contributions["amount"].tolist()[1]) == 10  # noqa: PLR2004
+    assert contributions["com_type"].isna().tolist() == [False, True]
+
+
+def test_read_expenditure_data_drops_menominee_rows(tmp_path):
+    rows = [
+        {"com_legal_name": "FRIENDS OF ANN", "amount": "50"},
+        {"com_type": "MENOMINEE COUNTY DEMOCRATIC PARTY"},
+    ]
+    filepath = write_mi_file(
+        tmp_path / "2020_mi_cfr_expenditures.txt",
+        rows,
+        const.MI_EXPENDITURE_COLUMNS,
+        header=True,
+    )
+
+    expenditures = read_expenditure_data(filepath, const.MI_EXPENDITURE_COLUMNS)
+
+    assert expenditures["com_legal_name"].tolist() == ["FRIENDS OF ANN"]
+
+
+def test_create_tables_routes_each_row(tmp_path):
+    committee = {"com_legal_name": "FRIENDS OF ANN", "cfr_com_id": "1"}
+    candidate = {"can_first_name": "ANN", "can_last_name": "LEE"}
+    contributions = write_mi_file(
+        tmp_path / "2020_mi_cfr_contributions_00.txt",
+        [
+            {**committee, **candidate, "f_name": "JOE", "l_name_or_org": "DOE"},
+            {**committee, **candidate, "l_name_or_org": "ACME INC"},
+        ],
+        const.MI_CONTRIBUTION_COLUMNS,
+        header=True,
+    )
+    expenditures = write_mi_file(
+        tmp_path / "2020_mi_cfr_expenditures.txt",
+        [{**committee, "vend_name": "PRINT SHOP", "amount": "50"}],
+        const.MI_EXPENDITURE_COLUMNS,
+        header=True,
+    )
+    id_mappings = []
+    transformer = MichiganTransformer()
+    transformer.output_id_mapping = id_mappings.extend
+
+    standardized = transformer.standardize(
+        transformer.clean(transformer.preprocess([[expenditures], [contributions]]))
+    )
+    individuals, organizations, transactions = transformer.create_tables(standardized)
+
+    assert individuals["entity_type"].tolist() == [
+        "Individual",
+        "Candidate",
+        "Candidate",
+    ]
+    names = organizations.groupby("entity_type")["name"].agg(set)
+    assert names["committee"] == {"FRIENDS OF ANN"}
+    assert names["vendor"] == {"PRINT SHOP"}
+    vendor_id = organizations.loc[organizations["name"] == "PRINT SHOP", "id"].iloc[0]
+    assert (transactions["recipient_id"] == vendor_id).sum() == 1
+    (id_mapping,) = id_mappings
+    assert id_mapping["entity_type"].value_counts().to_dict() == {
+        "Individual": len(individuals),
+        "Organization": len(organizations),
+        "Transaction": len(transactions),
+    }
+
+
+def write_mi_dataset(directory):
+    contribution_directory = directory / "Contribution"
+    expenditure_directory = directory / "Expenditure"
+    contribution_directory.mkdir()
+    expenditure_directory.mkdir()
+    committees = [
+        {"com_legal_name": f"FRIENDS OF {name}", "cfr_com_id": str(i)}
+        for i, name in enumerate(["ANN", "BOB", "CAL"], start=1)
+    ]
+    candidate = {"can_first_name": "ANN", "can_last_name": "LEE"}
+    contributions = [
+        {
+            **committees[i % 3],
+            **(candidate if i % 3 == 0 else {}),
+            "doc_stmnt_year": str(2019 + i % 2),
+            "f_name": "" if i % 4 == 0 else f"JOE{i % 5}",
+            "l_name_or_org": "ACME INC" if i % 4 == 0 else "DOE",
+            "employer": "SELF",
+            "amount": str(10 + i),
+        }
+        for i in range(12)
+    ]
+    expenditures = [
+        {
+            **committees[i % 3],
+            "doc_stmnt_year": "2020",
+            "vend_name": f"PRINT SHOP {i % 2}",
+            "amount": str(50 + i),
+        }
+        for i in range(5)
+    ]
+    write_mi_file(
+        contribution_directory / "2020_mi_cfr_contributions_00.txt",
+        contributions,
+        const.MI_CONTRIBUTION_COLUMNS,
+        header=True,
+    )
+    write_mi_file(
+        expenditure_directory / "2020_mi_cfr_expenditures.txt",
+        expenditures,
+        const.MI_EXPENDITURE_COLUMNS,
+        header=True,
+    )
+    return contribution_directory, expenditure_directory
+
+
+def test_stream_state_matches_clean_state(tmp_path, monkeypatch):
+    contribution_directory, expenditure_directory = write_mi_dataset(tmp_path)
+    monkeypatch.setattr(michigan, "MI_CON_FILEPATH", contribution_directory)
+    monkeypatch.setattr(michigan, "MI_EXP_FILEPATH", expenditure_directory)
+    transformer = MichiganTransformer()
+    transformer.output_id_mapping = lambda *id_mapping: None
+
+    tables = transformer.clean_state()
+    table_directories = transformer.stream_state(tmp_path / "streamed", chunksize=5)
+
+    for table_name, table in zip(TABLE_NAMES, tables):
+        streamed = read_parquet_parts(table_directories[table_name])
+        table = to_arrow_table(table).to_pandas()
+        assert len(streamed) == len(table) > 0
+        pd.testing.assert_frame_equal(
+            streamed.astype(object)
+            .fillna(np.nan)
+            .sort_values(list(streamed.columns))
+            .reset_index(drop=True),
+            table.astype(object)
+            .fillna(np.nan)
+            .sort_values(list(table.columns))
+            .reset_index(drop=True),
+        )
+
+
+def test_stream_state_to_parquet_matches_written_tables(tmp_path, monkeypatch):
+    contribution_directory, expenditure_directory = write_mi_dataset(tmp_path)
+    monkeypatch.setattr(michigan, "MI_CON_FILEPATH", contribution_directory)
+    monkeypatch.setattr(michigan, "MI_EXP_FILEPATH", expenditure_directory)
+    monkeypatch.setattr(michigan, "BASE_FILEPATH", tmp_path)
+    transformer = MichiganTransformer()
+
+    write_state_tables(transformer.clean_state(), "Michigan", tmp_path / "full")
+    full_id_mapping = pd.read_csv(transformer.id_mapping_path)
+    transformer.id_mapping_path.unlink()
+    stream_state_to_parquet(transformer, tmp_path / "streamed", chunksize=5)
+    streamed_id_mapping = pd.read_csv(transformer.id_mapping_path)
+
+    def sorted_frame(table):
+        table = table.astype(object).fillna(np.nan)
+        return table.sort_values(list(table.columns)).reset_index(drop=True)
+
+    for table_name in TABLE_NAMES:
+        full, streamed = (
+            sorted_frame(read_table(tmp_path / directory / table_name))
+            for directory in ["full", "streamed"]
+        )
+        pd.testing.assert_frame_equal(streamed, full)
+    assert len(full_id_mapping) > 0
+    pd.testing.assert_frame_equal(
+        sorted_frame(streamed_id_mapping), sorted_frame(full_id_mapping)
+    )
@@ -0,0 +1,88 @@
+"""Tests for transform/minnesota.py"""
+
+import pandas as pd
+from utils.transform.minnesota import MinnesotaTransformer
+
+
+def make_standardized_mn_data():
+    """MN rows as standardize passes them to assign_ids"""
+    return pd.DataFrame(
+        {
+            "recipient_id": ["100", "200", "None", "300"],
+            "recipient_type": ["Committee", "Individual", "Party", "Committee"],
+            "recipient_full_name": ["Friends Of Ann", "Ann Lee", "None", "Bob Cole"],
+            "recipient_first_name": ["None"] * 4,
+            "recipient_last_name": ["None"] * 4,
+            "donor_id": ["200", "None", "0", "None"],
+            "donor_type": ["Individual", "Individual", "Company", "Company"],
+            "donor_full_name": ["Ann Lee", "None", "None", "None"],
+            "donor_first_name": ["None"] * 4,
+            "donor_last_name": ["None"] * 4,
+            "amount": [10.0, 20.0, 20.0, 20.0],
+            "state": "MN",
+            "year": [2020, 2020, 2021, 2021],
+            "transaction_id": None,
+        }
+    )
+
+
+def test_provided_id_gets_one_uuid_as_donor_or_recipient():
+    transformer = MinnesotaTransformer()
+
+    data, _ = transformer.assign_ids(make_standardized_mn_data())
+
+    assert data.loc[0, "donor_id"] == data.loc[1, "recipient_id"]
+    assert (
+        data.loc[0, "donor_id"]
+        == transformer.stable_ids("entity", pd.Series(["200"]))[0]
+    )
+    assert data["transaction_id"].is_unique
+
+
+def test_entities_without_provided_id_get_distinct_uuids():
+    transformer = MinnesotaTransformer()
+
+    data, _ = transformer.assign_ids(make_standardized_mn_data())
+
+    # neither a provided id nor a name, so keyed by the transaction
+    unnamed_ids = [
+        data.loc[1, "donor_id"],
+        data.loc[2, "recipient_id"],
+        data.loc[2, "donor_id"],
+        data.loc[3, "donor_id"],
+    ]
+    assert len(set(unnamed_ids)) == len(unnamed_ids)
+    fallback_keys = pd.Series(
+        [
+            data.loc[1, "transaction_id"] + ":donor",
+            data.loc[2, "transaction_id"] + ":recipient",
+        ]
+    )
+    assert (
+        unnamed_ids[:2]
+        == transformer.stable_ids("unnamed entity", fallback_keys).tolist()
+    )
+
+
+def test_id_mapping_maps_each_provided_id_to_its_uuid():
+    transformer = MinnesotaTransformer()
+
+    data, id_mapping = transformer.assign_ids(make_standardized_mn_data())
+
+    expected = pd.DataFrame(
+        {
+            "state": "MN",
+            "year": [2020, 2020, 2021],
+            "entity_type": ["Organization", "Individual", "Organization"],
+            "provided_id": ["100", "200", "300"],
+            "database_id": transformer.stable_ids(
+                "entity", pd.Series(["100", "200", "300"])
+            ),
+        }
+    )
+    pd.testing.assert_frame_equal(id_mapping, expected)
+    assert set(id_mapping["database_id"]) == {
+        data.loc[0, "recipient_id"],
+        data.loc[1, "recipient_id"],
+        data.loc[3, "recipient_id"],
+    }
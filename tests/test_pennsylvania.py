@@ -0,0 +1,154 @@
+"""Tests for transform/pennsylvania.py"""
+
+import pandas as pd
+from utils.transform import constants as const
+from utils.transform import pennsylvania
+from utils.transform.pennsylvania import PennsylvaniaTransformer, read_PA_file
+
+
+def test_classify_contributors_matches_classify_contributor():
+    transformer = PennsylvaniaTransformer()
+    names = pd.Series(
+        [
+            "Jane Doe",
+            "Friends Of Jane Doe",
+            "Acme Llc",
+            "Political Action",
+            "Jane Doe",
+            "Pa\tTeam",
+            "",
+            "Cohen",
+        ],
+        index=[5, 4, 3, 2, 1, 0, 9, 9],
+    )
+
+    classified = transformer.classify_contributors(names)
+
+    assert classified.index.equals(names.index)
+    assert classified.tolist() == names.apply(transformer.classify_contributor).tolist()
+    assert transformer.classify_contributors(pd.Series([None])).tolist() == [
+        "Individual"
+    ]
+
+
+def test_read_raw_files_reports_bad_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(pennsylvania, "BASE_FILEPATH", tmp_path)
+    column_count = len(const.PA_CONT_COLS_NAMES_PRE2022)
+    good_line = ",".join(
+        ["1", "2020", "", "", '"Doe, Jane"'] + [""] * (column_count - 5)
+    )
+    bad_line = good_line + ",extra field"
+    file_lines = {2020: [good_line, bad_line, good_line], 2021: [good_line]}
+    for year, lines in file_lines.items():
+        (tmp_path / str(year)).mkdir()
+        (tmp_path / str(year) / f"contrib_{year}.txt").write_text(
+            "\n".join(lines) + "\n"
+        )
+
+    transformer = PennsylvaniaTransformer()
+    filepaths = [
+        tmp_path / "2021" / "contrib_2021.txt",
+        tmp_path / "2020" / "contrib_2020.txt",
+    ]
+    contributor_datasets, _, _ = transformer.read_raw_files(filepaths, workers=2)
+
+    assert [len(dataset) for dataset in contributor_datasets] == [1, 2]
+    assert contributor_datasets[1]["YEAR"].tolist() == [2020, 2020]
+    assert contributor_datasets[1]["DONOR"].tolist() == ["Doe, Jane"] * 2
+    report = pd.read_csv(tmp_path / "output" / "bad_lines" / "PA" / "2020.csv")
+    assert report["text"].tolist() == [bad_line]
+    assert not (tmp_path / "output" / "bad_lines" / "PA" / "2021.csv").exists()
+
+
+def test_read_PA_file_pads_short_rows_like_pandas(tmp_path):
+    columns = const.PA_FILER_COLS_NAMES_PRE2022
+    full_line = ",".join(
+        ["1001", "2020", "1", '"Doe, Jane"'] + ["x"] * (len(columns) - 4)
+    )
+    short_line = ",".join(
+        ["1002", "2020", "2", "Acme Pac"] + ["y"] * (len(columns) - 6)
+    )
+    long_line = full_line + ",extra field"
+    file_path = tmp_path / "2020" / "filer_2020.txt"
+    file_path.parent.mkdir()
+    file_path.write_text("\n".join([full_line, short_line, long_line]) + "\n")
+
+    filers, bad_lines = read_PA_file(file_path, 2020)
+
+    expected = pd.read_csv(
+        file_path, names=columns, encoding="latin-1", on_bad_lines="skip"
+    )
+    assert len(filers) == 2  # noqa: PLR2004
+    pd.testing.assert_frame_equal(filers, expected)
+    assert filers[columns[-1]].isna().tolist() == [False, True]
+    assert bad_lines["text"].tolist() == [long_line]
+
+
+def test_make_transactions_tables_routes_each_row():
+    entity_types = ["Individual", "Candidate", "Committee", "Organization"]
+    transactions = pd.DataFrame(
+        {
+            "TRANSACTION_ID": ["a", "b", "c", "d", "e"],
+            "DONOR_TYPE": [*entity_types, None],
+            "RECIPIENT_TYPE": ["Lobbyist", "Committee", "Candidate", "Committee", None],
+            "DONOR_OFFICE": ["GOV", None, "SEN", None, None],
+            "RECIPIENT_OFFICE": [None, "LTG", None, None, None],
+        },
+        index=[4, 3, 2, 1, 0],
+    )
+
+    ind_to_ind, ind_to_org, org_to_ind, org_to_org = (
+        PennsylvaniaTransformer().make_transactions_tables(transactions)
+    )
+
+    assert ind_to_ind.index.tolist() == [4]
+    assert ind_to_org["transaction_id"].tolist() == ["b"]
+    assert org_to_ind["transaction_id"].tolist() == ["c"]
+    assert org_to_org["transaction_id"].tolist() == ["d"]
+    assert ind_to_ind["office_sought"].tolist() == ["GOV"]
+    assert ind_to_org["office_sought"].tolist() == ["LTG"]
+    assert "donor_office" not in org_to_org.columns
+
+
+def test_replace_id_with_uuid_keeps_order_and_persists_lookup(tmp_path, monkeypatch):
+    monkeypatch.setattr(pennsylvania, "BASE_FILEPATH", tmp_path)
+    transformer = PennsylvaniaTransformer()
+    rows = pd.DataFrame(
+        {
+            "DONOR_ID": ["7", None, "7", "8", None],
+            "YEAR": [2020, 2020, 2021, 2020, 2020],
+            "DONOR": ["Acme", "Jane  Doe", "Acme", "Bob", None],
+            "TRANSACTION_ID": ["a", "b", "c", "d", "e"],
+        },
+        index=[9, 8, 7, 6, 5],
+    )
+    expected_ids = transformer.entity_ids(
+        rows["DONOR_ID"], rows["DONOR"], rows["YEAR"], rows["TRANSACTION_ID"]
+    )
+
+    replaced = transformer.replace_id_with_uuid(
+        rows.copy(), "DONOR_ID", "YEAR", "DONOR"
+    )
+
+    assert replaced.index.tolist() == [9, 8, 7, 6, 5]
+    assert replaced["DONOR_ID"].tolist() == expected_ids.tolist()
+    id_lookup = pd.read_parquet(transformer.id_lookup_path)
+    assert id_lookup[["raw_id", "year"]].to_numpy().tolist() == [
+        ["7", 2020],
+        ["7", 2021],
+        ["8", 2020],
+    ]
+
+    # ids already in the lookup table are reused rather than derived again
+    id_lookup["uuid"] = ["x", "y", "z"]
+    id_lookup.to_parquet(transformer.id_lookup_path)
+    replaced = transformer.replace_id_with_uuid(
+        rows.copy(), "DONOR_ID", "YEAR", "DONOR"
+    )
+    assert replaced["DONOR_ID"].tolist() == [
+        "x",
+        expected_ids[1],
+        "y",
+        "z",
+        expected_ids[4],
+    ]
@@ -0,0 +1,126 @@
+"""Tests for transform/pipeline.py"""
+
+import json
+
+import pandas as pd
+import pytest
+from utils.transform.pipeline import clean_state, transform_and_merge
+from utils.transform.schema import STANDARD_DTYPES
+from utils.transform.storage import read_table, write_state_tables
+
+
+@pytest.fixture
+def fake_state_cleaners(fake_transformer):
+    return [fake_transformer("AA"), fake_transformer("BB"), fake_transformer("CC")]
+
+
+def test_pool_matches_serial(fake_state_cleaners):
+    serial_tables = transform_and_merge(fake_state_cleaners)
+    pool_tables = transform_and_merge(fake_state_cleaners, workers=2)
+
+    for serial_table, pool_table in zip(serial_tables, pool_tables):
+        pd.testing.assert_frame_equal(
+            serial_table.reset_index(drop=True), pool_table.reset_index(drop=True)
+        )
+
+
+def test_pool_isolates_failed_state(fake_state_cleaners, fake_transformer):
+    fake_state_cleaners[1] = fake_transformer("BB", fail=True)
+
+    individuals, organizations, transactions = transform_and_merge(
+        fake_state_cleaners, workers=2
+    )
+
+    assert individuals["state"].tolist() == ["AA", "CC"]
+    assert transactions["transaction_id"].tolist() == ["AA-3", "CC-3"]
+
+
+def test_pool_returns_empty_tables_if_every_state_fails(fake_transformer):
+    state_cleaners = [
+        fake_transformer("AA", fail=True),
+        fake_transformer("BB", fail=True),
+    ]
+
+    tables = transform_and_merge(state_cleaners, workers=2)
+
+    assert [len(table) for table in tables] == [0, 0, 0]
+
+
+def test_unpartitioned_state_ignores_cache_directory(fake_transformer, tmp_path):
+    _, _, transactions = clean_state(fake_transformer("AA"), tmp_path / "cache")
+
+    assert transactions["transaction_id"].tolist() == ["AA-3"]
+    assert not (tmp_path / "cache").exists()
+
+
+def test_parquet_output_partitions_by_state_and_year(fake_state_cleaners, tmp_path):
+    assert (
+        transform_and_merge(
+            fake_state_cleaners, output_directory=tmp_path, return_tables=False
+        )
+        is None
+    )
+
+    assert (tmp_path / "transactions" / "source_state=BB" / "year=2020").is_dir()
+    transactions = read_table(tmp_path / "transactions", states=["BB"], years=[2020])
+    assert transactions["transaction_id"].tolist() == ["BB-3"]
+    individuals = read_table(tmp_path / "individuals", columns=["id"])
+    assert sorted(individuals["id"]) == ["AA-1", "BB-1", "CC-1"]
+
+
+def test_rewriting_state_with_fewer_years_drops_old_years(tmp_path):
+    transactions = pd.DataFrame(
+        {"transaction_id": ["1", "2", "3"], "year": [2020, 2021, 2022]}
+    )
+    write_state_tables((None, None, transactions), "AA", tmp_path)
+    write_state_tables((None, None, transactions), "BB", tmp_path)
+
+    write_state_tables((None, None, transactions.iloc[:1]), "AA", tmp_path)
+
+    rewritten = read_table(tmp_path / "transactions", states=["AA"])
+    assert rewritten["year"].tolist() == [2020]
+    assert len(read_table(tmp_path / "transactions", states=["BB"])) == 3  # noqa: PLR2004
+
+
+def test_merged_tables_have_standard_types(fake_state_cleaners):
+    individuals, _, transactions = transform_and_merge(fake_state_cleaners)
+
+    assert individuals["state"].cat.categories.tolist() == ["AA", "BB", "CC"]
+    assert individuals["id"].dtype == STANDARD_DTYPES["id"]
+    assert transactions["year"].dtype == "Int32"
+
+
+def test_transactions_without_a_year_are_kept(fake_transformer, tmp_path):
+    state_cleaners = [fake_transformer("AA", year=None), fake_transformer("BB")]
+
+    _, _, transactions = transform_and_merge(state_cleaners, output_directory=tmp_path)
+
+    assert transactions["year"].dtype == "Int32"
+    assert transactions["year"].isna().tolist() == [True, False]
+    written = read_table(tmp_path / "transactions").sort_values("transaction_id")
+    assert written["year"].dtype == "Int32"
+    assert written["year"].isna().tolist() == [True, False]
+    assert read_table(tmp_path / "transactions", years=[2020])[
+        "transaction_id"
+    ].tolist() == ["BB-3"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_report_records_every_stage(fake_state_cleaners, tmp_path, workers):
+    report_path = tmp_path / "report.json"
+
+    transform_and_merge(fake_state_cleaners, workers=workers, report_path=report_path)
+
+    report = json.loads(report_path.read_text())
+    stages = sorted((stage["state"], stage["stage"]) for stage in report["stages"])
+    assert stages == sorted(
+        (state, stage)
+        for state in ["AA", "BB", "CC"]
+        for stage in ["preprocess", "clean", "standardize", "create_tables"]
+    )
+    create_tables = next(
+        stage for stage in report["stages"] if stage["stage"] == "create_tables"
+    )
+    assert create_tables["output_rows"] == [1, 1, 1]
+    assert create_tables["wall_seconds"] >= 0
+    assert sorted(report["states"]) == ["AA", "BB", "CC"]
@@ -0,0 +1,206 @@
+"""Tests for scrape/arizona.py and scrape/client.py against a local stub server"""
+
+import io
+import json
+import time
+from collections import Counter
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+import requests
+from utils.scrape import arizona
+from utils.scrape.client import ScrapeClient, TokenBucket
+from utils.transform.storage import read_parquet_parts
+
+ENTITY_COUNT = 25
+MAX_WORKERS = 4
+INFO_ROW_COUNT = 20
+
+
+def respond_like_seethemoney(request):
+    """Serves seethemoney-like responses, failing each entity's first request"""
+    request.form = parse_qs(request.rfile.read(int(request.headers["Content-Length"])))
+    server = request.server
+    with server.lock:
+        server.in_flight += 1
+        server.max_in_flight = max(server.max_in_flight, server.in_flight)
+    try:
+        # long enough for concurrent requests to overlap on a busy machine
+        time.sleep(0.05)
+        respond_to_endpoint(request)
+    finally:
+        with server.lock:
+            server.in_flight -= 1
+
+
+def respond_to_endpoint(request):
+    server = request.server
+    url = urlparse(request.path)
+    params = {key: values[0] for key, values in parse_qs(url.query).items()}
+    endpoint = url.path.rsplit("/", 1)[-1]
+    if endpoint == arizona.BASE_ENDPOINT:
+        start = int(request.form[b"start"][0])
+        length = int(request.form[b"length"][0])
+        with server.lock:
+            server.requested_starts.append(start)
+            failed = server.failed_starts[start] > 0
+            server.failed_starts[start] -= 1
+        if failed:
+            request.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        rows = [{"EntityID": str(i)} for i in range(ENTITY_COUNT)]
+        body = {"data": rows[start : start + length]}
+    elif endpoint == arizona.DETAILED_ENDPOINT:
+        entity = params["entityId"]
+        with server.lock:
+            first_request = entity not in server.failed_entities
+            server.failed_entities.add(entity)
+        if first_request:
+            request.reply(HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        body = {"data": [{"TransactionId": f"{entity}-{i}"} for i in range(2)]}
+    else:
+        body = [
+            {"ReportFilerInfo": f"{params['entityId']}-{i}"}
+            for i in range(INFO_ROW_COUNT)
+        ]
+    request.reply(
+        HTTPStatus.OK,
+        json.dumps(body).encode(),
+        {"Content-Type": "application/json"},
+    )
+
+
+@pytest.fixture
+def stub_server(start_stub_server, monkeypatch):
+    server = start_stub_server(respond_like_seethemoney)
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.failed_entities = set()
+    # times to fail the next requests for table starts, and starts requested
+    server.failed_starts = Counter()
+    server.requested_starts = []
+    monkeypatch.setattr(arizona, "BASE_URL", server.url("/Reporting"))
+    return server
+
+
+def test_scrape_az_page_data_scrapes_every_entity(stub_server):
+    client = ScrapeClient(max_workers=MAX_WORKERS, rate=1000, backoff=0)
+
+    transactions, filers = arizona.scrape_az_page_data(
+        "PAC/All Transactions", 2020, 2020, client=client
+    )
+
+    entities = [str(i) for i in range(ENTITY_COUNT)]
+    assert transactions["TransactionId"].tolist() == [
+        f"{entity}-{i}" for entity in entities for i in range(2)
+    ]
+    assert set(transactions["entity_type"]) == {"PAC"}
+    assert filers["retrieved_id"].tolist() == entities
+    assert filers["candidate"].tolist() == [f"{entity}-0" for entity in entities]
+    # every entity's first detailed request failed and was retried
+    assert stub_server.failed_entities == set(entities)
+    assert 1 < stub_server.max_in_flight <= MAX_WORKERS
+
+
+def test_detailed_scrape_wrapper_limits_entities(stub_server):
+    client = ScrapeClient(max_workers=MAX_WORKERS, rate=1000, backoff=0)
+
+    transactions, filers = arizona.detailed_scrape_wrapper(
+        ["3", "4", "5"], 36, 2020, 2020, max_entities=2, client=client
+    )
+
+    assert transactions["retrieved_id"].unique().tolist() == ["3", "4"]
+    assert filers["retrieved_id"].tolist() == ["3", "4"]
+
+
+def test_client_gives_up_after_retries(stub_server):
+    client = ScrapeClient(retries=0, backoff=0)
+
+    with pytest.raises(arizona.requests.HTTPError):
+        arizona.scrape(
+            arizona.DETAILED_ENDPOINT,
+            arizona.detailed_parametrize("1", 36),
+            client=client,
+        )
+
+
+def test_client_closes_retried_responses(monkeypatch):
+    responses = []
+
+    def request(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = HTTPStatus.SERVICE_UNAVAILABLE if not responses else 200
+        response.raw = io.BytesIO(b"")
+        responses.append(response)
+        return response
+
+    client = ScrapeClient(rate=1000, backoff=0)
+    monkeypatch.setattr(client.session, "request", request)
+
+    assert client.send("GET", "http://127.0.0.1/").status_code == HTTPStatus.OK
+    assert [response.raw.closed for response in responses] == [True, False]
+
+
+def test_token_bucket_limits_rate():
+    rate = 50
+    bucket = TokenBucket(rate, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # the first token is in the full bucket, the other 10 refill at the rate
+    assert time.monotonic() - start >= 10 / rate * 0.9
+
+
+def test_paged_scrape_wrapper_resumes_after_failure(stub_server, tmp_path):
+    page_size = 10
+    client = ScrapeClient(retries=0)
+    stub_server.failed_starts[page_size] = 1
+
+    with pytest.raises(arizona.requests.HTTPError):
+        arizona.paged_scrape_wrapper(
+            2, 2020, 2020, tmp_path, page_size=page_size, client=client
+        )
+    assert len(list(tmp_path.glob("part-*.parquet"))) == 1
+
+    arizona.paged_scrape_wrapper(
+        2, 2020, 2020, tmp_path, page_size=page_size, client=client
+    )
+    arizona.paged_scrape_wrapper(
+        2, 2020, 2020, tmp_path, page_size=page_size, client=client
+    )
+
+    assert stub_server.requested_starts == [0, 10, 10, 20]
+    assert read_parquet_parts(tmp_path)["EntityID"].tolist() == [
+        str(i) for i in range(ENTITY_COUNT)
+    ]
+    with pytest.raises(ValueError, match="different parameters"):
+        arizona.paged_scrape_wrapper(2, 2020, 2020, tmp_path, page_size=5)
+
+
+def test_scrape_and_download_az_data_resumes_entity_pages(
+    stub_server, tmp_path, monkeypatch
+):
+    page_size = 10
+    client = ScrapeClient(max_workers=MAX_WORKERS, rate=1000, retries=1, backoff=0)
+    monkeypatch.setattr(arizona, "all_transactions_pages", [36])
+    # fails the second page's request and its retry, interrupting the run
+    stub_server.failed_starts[page_size] = 2
+    with pytest.raises(arizona.requests.HTTPError):
+        arizona.scrape_and_download_az_data(
+            2020, 2020, tmp_path, client=client, page_size=page_size
+        )
+    entities_directory = tmp_path / "PAC-All-Transactions-entities"
+    assert len(list(entities_directory.glob("part-*.parquet"))) == 1
+
+    arizona.scrape_and_download_az_data(
+        2020, 2020, tmp_path, client=client, page_size=page_size
+    )
+
+    assert stub_server.requested_starts == [0, 10, 10, 10, 20]
+    transactions = pd.read_csv(tmp_path / "PAC-All-Transactions-transactions.csv")
+    assert transactions["retrieved_id"].nunique() == ENTITY_COUNT
+    # the next run scrapes the entities again
+    assert not entities_directory.exists()
@@ -0,0 +1,79 @@
+"""Tests for scrape/cache.py through a ScrapeClient and a local stub server"""
+
+import os
+from http import HTTPStatus
+
+import pytest
+from utils.scrape.cache import HTTPCache
+from utils.scrape.client import ScrapeClient
+
+
+def respond_with_etags(request):
+    """Serves a body per path with an ETag, answering 304 if it matches"""
+    server = request.server
+    body = server.bodies[request.path]
+    etag = f'"{hash(body)}"'
+    if request.headers.get("If-None-Match") == etag:
+        body = b""
+        status = HTTPStatus.NOT_MODIFIED
+    else:
+        status = HTTPStatus.OK
+    server.statuses.append(status)
+    request.reply(status, body, {"ETag": etag})
+
+
+@pytest.fixture
+def stub_server(start_stub_server):
+    server = start_stub_server(respond_with_etags)
+    server.bodies = {}
+    server.statuses = []
+    return server
+
+
+def test_client_revalidates_cached_responses(stub_server, tmp_path):
+    stub_server.bodies["/2020.zip"] = b"first"
+    client = ScrapeClient(rate=1000, cache=HTTPCache(tmp_path))
+
+    first = client.get(stub_server.url("/2020.zip"))
+    cached = client.get(stub_server.url("/2020.zip"))
+    stub_server.bodies["/2020.zip"] = b"second"
+    changed = client.get(stub_server.url("/2020.zip"))
+
+    assert stub_server.statuses == [200, 304, 200]
+    assert [first.content, cached.content, changed.content] == [
+        b"first",
+        b"first",
+        b"second",
+    ]
+    assert getattr(cached, "from_cache", False)
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    # a different request body is a different cache entry
+    assert HTTPCache.key("POST", "http://x", b"a") != HTTPCache.key(
+        "POST", "http://x", b"b"
+    )
+
+
+def test_cache_evicts_least_recently_used(stub_server, tmp_path):
+    for path in ["/a", "/b", "/c"]:
+        stub_server.bodies[path] = path.encode() * 10
+    cache = HTTPCache(tmp_path, max_bytes=45)
+    client = ScrapeClient(rate=1000, cache=cache)
+
+    client.get(stub_server.url("/a"))
+    client.get(stub_server.url("/b"))
+    # /a was used before /b, until it is used again
+    for timestamp, path in enumerate(["/a", "/b"]):
+        body_path = cache.body_path(cache.key("GET", stub_server.url(path)))
+        os.utime(body_path, (timestamp, timestamp))
+    client.get(stub_server.url("/a"))
+    client.get(stub_server.url("/c"))
+
+    cached_paths = {
+        path
+        for path in ["/a", "/b", "/c"]
+        if cache.validators(cache.key("GET", stub_server.url(path))) is not None
+    }
+    assert cached_paths == {"/a", "/c"}
+    assert {path.stem for path in tmp_path.glob("*.body")} == {
+        cache.key("GET", stub_server.url(path)) for path in cached_paths
+    }
@@ -0,0 +1,81 @@
+"""Tests for scrape/michigan.py against a local stub server"""
+
+import hashlib
+import io
+import zipfile
+from http import HTTPStatus
+
+import pytest
+from utils.scrape import michigan
+from utils.scrape.cache import HTTPCache
+from utils.scrape.client import ScrapeClient
+
+CONTRIBUTIONS = "2020_mi_cfr_contributions.zip"
+EXPENDITURES = "2020_mi_cfr_expenditures.zip"
+
+
+def make_archive(file_name, content):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipped:
+        zipped.writestr(file_name, content)
+    return archive.getvalue()
+
+
+def respond_like_michigan(request):
+    """Serves an index of archives, with ETags only for the contributions"""
+    server = request.server
+    name = request.path.lstrip("/")
+    headers = {}
+    if name == "":
+        anchors = "".join(f'<a href="{name}">{name}</a>' for name in server.archives)
+        body = f"<table><tr><td>{anchors}</td></tr></table>".encode()
+    else:
+        server.requests.append((request.command, name))
+        body = server.archives[name]
+        if name == CONTRIBUTIONS:
+            headers["ETag"] = f'"{hashlib.sha256(body).hexdigest()}"'
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                request.reply(HTTPStatus.NOT_MODIFIED, headers=headers)
+                return
+    request.reply(HTTPStatus.OK, body, headers)
+
+
+@pytest.fixture
+def stub_server(start_stub_server, monkeypatch, tmp_path):
+    server = start_stub_server(respond_like_michigan)
+    server.archives = {}
+    server.requests = []
+    monkeypatch.setattr(michigan, "MI_SOS_URL", server.url())
+    monkeypatch.setattr(michigan, "MI_CON_FILEPATH", tmp_path / "Contribution")
+    monkeypatch.setattr(michigan, "MI_EXP_FILEPATH", tmp_path / "Expenditure")
+    return server
+
+
+def test_scrape_and_download_mi_data_skips_unchanged_archives(stub_server, tmp_path):
+    stub_server.archives[CONTRIBUTIONS] = make_archive("con.txt", "first")
+    stub_server.archives[EXPENDITURES] = make_archive("exp.txt", "first")
+    client = ScrapeClient(rate=1000, cache=HTTPCache(tmp_path / "cache"))
+
+    def scrape():
+        stub_server.requests.clear()
+        michigan.scrape_and_download_mi_data(client, tmp_path / "archives")
+        return sorted(stub_server.requests)
+
+    assert scrape() == [("GET", CONTRIBUTIONS), ("GET", EXPENDITURES)]
+    assert (tmp_path / "Contribution" / "con.txt").read_text() == "first"
+    assert (tmp_path / "Expenditure" / "exp.txt").read_text() == "first"
+
+    # unchanged: a 304 for the archive with an ETag, a HEAD for the other
+    (tmp_path / "Expenditure" / "exp.txt").write_text("edited")
+    assert scrape() == [("GET", CONTRIBUTIONS), ("HEAD", EXPENDITURES)]
+    assert (tmp_path / "Expenditure" / "exp.txt").read_text() == "edited"
+
+    stub_server.archives[CONTRIBUTIONS] = make_archive("con.txt", "second")
+    stub_server.archives[EXPENDITURES] = make_archive("exp.txt", "second!")
+    assert scrape() == [
+        ("GET", CONTRIBUTIONS),
+        ("GET", EXPENDITURES),
+        ("HEAD", EXPENDITURES),
+    ]
+    assert (tmp_path / "Contribution" / "con.txt").read_text() == "second"
+    assert (tmp_path / "Expenditure" / "exp.txt").read_text() == "second!"
@@ -0,0 +1,101 @@
+"""Tests for scrape/pennsylvania.py and ScrapeClient.download against a stub server"""
+
+import hashlib
+import io
+import os
+import zipfile
+from http import HTTPStatus
+
+import pytest
+from utils.scrape import pennsylvania
+from utils.scrape.client import ScrapeClient
+
+RAW_FILES = ["contrib_{year}.txt", "filer_{year}.txt", "expense_{year}.txt"]
+
+
+def make_archive(year, directory=""):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipped:
+        for file_name in [*RAW_FILES, "debt_{year}.txt", "readme.txt"]:
+            name = directory + file_name.format(year=year)
+            zipped.writestr(name, f"{file_name} of {year}\n".format(year=year))
+        # larger than a download chunk, so an interrupted download has a part
+        zipped.writestr("padding.bin", os.urandom(3 * 2**20))
+    return archive.getvalue()
+
+
+def respond_with_ranges(request):
+    """Serves archives with ETags, conditional requests and byte ranges"""
+    server = request.server
+    server.requests.append((request.path, request.headers.get("Range")))
+    if request.path not in server.archives:
+        request.send_error(HTTPStatus.NOT_FOUND)
+        return
+    body = server.archives[request.path]
+    etag = f'"{hashlib.sha256(body).hexdigest()}"'
+    if request.headers.get("If-None-Match") == etag:
+        request.reply(HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+        return
+    status = HTTPStatus.OK
+    headers = {"ETag": etag, "Content-Length": str(len(body))}
+    start = 0
+    if request.headers.get("Range") and request.headers.get("If-Range") == etag:
+        start = int(request.headers["Range"].removeprefix("bytes=").rstrip("-"))
+        status = HTTPStatus.PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        headers["Content-Length"] = str(len(body) - start)
+    if start == 0 and request.path in server.truncated_paths:
+        server.truncated_paths.discard(request.path)
+        request.close_connection = True
+        request.reply(status, body[: len(body) // 2], headers)
+        return
+    request.reply(status, body[start:], headers)
+
+
+@pytest.fixture
+def stub_server(start_stub_server, monkeypatch):
+    server = start_stub_server(respond_with_ranges)
+    server.archives = {}
+    # paths whose next full response is cut off halfway
+    server.truncated_paths = set()
+    server.requests = []
+    monkeypatch.setattr(pennsylvania, "PA_URL", server.url())
+    return server
+
+
+def test_download_PA_data_resumes_and_extracts_raw_files(stub_server, tmp_path):
+    stub_server.archives["/2020.zip"] = make_archive(2020)
+    stub_server.archives["/2021.zip"] = make_archive(2021, directory="2021/")
+    stub_server.truncated_paths.add("/2020.zip")
+    client = ScrapeClient(rate=1000, backoff=0)
+    output_directory = tmp_path / "PA"
+
+    downloaded = pennsylvania.download_PA_data(
+        2019, 2021, output_directory, client, tmp_path / "archives"
+    )
+
+    # 2019 is missing, and 2020 was cut off once and resumed where it stopped
+    assert downloaded == [2020, 2021]
+    ranges = [range_ for path, range_ in stub_server.requests if path == "/2020.zip"]
+    assert ranges[0] is None
+    assert ranges[1].startswith("bytes=")
+    assert int(ranges[1].removeprefix("bytes=").rstrip("-")) > 0
+    for year in downloaded:
+        year_directory = output_directory / str(year)
+        assert sorted(path.name for path in year_directory.iterdir()) == sorted(
+            file_name.format(year=year) for file_name in RAW_FILES
+        )
+        contrib = (year_directory / f"contrib_{year}.txt").read_text()
+        assert contrib.startswith(f"contrib_{year}.txt of {year}")
+    assert (tmp_path / "archives" / "2020.zip").read_bytes() == (
+        stub_server.archives["/2020.zip"]
+    )
+
+    # unchanged archives are not downloaded again
+    stub_server.requests.clear()
+    (output_directory / "2021" / "filer_2021.txt").unlink()
+    pennsylvania.download_PA_data(
+        2020, 2021, output_directory, client, tmp_path / "archives"
+    )
+    assert sorted(stub_server.requests) == [("/2020.zip", None), ("/2021.zip", None)]
+    assert (output_directory / "2021" / "filer_2021.txt").exists()